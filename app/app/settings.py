@@ -45,11 +45,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.RequestTimingMiddleware',
+    'core.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -77,12 +80,183 @@ WSGI_APPLICATION = 'app.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/3.0/ref/settings/#databases
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+# Postgres when DB_HOST is set, as docker-compose does, SQLite otherwise
+
+if os.environ.get('DB_HOST'):
+    _pool_max_size = int(os.environ.get('DB_POOL_MAX_SIZE', 0))
+    DATABASES = {
+        'default': {
+            'ENGINE': 'core.db.backends.postgresql',
+            'HOST': os.environ['DB_HOST'],
+            'PORT': os.environ.get('DB_PORT', '5432'),
+            'NAME': os.environ.get('DB_NAME'),
+            'USER': os.environ.get('DB_USER'),
+            'PASSWORD': os.environ.get('DB_PASS'),
+            # seconds a connection is reused across requests, 0 closes (or
+            # returns to the pool) at the end of each request. Pooled
+            # connections must go back after each request, so it's 0 then
+            'CONN_MAX_AGE': 0 if _pool_max_size else int(
+                os.environ.get('DB_CONN_MAX_AGE', 60)),
+            # ping a reused connection before its first query in a request
+            'CONN_HEALTH_CHECKS':
+                os.environ.get('DB_CONN_HEALTH_CHECKS', '1') == '1',
+            # per process pool shared by threads, a MAX_SIZE of 0 disables it
+            'POOL': {
+                'MAX_SIZE': _pool_max_size,
+                'TIMEOUT': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+            },
+            'OPTIONS': {
+                'connect_timeout': int(
+                    os.environ.get('DB_CONNECT_TIMEOUT', 5)),
+            },
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+            'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 0)),
+        }
+    }
+
+# Read replicas of the default database, from comma separated
+# DB_REPLICA_HOSTS and optional DB_REPLICA_WEIGHTS. Safe list/retrieve
+# requests of the recipe API are spread over them by weight, and a user is
+# kept on the primary for DB_REPLICA_STICKY_SECONDS after a write, so they
+# read their own writes despite replication lag.
+
+DATABASE_REPLICAS = {}
+_replica_hosts = [host.strip() for host in
+                  os.environ.get('DB_REPLICA_HOSTS', '').split(',')
+                  if host.strip()]
+_replica_weights = [int(weight) for weight in
+                    os.environ.get('DB_REPLICA_WEIGHTS', '').split(',')
+                    if weight.strip()]
+for _index, _host in enumerate(_replica_hosts):
+    _alias = f'replica_{_index}'
+    DATABASES[_alias] = {
+        **DATABASES['default'],
+        'HOST': _host,
+        # tests read what they write, so replicas mirror the test database
+        'TEST': {'MIRROR': 'default'},
     }
+    DATABASE_REPLICAS[_alias] = _replica_weights[_index] \
+        if _index < len(_replica_weights) else 1
+
+DATABASE_ROUTERS = ['core.db.routers.ReplicaRouter']
+DATABASE_STICKY_SECONDS = int(os.environ.get('DB_REPLICA_STICKY_SECONDS', 5))
+# cache recording which users are kept on the primary, it must be shared
+# by every worker or their reads miss the pin (checked on start up)
+DATABASE_STICKY_CACHE_ALIAS = os.environ.get(
+    'DB_REPLICA_STICKY_CACHE', 'shared')
+
+# Cache
+# https://docs.djangoproject.com/en/3.0/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # seen by every worker, its table is made by manage.py createcachetable
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'core_shared_cache',
+    },
+}
+
+# Seconds serialized list responses stay cached, 0 disables the cache
+RECIPE_LIST_CACHE_TIMEOUT = 60
+# cache holding list responses and the per user versions invalidating them,
+# writes only bump the version in it, so a per process cache would keep
+# serving other workers stale lists until the timeout
+RECIPE_LIST_CACHE_ALIAS = os.environ.get('RECIPE_LIST_CACHE', 'shared')
+
+# Render list responses from values() rows instead of model instances
+RECIPE_FAST_LIST = True
+
+# Maximum recipes accepted by, and insert batch size of, the bulk endpoint
+RECIPE_BULK_MAX_SIZE = 1000
+RECIPE_BULK_BATCH_SIZE = 500
+
+# Max (width, height) of each rendered recipe image variant, the number of
+# background threads rendering them and how many uploads may wait for or be
+# in rendering, further uploads are marked failed until the queue drains
+RECIPE_IMAGE_VARIANTS = {
+    'thumbnail': (150, 150),
+    'card': (600, 600),
+    'full': (1600, 1600),
 }
+RECIPE_IMAGE_WORKERS = 2
+RECIPE_IMAGE_QUEUE_SIZE = 100
+
+# Rows fetched per query while streaming an account export
+RECIPE_EXPORT_CHUNK_SIZE = 2000
+
+# Token authentication cache: size and TTL (seconds) of the in process LRU,
+# plus an optional cache alias shared between workers. The TTL is how long
+# a token revoked without signals (e.g. QuerySet.update()) or on another
+# worker keeps authenticating; in process entries never outlive
+# core.authentication.MAX_LOCAL_TTL whatever it is set to.
+TOKEN_AUTH_CACHE_SIZE = 1024
+TOKEN_AUTH_CACHE_TTL = 5
+TOKEN_AUTH_CACHE_ALIAS = None
+
+# Serve the recipe API from native async views, set by the ASGI entry point.
+# Their database work runs on the event loop's default executor unless
+# thread sensitive, which pins it to the one thread sync views share.
+RECIPE_ASYNC_VIEWS = os.environ.get('RECIPE_ASYNC_VIEWS') == '1'
+RECIPE_ASYNC_THREAD_SENSITIVE = False
+
+# Time queries, serialization and rendering of every request, sent back in
+# Server-Timing headers, and log requests and queries slower than these
+# milliseconds with their view. Off, the middleware isn't loaded at all.
+REQUEST_TIMING = os.environ.get('REQUEST_TIMING') == '1'
+REQUEST_TIMING_SLOW_REQUEST_MS = int(
+    os.environ.get('REQUEST_TIMING_SLOW_REQUEST_MS', 500))
+REQUEST_TIMING_SLOW_QUERY_MS = int(
+    os.environ.get('REQUEST_TIMING_SLOW_QUERY_MS', 100))
+
+# Prometheus metrics of requests per view and of cache hits, served at
+# /metrics. Set prometheus_multiproc_dir in the environment to sum them
+# over the worker processes of a server. Only scrapers sending
+# "Authorization: Bearer <METRICS_TOKEN>" or connecting from one of the
+# comma separated METRICS_ALLOWED_IPS (addresses or networks) are served,
+# by default only the local host. Behind a proxy REMOTE_ADDR is the
+# proxy's, so use the token there.
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED') == '1'
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+METRICS_ALLOWED_IPS = [
+    address.strip() for address in
+    os.environ.get('METRICS_ALLOWED_IPS', '127.0.0.1,::1').split(',')
+    if address.strip()
+]
+
+# Let staff users profile a request with ?_profile=cprofile, showing the
+# top functions of the profile. Off, the middleware isn't loaded at all.
+REQUEST_PROFILING = os.environ.get('REQUEST_PROFILING') == '1'
+REQUEST_PROFILING_TOP = 30
+
+# Password hashing
+# https://docs.djangoproject.com/en/3.0/topics/auth/passwords/
+# New passwords use the first hasher, hashes made by the others or with
+# older Argon2 parameters are upgraded on the next successful login
+
+PASSWORD_HASHERS = [
+    'core.hashers.TunedArgon2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+]
+
+# Argon2 passes, memory (KiB) and lanes
+PASSWORD_ARGON2_TIME_COST = 2
+PASSWORD_ARGON2_MEMORY_COST = 19 * 1024
+PASSWORD_ARGON2_PARALLELISM = 1
+
+AUTHENTICATION_BACKENDS = ['core.backends.PasswordHashBackend']
+
+# Processes hashing passwords at login, 0 hashes on the request thread
+PASSWORD_HASH_WORKERS = 0
 
 # Password validation
 # https://docs.djangoproject.com/en/3.0/ref/settings/#auth-password-validators
@@ -127,3 +301,10 @@ STATIC_ROOT = '/vol/web/static'
 MEDIA_ROOT = '/vol/web/media'
 
 AUTH_USER_MODEL = 'core.User'
+
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+}
@@ -18,7 +18,12 @@ from django.urls import path, include  # noqa
 from django.conf.urls.static import static  # noqa
 from django.conf import settings  # noqa
 
+from core import views as core_views  # noqa
+
 urlpatterns = [
+    path('healthz', core_views.healthz, name='healthz'),
+    path('readyz', core_views.readyz, name='readyz'),
+    path('metrics', core_views.metrics, name='metrics'),
     path('admin/', admin.site.urls),
     path('api/user/', include('user.urls')),
     path('api/recipe/', include('recipe.urls')),
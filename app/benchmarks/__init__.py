@@ -0,0 +1,7 @@
+"""In process load tests of the API
+
+`data` generates synthetic users, recipes, tags and ingredients, `routes`
+describes a request to every API route and `runner` drives them at some
+concurrency and summarizes latency, throughput and queries per request.
+Run them with `manage.py benchmark_api`.
+"""
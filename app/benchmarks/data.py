@@ -0,0 +1,106 @@
+import random
+from dataclasses import dataclass, field
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from rest_framework.authtoken.models import Token
+
+from core.models import Tag, Ingredient, Recipe
+from recipe.bulk import ensure_names, insert_recipes
+
+ADJECTIVES = ('Spicy', 'Creamy', 'Roasted', 'Smoky', 'Crispy', 'Quick',
+              'Classic', 'Vegan', 'Grilled', 'Braised', 'Lemony', 'Hearty')
+DISHES = ('Curry', 'Risotto', 'Tacos', 'Ramen', 'Salad', 'Soup', 'Stew',
+          'Pasta', 'Pancakes', 'Burger', 'Chili', 'Dumplings', 'Pie')
+TAGS = ('Vegan', 'Vegetarian', 'Dessert', 'Breakfast', 'Dinner', 'Lunch',
+        'Quick', 'Healthy', 'Spicy', 'Gluten free', 'Comfort', 'Party',
+        'Budget', 'Kids', 'Summer', 'Winter', 'Baking', 'Grill', 'Asian',
+        'Italian', 'Mexican', 'Indian', 'French', 'Low carb', 'Seafood')
+INGREDIENTS = ('Salt', 'Pepper', 'Olive oil', 'Garlic', 'Onion', 'Butter',
+               'Flour', 'Sugar', 'Egg', 'Milk', 'Tomato', 'Rice', 'Lemon',
+               'Chicken', 'Beef', 'Tofu', 'Potato', 'Carrot', 'Cheese',
+               'Basil', 'Ginger', 'Chili', 'Cumin', 'Coconut milk', 'Pasta',
+               'Spinach', 'Mushroom', 'Beans', 'Honey', 'Yogurt')
+
+PASSWORD = 'benchmark-password'
+
+
+@dataclass
+class Fixture:
+    """A generated user and the ids of what it owns"""
+    user_id: int
+    email: str
+    token: str
+    tag_ids: list = field(default_factory=list)
+    ingredient_ids: list = field(default_factory=list)
+    recipe_ids: list = field(default_factory=list)
+
+
+def _names(vocabulary, count):
+    """Return count distinct names, numbering them past the vocabulary"""
+    return [vocabulary[i % len(vocabulary)] +
+            (f' {i // len(vocabulary) + 1}' if i >= len(vocabulary) else '')
+            for i in range(count)]
+
+
+def _pick(rng, ids, low, high):
+    """Pick a few distinct ids, skewed to the first (most popular) ones"""
+    if not ids:
+        return []
+    weights = [1 / (rank + 1) for rank in range(len(ids))]
+    picked = set(rng.choices(ids, weights, k=rng.randint(low, high)))
+
+    return sorted(picked)
+
+
+def generate(prefix, users, recipes, tags, ingredients, seed=0,
+             batch_size=500):
+    """Create users with tokens, tags, ingredients and recipes
+
+    Every user owns `tags` tags, `ingredients` ingredients and `recipes`
+    recipes. Each recipe links 1-4 tags and 3-10 ingredients, popular
+    names being linked far more often, like real data.
+    """
+    rng = random.Random(seed)
+    # hash once, the password is the same for every user
+    password = make_password(PASSWORD)
+    fixtures = []
+    for index in range(users):
+        user = get_user_model().objects.create(
+            email=f'{prefix}{index}@example.com', password=password)
+        token = Token.objects.create(user=user)
+        tag_ids = ensure_names(
+            Tag, [(user.pk, name) for name in _names(TAGS, tags)])
+        ingredient_ids = ensure_names(Ingredient, [
+            (user.pk, name) for name in _names(INGREDIENTS, ingredients)])
+        fixture = Fixture(
+            user_id=user.pk, email=user.email, token=token.key,
+            tag_ids=sorted(tag_ids.values()),
+            ingredient_ids=sorted(ingredient_ids.values()),
+        )
+
+        new, links = [], []
+        for _ in range(recipes):
+            new.append(Recipe(
+                user_id=user.pk,
+                title=f'{rng.choice(ADJECTIVES)} {rng.choice(DISHES)}',
+                time_minutes=rng.randint(5, 180),
+                price=Decimal(rng.randint(100, 5000)) / 100,
+            ))
+            links.append({
+                'tags': _pick(rng, fixture.tag_ids, 1, 4),
+                'ingredients': _pick(rng, fixture.ingredient_ids, 3, 10),
+            })
+        for start in range(0, len(new), batch_size):
+            insert_recipes(new[start:start + batch_size],
+                           links[start:start + batch_size], batch_size)
+        fixture.recipe_ids = [recipe.pk for recipe in new]
+        fixtures.append(fixture)
+
+    return fixtures
+
+
+def cleanup(prefix):
+    """Delete generated users and everything they own"""
+    get_user_model().objects.filter(email__startswith=prefix).delete()
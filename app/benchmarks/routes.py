@@ -0,0 +1,129 @@
+from dataclasses import dataclass
+from decimal import Decimal
+from io import BytesIO
+from typing import Callable, Optional
+
+from PIL import Image
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.urls import reverse
+
+from core.models import Recipe
+from benchmarks.data import ADJECTIVES, DISHES, PASSWORD
+
+
+@dataclass
+class Route:
+    """A request to benchmark, its url and payload built for every call
+
+    The builders get a call context with the `fixture` of the user making
+    the request, a seeded `rng`, the request number `n`, the run `prefix`
+    and whatever the untimed `setup` returned as `prepared`.
+    """
+    name: str
+    method: str
+    url: Callable
+    data: Optional[Callable] = None
+    multipart: bool = False
+    authenticated: bool = True
+    setup: Optional[Callable] = None
+
+
+def _jpeg():
+    output = BytesIO()
+    Image.new('RGB', (800, 600), (200, 120, 40)).save(output, 'JPEG')
+
+    return output.getvalue()
+
+
+JPEG = _jpeg()
+
+
+def _url(name, *args, query=''):
+    return lambda call: reverse(name, args=[
+        arg(call) if callable(arg) else arg for arg in args]) + query
+
+
+def _some(call, ids, count):
+    return ','.join(str(pk) for pk in call.rng.sample(
+        ids, min(count, len(ids))))
+
+
+def _recipe(call):
+    return call.rng.choice(call.fixture.recipe_ids)
+
+
+def _recipe_payload(call):
+    return {
+        'title': f'{call.rng.choice(ADJECTIVES)} {call.rng.choice(DISHES)}',
+        'time_minutes': call.rng.randint(5, 180),
+        'price': str(Decimal(call.rng.randint(100, 5000)) / 100),
+        'tags': call.rng.sample(call.fixture.tag_ids,
+                                min(2, len(call.fixture.tag_ids))),
+        'ingredients': call.rng.sample(
+            call.fixture.ingredient_ids,
+            min(5, len(call.fixture.ingredient_ids))),
+    }
+
+
+def _create_recipe(call):
+    return Recipe.objects.create(
+        user_id=call.fixture.user_id, title='Doomed', time_minutes=1,
+        price=1).pk
+
+
+ROUTES = [
+    Route('api-root', 'get', _url('recipe:api-root')),
+    Route('tags-list', 'get', _url('recipe:tag-list')),
+    Route('tags-list-popular', 'get', _url(
+        'recipe:tag-list',
+        query='?ordering=popular&fields=id,name,recipe_count')),
+    Route('tags-create', 'post', _url('recipe:tag-list'),
+          data=lambda call: {'name': f'Tag {call.n}'}),
+    Route('tags-ensure', 'post', _url('recipe:tag-ensure'),
+          data=lambda call: {'names': [f'Tag {call.n}', 'Vegan', 'Quick']}),
+    Route('ingredients-list', 'get', _url(
+        'recipe:ingredient-list', query='?assigned_only=1')),
+    Route('ingredients-create', 'post', _url('recipe:ingredient-list'),
+          data=lambda call: {'name': f'Ingredient {call.n}'}),
+    Route('ingredients-ensure', 'post', _url('recipe:ingredient-ensure'),
+          data=lambda call: {'names': [f'Ingredient {call.n}', 'Salt']}),
+    Route('recipes-list', 'get', _url('recipe:recipe-list')),
+    Route('recipes-list-filtered', 'get', lambda call: reverse(
+        'recipe:recipe-list') + '?tags=' + _some(
+        call, call.fixture.tag_ids, 2) + '&ingredients=' + _some(
+        call, call.fixture.ingredient_ids, 1)),
+    Route('recipes-list-expanded', 'get', _url(
+        'recipe:recipe-list', query='?fields=id,title,tags&expand=tags')),
+    Route('recipes-search', 'get', lambda call: reverse(
+        'recipe:recipe-list') + '?search=' + call.rng.choice(DISHES)),
+    Route('recipes-create', 'post', _url('recipe:recipe-list'),
+          data=_recipe_payload),
+    Route('recipes-retrieve', 'get', _url('recipe:recipe-detail', _recipe)),
+    Route('recipes-update', 'put', _url('recipe:recipe-detail', _recipe),
+          data=_recipe_payload),
+    Route('recipes-partial-update', 'patch',
+          _url('recipe:recipe-detail', _recipe),
+          data=lambda call: {'time_minutes': call.rng.randint(5, 180)}),
+    Route('recipes-delete', 'delete',
+          _url('recipe:recipe-detail', lambda call: call.prepared),
+          setup=_create_recipe),
+    Route('recipes-bulk', 'post', _url('recipe:recipe-bulk'),
+          data=lambda call: [_recipe_payload(call) for _ in range(10)]),
+    Route('recipes-export', 'get', _url('recipe:recipe-export')),
+    Route('recipes-upload-image', 'post',
+          _url('recipe:recipe-upload-image', _recipe),
+          data=lambda call: {'image': SimpleUploadedFile(
+              'benchmark.jpg', JPEG, 'image/jpeg')},
+          multipart=True),
+    Route('user-create', 'post', _url('user:create'), authenticated=False,
+          data=lambda call: {
+              'email': f'{call.prefix}new-{call.n}@example.com',
+              'password': PASSWORD, 'name': 'Benchmark'}),
+    Route('user-token', 'post', _url('user:token'), authenticated=False,
+          data=lambda call: {'email': call.fixture.email,
+                             'password': PASSWORD}),
+    Route('user-me', 'get', _url('user:me')),
+    Route('user-me-update', 'patch', _url('user:me'),
+          data=lambda call: {'name': f'Benchmark {call.n}'}),
+]
@@ -0,0 +1,115 @@
+import json
+import random
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test import Client
+
+
+class QueryCounter:
+    """connection.execute_wrapper() counting the queries it sees"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def send(client, route, call, host):
+    """Make one request, return (seconds, queries, status code)"""
+    kwargs = {'HTTP_HOST': host}
+    if route.authenticated:
+        kwargs['HTTP_AUTHORIZATION'] = f'Token {call.fixture.token}'
+    data = route.data(call) if route.data else None
+    if data is not None and not route.multipart:
+        kwargs['data'] = json.dumps(data)
+        kwargs['content_type'] = 'application/json'
+    elif data is not None:
+        kwargs['data'] = data
+    url = route.url(call)
+
+    counter = QueryCounter()
+    with connections[DEFAULT_DB_ALIAS].execute_wrapper(counter):
+        started = time.perf_counter()
+        response = getattr(client, route.method)(url, **kwargs)
+        if response.streaming:
+            # streamed bodies are produced while read
+            for _ in response.streaming_content:
+                pass
+        elapsed = time.perf_counter() - started
+
+    return elapsed, counter.count, response.status_code
+
+
+def run_route(route, fixtures, requests, concurrency, prefix, host, seed=0):
+    """Send a route's requests from concurrent clients, return samples"""
+    def worker(index):
+        client = Client(raise_request_exception=False)
+        rng = random.Random(f'{seed}-{route.name}-{index}')
+        samples = []
+        try:
+            for n in range(index, requests, concurrency):
+                call = SimpleNamespace(
+                    fixture=fixtures[n % len(fixtures)], rng=rng, n=n,
+                    prefix=prefix, prepared=None)
+                if route.setup:
+                    call.prepared = route.setup(call)
+                samples.append(send(client, route, call, host))
+        finally:
+            if concurrency > 1:
+                connections.close_all()
+        return samples
+
+    if concurrency == 1:
+        return worker(0)
+
+    with ThreadPoolExecutor(concurrency) as executor:
+        return [sample for samples in executor.map(worker, range(concurrency))
+                for sample in samples]
+
+
+def summarize(samples, elapsed):
+    """Return latency percentiles, throughput and queries of samples"""
+    latencies = sorted(seconds for seconds, _, _ in samples)
+    queries = [count for _, count, _ in samples]
+    if len(latencies) > 1:
+        cuts = statistics.quantiles(latencies, n=100, method='inclusive')
+        p50, p95, p99 = cuts[49], cuts[94], cuts[98]
+    else:
+        p50 = p95 = p99 = latencies[0]
+
+    return {
+        'requests': len(samples),
+        'errors': sum(status >= 400 for _, _, status in samples),
+        'statuses': sorted({status for _, _, status in samples}),
+        'throughput_rps': round(len(samples) / elapsed, 2),
+        'latency_ms': {
+            'mean': round(statistics.mean(latencies) * 1000, 3),
+            'p50': round(p50 * 1000, 3),
+            'p95': round(p95 * 1000, 3),
+            'p99': round(p99 * 1000, 3),
+            'max': round(latencies[-1] * 1000, 3),
+        },
+        'queries': {
+            'mean': round(statistics.mean(queries), 2),
+            'max': max(queries),
+        },
+    }
+
+
+def run(routes, fixtures, requests, concurrency, prefix, host, seed=0):
+    """Benchmark routes one after the other, return {name: summary}"""
+    results = {}
+    for route in routes:
+        started = time.perf_counter()
+        samples = run_route(route, fixtures, requests, concurrency, prefix,
+                            host, seed)
+        results[route.name] = summarize(
+            samples, time.perf_counter() - started)
+
+    return results
@@ -0,0 +1,132 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings  # noqa
+from django.core.cache import caches  # noqa
+from rest_framework.authentication import TokenAuthentication  # noqa
+
+from core.metrics import record_cache_lookup  # noqa
+
+
+# Upper bound in seconds on how long a worker keeps trusting a token it
+# cached. Evictions only reach the process making them, and bulk
+# QuerySet.update() sends no signal at all, so a revoked token keeps
+# working on other workers for up to this long: a deliberate security
+# window, kept short.
+MAX_LOCAL_TTL = 5
+
+
+class TokenCache:
+    """Bounded LRU of token keys to (user, token) with a TTL
+
+    Entries are kept in process and optionally mirrored to a shared Django
+    cache, so other workers skip the lookup too.
+    """
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def ttl(self):
+        return getattr(settings, 'TOKEN_AUTH_CACHE_TTL', MAX_LOCAL_TTL)
+
+    @property
+    def local_ttl(self):
+        return min(self.ttl, MAX_LOCAL_TTL)
+
+    @property
+    def max_size(self):
+        return getattr(settings, 'TOKEN_AUTH_CACHE_SIZE', 1024)
+
+    @property
+    def shared(self):
+        alias = getattr(settings, 'TOKEN_AUTH_CACHE_ALIAS', None)
+        return caches[alias] if alias else None
+
+    def _shared_key(self, key):
+        return f'core:auth-token:{key}'
+
+    def get(self, key, local_only=False):
+        """Return the cached (user, token) pair of a key or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires, value = entry
+                if expires > time.monotonic():
+                    self._entries.move_to_end(key)
+                    return value
+                del self._entries[key]
+
+        if self.shared is not None and not local_only:
+            value = self.shared.get(self._shared_key(key))
+            if value is not None:
+                self._set_local(key, value)
+                return value
+
+        return None
+
+    def set(self, key, value):
+        """Cache the (user, token) pair of a key"""
+        self._set_local(key, value)
+        if self.shared is not None:
+            self.shared.set(self._shared_key(key), value, self.ttl)
+
+    def _set_local(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.local_ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        """Drop a key from the cache"""
+        with self._lock:
+            self._entries.pop(key, None)
+        if self.shared is not None:
+            self.shared.delete(self._shared_key(key))
+
+    def clear(self):
+        """Drop every in process entry"""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+token_cache = TokenCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Token authentication that caches the token to user lookup"""
+
+    def authenticate_credentials(self, key):
+        """Return the user and token of a key, from cache if possible"""
+        cached = token_cache.get(key)
+        record_cache_lookup('token', cached is not None)
+        if cached is None:
+            cached = super().authenticate_credentials(key)
+            token_cache.set(key, cached)
+
+        user, token = cached
+        # hand each request its own copy so views can't mutate the cache
+        return (copy.copy(user), token)
+
+
+class ResolvedTokenAuthentication(CachedTokenAuthentication):
+    """Cached token authentication trusting a pair resolved beforehand
+
+    Async views resolve token cache hits on the event loop and attach the
+    (user, token) pair to the request as `resolved_token_auth`, anything
+    else is authenticated as usual.
+    """
+
+    def authenticate(self, request):
+        resolved = getattr(request, 'resolved_token_auth', None)
+        if resolved is not None:
+            return resolved
+
+        return super().authenticate(request)
@@ -0,0 +1,36 @@
+from django.contrib.auth import get_user_model  # noqa
+from django.contrib.auth.backends import ModelBackend  # noqa
+
+from core.hashers import hash_password, verify_password  # noqa
+
+
+class PasswordHashBackend(ModelBackend):
+    """ModelBackend verifying passwords through core.hashers
+
+    Hashing may then run on the bounded process pool, and outdated hashes
+    are replaced after a successful login.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        """Return the user matching the credentials or None"""
+        UserModel = get_user_model()
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+
+        try:
+            user = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            # hash anyway so unknown emails take as long as known ones
+            hash_password(password)
+            return None
+
+        is_correct, new_hash = verify_password(password, user.password)
+        if not is_correct:
+            return None
+        if new_hash:
+            user.password = new_hash
+            user.save(update_fields=['password'])
+
+        return user if self.user_can_authenticate(user) else None
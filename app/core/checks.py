@@ -0,0 +1,34 @@
+from django.conf import settings  # noqa
+from django.core.checks import Error, Tags, register  # noqa
+
+# cache backends only seen by the process they live in
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register(Tags.database, Tags.caches)
+def check_sticky_cache(app_configs=None, **kwargs):
+    """Check replicas pin users to the primary in a cache workers share"""
+    if not getattr(settings, 'DATABASE_REPLICAS', {}):
+        return []
+
+    alias = getattr(settings, 'DATABASE_STICKY_CACHE_ALIAS', 'default')
+    backend = settings.CACHES.get(alias, {}).get('BACKEND')
+    if backend is None:
+        return [Error(
+            f"DATABASE_STICKY_CACHE_ALIAS '{alias}' isn't in CACHES.",
+            id='core.E001',
+        )]
+    if backend in PROCESS_LOCAL_CACHES:
+        return [Error(
+            f"The '{alias}' cache pinning users to the primary is local to "
+            'each process, so other workers serve their reads from lagging '
+            'replicas.',
+            hint='Point DATABASE_STICKY_CACHE_ALIAS at a shared cache, like '
+                 'memcached or the database cache.',
+            id='core.E002',
+        )]
+
+    return []
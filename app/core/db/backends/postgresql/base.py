@@ -0,0 +1,98 @@
+from django.db.backends.postgresql import base
+from psycopg2 import extensions
+
+from core.db.pool import PoolTimeout, get_pool
+
+Database = base.Database
+
+
+def reset_connection(connection):
+    """Ready a returned connection for reuse, False if it's unusable"""
+    status = connection.info.transaction_status
+    if status in (extensions.TRANSACTION_STATUS_INTRANS,
+                  extensions.TRANSACTION_STATUS_INERROR):
+        connection.rollback()
+        return True
+
+    return status == extensions.TRANSACTION_STATUS_IDLE
+
+
+def is_alive(connection):
+    """Return whether a raw connection still answers a query"""
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+    except Database.Error:
+        return False
+
+    return True
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """Postgres backend with connection health checks and pooling
+
+    With CONN_HEALTH_CHECKS a persistent connection is pinged before its
+    first use in each request and replaced if it died. With a POOL
+    MAX_SIZE, connections are taken from and returned to a per process
+    pool instead of being opened and closed.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.health_check_done = False
+
+    @property
+    def health_checks(self):
+        return bool(self.settings_dict.get('CONN_HEALTH_CHECKS'))
+
+    @property
+    def pool(self):
+        return get_pool(self.alias, self.settings_dict, reset_connection)
+
+    def get_new_connection(self, conn_params):
+        """Open a connection, or take one from the pool"""
+        pool = self.pool
+        if pool is None:
+            return super().get_new_connection(conn_params)
+
+        try:
+            connection = pool.get(
+                lambda: super(DatabaseWrapper, self).get_new_connection(
+                    conn_params),
+                check=is_alive if self.health_checks else None,
+            )
+        except PoolTimeout as exc:
+            raise Database.OperationalError(str(exc)) from exc
+        self.isolation_level = self.settings_dict['OPTIONS'].get(
+            'isolation_level', connection.isolation_level)
+
+        return connection
+
+    def _close(self):
+        """Close the connection, or give it back to the pool"""
+        pool = self.pool
+        if pool is None or self.connection is None:
+            return super()._close()
+
+        pool.put(self.connection)
+
+    def connect(self):
+        """Connect, a fresh connection needs no health check"""
+        # before connecting, which calls ensure_connection() while setting
+        # autocommit, a ping then would leave a transaction open
+        self.health_check_done = True
+        super().connect()
+
+    def ensure_connection(self):
+        """Replace a dead persistent connection before it's first used"""
+        if (self.connection is not None and not self.health_check_done
+                and self.health_checks):
+            self.health_check_done = True
+            if not self.in_atomic_block and not self.is_usable():
+                self.close()
+        super().ensure_connection()
+
+    def close_if_unusable_or_obsolete(self):
+        """Called around requests, so the next request checks again"""
+        super().close_if_unusable_or_obsolete()
+        self.health_check_done = False
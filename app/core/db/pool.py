@@ -0,0 +1,96 @@
+import threading
+
+from django.core.exceptions import ImproperlyConfigured  # noqa
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class PoolTimeout(Exception):
+    """No pooled connection was returned in time"""
+
+
+class ConnectionPool:
+    """Per process pool of open connections shared by threads
+
+    At most `max_size` connections are handed out at once, callers wait up
+    to `timeout` seconds for one to be returned. `reset` readies a returned
+    connection for reuse, returning False (or raising) when it should be
+    closed instead.
+    """
+
+    def __init__(self, max_size, timeout, reset=None):
+        self.timeout = timeout
+        self.reset = reset
+        self._idle = []
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_size)
+
+    def get(self, connect, check=None):
+        """Return an idle connection passing check, or a new one"""
+        if not self._slots.acquire(timeout=self.timeout):
+            raise PoolTimeout('Timed out waiting for a pooled connection')
+        try:
+            while True:
+                with self._lock:
+                    connection = self._idle.pop() if self._idle else None
+                if connection is None:
+                    return connect()
+                if check is None or check(connection):
+                    return connection
+                connection.close()
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def put(self, connection):
+        """Return a connection, closing it unless it is reusable"""
+        try:
+            if connection.closed:
+                return
+            try:
+                reusable = self.reset is None or self.reset(connection)
+            except Exception:
+                reusable = False
+            if not reusable:
+                connection.close()
+                return
+            with self._lock:
+                self._idle.append(connection)
+        finally:
+            self._slots.release()
+
+    def close(self):
+        """Close every idle connection"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            connection.close()
+
+
+def get_pool(alias, settings_dict, reset=None):
+    """Return the pool of a database alias, None if pooling is off"""
+    options = settings_dict.get('POOL') or {}
+    if not options.get('MAX_SIZE'):
+        return None
+    if settings_dict.get('CONN_MAX_AGE'):
+        # each thread would keep its connection checked out between
+        # requests, so more threads than MAX_SIZE would starve the pool
+        raise ImproperlyConfigured(
+            f"Database '{alias}' pools connections, so its CONN_MAX_AGE "
+            'must be 0 to give them back after each request.')
+
+    with _pools_lock:
+        if alias not in _pools:
+            _pools[alias] = ConnectionPool(
+                options['MAX_SIZE'], options.get('TIMEOUT', 10), reset)
+
+    return _pools[alias]
+
+
+def discard_pool(alias):
+    """Close and forget the pool of a database alias"""
+    with _pools_lock:
+        pool = _pools.pop(alias, None)
+    if pool is not None:
+        pool.close()
@@ -0,0 +1,101 @@
+import functools
+import itertools
+from contextvars import ContextVar
+
+from django.conf import settings  # noqa
+from django.core.cache import caches  # noqa
+from django.db import DEFAULT_DB_ALIAS  # noqa
+
+# whether reads of the current request may go to a replica
+_use_replicas = ContextVar('use_replicas', default=False)
+_turns = itertools.count()
+
+
+def get_replicas():
+    """Return the replica alias to weight mapping, empty without any"""
+    return getattr(settings, 'DATABASE_REPLICAS', {})
+
+
+@functools.lru_cache(maxsize=8)
+def _schedule(weighted):
+    # smooth weighted round robin: {a: 2, b: 1} gives a, b, a
+    current = {alias: 0 for alias, _ in weighted}
+    total = sum(weight for _, weight in weighted)
+    schedule = []
+    for _ in range(total):
+        for alias, weight in weighted:
+            current[alias] += weight
+        alias = max(current, key=current.get)
+        current[alias] -= total
+        schedule.append(alias)
+
+    return tuple(schedule)
+
+
+def choose_replica(replicas):
+    """Return the next replica of a weighted round robin over them"""
+    schedule = _schedule(tuple(sorted(
+        (alias, weight) for alias, weight in replicas.items() if weight > 0)))
+
+    return schedule[next(_turns) % len(schedule)] if schedule else None
+
+
+def read_from_replicas():
+    """Send the reads of the current request to replicas
+
+    Return the token to stop with.
+    """
+    return _use_replicas.set(True)
+
+
+def stop_reading_from_replicas(token):
+    _use_replicas.reset(token)
+
+
+def _sticky_cache():
+    return caches[getattr(settings, 'DATABASE_STICKY_CACHE_ALIAS', 'default')]
+
+
+def _pin_key(user_id):
+    return f'core:db-pin:{user_id}'
+
+
+def pin_to_primary(user_id):
+    """Keep a user reading from the primary until replicas caught up"""
+    seconds = getattr(settings, 'DATABASE_STICKY_SECONDS', 5)
+    if get_replicas() and seconds:
+        _sticky_cache().set(_pin_key(user_id), True, seconds)
+
+
+def is_pinned(user_id):
+    """Return whether a user wrote recently, so must read the primary"""
+    return bool(_sticky_cache().get(_pin_key(user_id)))
+
+
+class ReplicaRouter:
+    """Route reads to replicas while allowed, writes to the primary
+
+    Reads only go to replicas inside read_from_replicas(), which views
+    enter for safe requests. Migrations run on the primary only.
+    """
+
+    def db_for_read(self, model, **hints):
+        if not _use_replicas.get():
+            # Django falls back to the database of a hinted instance
+            return None
+
+        return choose_replica(get_replicas())
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # replicas hold the same rows as the primary
+        databases = {DEFAULT_DB_ALIAS, *get_replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
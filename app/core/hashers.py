@@ -0,0 +1,88 @@
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings  # noqa
+from django.contrib.auth.hashers import (Argon2PasswordHasher,  # noqa
+                                         get_hasher, identify_hasher,  # noqa
+                                         is_password_usable, make_password)  # noqa
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    """Argon2 hasher with its cost parameters read from settings
+
+    Hashes made with other parameters are flagged by must_update(), so they
+    are upgraded on the next successful login.
+    """
+
+    @property
+    def time_cost(self):
+        return settings.PASSWORD_ARGON2_TIME_COST
+
+    @property
+    def memory_cost(self):
+        return settings.PASSWORD_ARGON2_MEMORY_COST
+
+    @property
+    def parallelism(self):
+        return settings.PASSWORD_ARGON2_PARALLELISM
+
+
+def _verify(password, encoded):
+    """Check a password like check_password(), return (valid, new hash)"""
+    if password is None or not is_password_usable(encoded):
+        return False, None
+
+    preferred = get_hasher('default')
+    try:
+        hasher = identify_hasher(encoded)
+    except ValueError:
+        return False, None
+
+    hasher_changed = hasher.algorithm != preferred.algorithm
+    must_update = hasher_changed or preferred.must_update(encoded)
+    is_correct = hasher.verify(password, encoded)
+    if not is_correct and not hasher_changed and must_update:
+        hasher.harden_runtime(password, encoded)
+
+    # rehash here too, so the pool also takes the cost of upgrading
+    return is_correct, make_password(password) \
+        if is_correct and must_update else None
+
+
+def get_executor():
+    """Return the bounded process pool passwords are hashed on"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # spawn rather than fork a process that is running threads
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.PASSWORD_HASH_WORKERS,
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+
+    return _executor
+
+
+def _run(func, *args):
+    if getattr(settings, 'PASSWORD_HASH_WORKERS', 0):
+        return get_executor().submit(func, *args).result()
+
+    return func(*args)
+
+
+def verify_password(password, encoded):
+    """Return whether a password matches a hash, and its upgraded hash
+
+    The upgraded hash is None unless the hash was made by another hasher
+    or with other parameters than the preferred one.
+    """
+    return _run(_verify, password, encoded)
+
+
+def hash_password(password):
+    """Return a hash of a password made by the preferred hasher"""
+    return _run(make_password, password)
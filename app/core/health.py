@@ -0,0 +1,27 @@
+from django.db import DEFAULT_DB_ALIAS, connections  # noqa
+from django.db.migrations.executor import MigrationExecutor  # noqa
+
+# once every migration is applied it stays so for the process lifetime
+_migrated = set()
+
+
+def check_database(alias=DEFAULT_DB_ALIAS):
+    """Open a connection and run a trivial query, raising if it fails"""
+    with connections[alias].cursor() as cursor:
+        cursor.execute('SELECT 1')
+        cursor.fetchone()
+
+
+def unapplied_migrations(alias=DEFAULT_DB_ALIAS):
+    """Return the names of the migrations not applied to a database"""
+    if alias in _migrated:
+        return []
+
+    executor = MigrationExecutor(connections[alias])
+    plan = executor.migration_plan(executor.loader.graph.leaf_nodes())
+    unapplied = [f'{migration.app_label}.{migration.name}'
+                 for migration, _ in plan]
+    if not unapplied:
+        _migrated.add(alias)
+
+    return unapplied
@@ -0,0 +1,138 @@
+import json
+import subprocess
+import tempfile
+import uuid
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+
+from benchmarks import data, runner
+from benchmarks.routes import ROUTES
+from recipe.images import shutdown_executor
+
+
+def git_commit():
+    """Return the checked out commit, None outside a git checkout"""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+            cwd=settings.BASE_DIR, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    """Django command to load test every API route in process"""
+    help = ('Generate synthetic users, recipes, tags and ingredients, then '
+            'send requests to every recipe and user API route from '
+            'concurrent clients. Reports p50/p95/p99 latency, throughput '
+            'and SQL queries per request, optionally saved as JSON. Run it '
+            'against a scratch database, Postgres for concurrent writes.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10)
+        parser.add_argument(
+            '--recipes', type=int, default=100,
+            help='Recipes per user')
+        parser.add_argument('--tags', type=int, default=20,
+                            help='Tags per user')
+        parser.add_argument('--ingredients', type=int, default=50,
+                            help='Ingredients per user')
+        parser.add_argument(
+            '--requests', type=int, default=200,
+            help='Requests per route')
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument(
+            '--routes',
+            help='Comma separated route names, all by default')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='JSON file to write results to')
+        parser.add_argument(
+            '--no-list-cache', action='store_true',
+            help='Disable the list response cache')
+        parser.add_argument(
+            '--keep-data', action='store_true',
+            help='Keep the generated data instead of deleting it')
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        routes = ROUTES
+        if options['routes']:
+            names = {name.strip() for name in options['routes'].split(',')}
+            unknown = names - {route.name for route in ROUTES}
+            if unknown:
+                raise CommandError(
+                    f"Unknown routes: {', '.join(sorted(unknown))}")
+            routes = [route for route in ROUTES if route.name in names]
+        for name in ('users', 'requests', 'concurrency'):
+            if options[name] < 1:
+                raise CommandError(f'--{name} must be positive')
+
+        prefix = f'benchmark-{uuid.uuid4().hex[:8]}-'
+        media = tempfile.TemporaryDirectory(prefix='benchmark-media-')
+        # uploaded images and their variants go to a throwaway directory
+        overrides = {'MEDIA_ROOT': media.name}
+        if options['no_list_cache']:
+            overrides['RECIPE_LIST_CACHE_TIMEOUT'] = 0
+        try:
+            self.stdout.write('Generating data...')
+            fixtures = data.generate(
+                prefix, options['users'], options['recipes'],
+                options['tags'], options['ingredients'], options['seed'])
+            with override_settings(**overrides):
+                results = runner.run(
+                    routes, fixtures, options['requests'],
+                    options['concurrency'], prefix, self.host(),
+                    options['seed'])
+                shutdown_executor()
+        finally:
+            if not options['keep_data']:
+                data.cleanup(prefix)
+            media.cleanup()
+
+        self.report(results)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(self.document(options, results), f, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+
+    def host(self):
+        """Return a Host header the site accepts"""
+        for host in settings.ALLOWED_HOSTS:
+            if host != '*' and not host.startswith('.'):
+                return host
+
+        return 'localhost'
+
+    def document(self, options, results):
+        """Return the JSON document of a run"""
+        return {
+            'meta': {
+                'commit': git_commit(),
+                'started': datetime.now(timezone.utc).isoformat(),
+                'database': connection.vendor,
+                'parameters': {
+                    name: options[name] for name in (
+                        'users', 'recipes', 'tags', 'ingredients',
+                        'requests', 'concurrency', 'seed', 'no_list_cache')
+                },
+            },
+            'routes': results,
+        }
+
+    def report(self, results):
+        """Write a table of the results"""
+        self.stdout.write(
+            f"{'route':<24} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} "
+            f"{'queries':>8} {'errors':>6}")
+        for name, result in results.items():
+            latency = result['latency_ms']
+            self.stdout.write(
+                f"{name:<24} {result['throughput_rps']:>8.1f} "
+                f"{latency['p50']:>8.2f} {latency['p95']:>8.2f} "
+                f"{latency['p99']:>8.2f} {result['queries']['mean']:>8.1f} "
+                f"{result['errors']:>6}")
@@ -0,0 +1,246 @@
+import asyncio
+import importlib
+import io
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.test.utils import override_settings
+from django.urls import clear_url_caches
+from rest_framework.authtoken.models import Token
+
+MODES = ('wsgi', 'asgi-sync', 'asgi-async')
+HOST = 'localhost'
+
+
+@contextmanager
+def recipe_routes(async_views):
+    """Route the recipe API to its sync or native async views"""
+    def reload_urls():
+        importlib.reload(importlib.import_module('recipe.urls'))
+        importlib.reload(importlib.import_module(settings.ROOT_URLCONF))
+        clear_url_caches()
+
+    try:
+        # cached lists would skip the queries, and so the views' waits
+        with override_settings(RECIPE_ASYNC_VIEWS=async_views,
+                               RECIPE_LIST_CACHE_TIMEOUT=0):
+            reload_urls()
+            yield
+    finally:
+        reload_urls()
+
+
+@contextmanager
+def query_delay(seconds):
+    """Add a database round trip of some seconds to every query
+
+    The wait blocks the thread running the view, as a remote database
+    would: the one thread sync views share under ASGI, a worker of the
+    WSGI pool or an executor thread of a native async view.
+    """
+    def delayed(execute, sql, params, many, context):
+        time.sleep(seconds)
+        return execute(sql, params, many, context)
+
+    def install(connection, **kwargs):
+        if delayed not in connection.execute_wrappers:
+            connection.execute_wrappers.append(delayed)
+
+    if not seconds:
+        yield
+        return
+
+    # connections opened later, by other threads too, get it on connect
+    connection_created.connect(install)
+    for connection in connections.all():
+        install(connection)
+    try:
+        yield
+    finally:
+        connection_created.disconnect(install)
+        for connection in connections.all():
+            if delayed in connection.execute_wrappers:
+                connection.execute_wrappers.remove(delayed)
+
+
+def wsgi_call(app, path, token, delay):
+    """Serve one request, the worker held while the client sends it"""
+    time.sleep(delay)
+    environ = {
+        'REQUEST_METHOD': 'GET',
+        'SCRIPT_NAME': '',
+        'PATH_INFO': path,
+        'QUERY_STRING': '',
+        'SERVER_NAME': HOST,
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'HTTP_HOST': HOST,
+        'HTTP_AUTHORIZATION': f'Token {token}',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': io.BytesIO(),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    status = []
+    body = app(environ, lambda s, headers, exc_info=None: status.append(s))
+    try:
+        for _ in body:
+            pass
+    finally:
+        body.close()
+
+    return int(status[0].split()[0])
+
+
+async def asgi_call(app, path, token, delay):
+    """Serve one request from a client slow to send it"""
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': b'',
+        'root_path': '',
+        'headers': [
+            (b'host', HOST.encode()),
+            (b'authorization', f'Token {token}'.encode()),
+        ],
+        'client': ('127.0.0.1', 0),
+        'server': (HOST, 80),
+    }
+    status = []
+
+    async def receive():
+        await asyncio.sleep(delay)
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            status.append(message['status'])
+
+    await app(scope, receive, send)
+
+    return status[0]
+
+
+async def run_clients(call, concurrency, requests):
+    """Issue requests from concurrent clients, return latencies and errors"""
+    latencies, errors = [], 0
+    remaining = iter(range(requests))
+
+    async def client():
+        nonlocal errors
+        for _ in remaining:
+            started = time.perf_counter()
+            status = await call()
+            latencies.append(time.perf_counter() - started)
+            errors += status >= 400
+
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+
+    return latencies, errors
+
+
+class Command(BaseCommand):
+    """Django command to compare request concurrency under WSGI and ASGI"""
+    help = ('Serve concurrent requests from slow clients, to a slow '
+            'database, in process through the WSGI handler on a fixed thread '
+            'pool, and the ASGI handler with sync or native async recipe '
+            'views.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--email', required=True,
+            help='User the requests authenticate as')
+        parser.add_argument(
+            '--path', default='/api/recipe/recipes/',
+            help='Path requested')
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument(
+            '--concurrency', type=int, default=50,
+            help='Clients sending requests at the same time')
+        parser.add_argument(
+            '--threads', type=int, default=4,
+            help='Worker threads of the WSGI server')
+        parser.add_argument(
+            '--client-delay', type=float, default=0.05,
+            help='Seconds each client takes to send its request, which '
+                 'holds a WSGI worker but no ASGI thread')
+        parser.add_argument(
+            '--query-delay', type=float, default=0.005,
+            help='Seconds added to every query, holding the thread the '
+                 'view runs in: the shared sync thread under asgi-sync')
+        parser.add_argument(
+            '--modes', default=','.join(MODES),
+            help=f"Comma separated subset of {', '.join(MODES)}")
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        modes = [m.strip() for m in options['modes'].split(',') if m.strip()]
+        unknown = set(modes) - set(MODES)
+        if unknown:
+            raise CommandError(f"Unknown modes: {', '.join(sorted(unknown))}")
+        try:
+            user = get_user_model().objects.get(email=options['email'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"No user {options['email']}")
+        token, _ = Token.objects.get_or_create(user=user)
+
+        self.stdout.write(
+            f"{options['requests']} requests to {options['path']} from "
+            f"{options['concurrency']} clients, "
+            f"{options['client_delay'] * 1000:.0f}ms to send each, "
+            f"{options['query_delay'] * 1000:.0f}ms per query")
+        for mode in modes:
+            with recipe_routes(async_views=mode == 'asgi-async'), \
+                    query_delay(options['query_delay']):
+                started = time.perf_counter()
+                latencies, errors = asyncio.run(
+                    self.run_mode(mode, token.key, options))
+                elapsed = time.perf_counter() - started
+            self.report(mode, latencies, errors, elapsed)
+
+    async def run_mode(self, mode, token, options):
+        """Run the benchmark through one server mode"""
+        path, delay = options['path'], options['client_delay']
+        if mode == 'wsgi':
+            app = get_wsgi_application()
+            loop = asyncio.get_running_loop()
+            with ThreadPoolExecutor(options['threads']) as pool:
+                return await run_clients(
+                    lambda: loop.run_in_executor(
+                        pool, wsgi_call, app, path, token, delay),
+                    options['concurrency'], options['requests'])
+
+        app = get_asgi_application()
+        return await run_clients(
+            lambda: asgi_call(app, path, token, delay),
+            options['concurrency'], options['requests'])
+
+    def report(self, mode, latencies, errors, elapsed):
+        """Write the throughput and latency of a mode"""
+        if len(latencies) > 1:
+            cuts = statistics.quantiles(latencies, n=100)
+            p50, p95 = cuts[49], cuts[94]
+        else:
+            p50 = p95 = latencies[0] if latencies else 0
+        self.stdout.write(
+            f'{mode:<10} {len(latencies) / elapsed:8.1f} req/s  '
+            f'p50 {p50 * 1000:7.1f}ms  p95 {p95 * 1000:7.1f}ms  '
+            f'errors {errors}')
@@ -0,0 +1,107 @@
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.signals import request_finished, request_started
+from django.db import connections
+
+from core.db.pool import discard_pool
+
+POOLED_ENGINE = 'core.db.backends.postgresql'
+
+MODES = {
+    # mode: (CONN_MAX_AGE, use the pool)
+    'close': (0, False),
+    'persistent': (600, False),
+    'pool': (0, True),
+}
+
+
+class Command(BaseCommand):
+    """Django command to measure per request database connection overhead"""
+    help = ('Run simulated requests, each one query between the '
+            'request_started/request_finished signals, from concurrent '
+            'threads with connections closed per request, kept persistent '
+            'or taken from the pool.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--database', default='default')
+        parser.add_argument(
+            '--modes',
+            help=f"Comma separated subset of {', '.join(MODES)}, all those "
+                 "the database supports by default")
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        alias = options['database']
+        settings_dict = connections.databases[alias]
+        pooled = settings_dict['ENGINE'] == POOLED_ENGINE
+        if options['modes']:
+            modes = [m.strip() for m in options['modes'].split(',')
+                     if m.strip()]
+        else:
+            modes = [mode for mode in MODES if pooled or mode != 'pool']
+        unknown = set(modes) - set(MODES)
+        if unknown:
+            raise CommandError(f"Unknown modes: {', '.join(sorted(unknown))}")
+        if 'pool' in modes and not pooled:
+            raise CommandError(f'The pool needs the {POOLED_ENGINE} engine')
+
+        saved = {key: settings_dict.get(key)
+                 for key in ('CONN_MAX_AGE', 'POOL')}
+        try:
+            for mode in modes:
+                max_age, pool = MODES[mode]
+                settings_dict['CONN_MAX_AGE'] = max_age
+                settings_dict['POOL'] = {
+                    'MAX_SIZE': options['threads'] if pool else 0}
+                self.report(mode, *self.run(alias, options))
+                if pool:
+                    self.reset_pool(alias)
+        finally:
+            settings_dict.update(saved)
+
+    def run(self, alias, options):
+        """Run the simulated requests, return latencies and elapsed time"""
+        def handle_request(_):
+            started = time.perf_counter()
+            request_started.send(sender=self.__class__)
+            try:
+                with connections[alias].cursor() as cursor:
+                    cursor.execute('SELECT 1')
+                    cursor.fetchone()
+            finally:
+                request_finished.send(sender=self.__class__)
+            return time.perf_counter() - started
+
+        threads = options['threads']
+        barrier = threading.Barrier(threads)
+
+        def close(_):
+            # the barrier makes every worker thread close its own connection
+            barrier.wait()
+            connections[alias].close()
+
+        with ThreadPoolExecutor(threads) as executor:
+            started = time.perf_counter()
+            latencies = list(executor.map(
+                handle_request, range(options['requests'])))
+            elapsed = time.perf_counter() - started
+            list(executor.map(close, range(threads)))
+
+        return latencies, elapsed
+
+    def reset_pool(self, alias):
+        discard_pool(alias)
+
+    def report(self, mode, latencies, elapsed):
+        """Write the throughput and latency of a mode"""
+        cuts = statistics.quantiles(latencies, n=100) \
+            if len(latencies) > 1 else latencies * 99
+        self.stdout.write(
+            f'{mode:<11} {len(latencies) / elapsed:8.1f} req/s  '
+            f'p50 {cuts[49] * 1000:6.2f}ms  p95 {cuts[94] * 1000:6.2f}ms')
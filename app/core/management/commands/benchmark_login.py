@@ -0,0 +1,82 @@
+import statistics
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import get_hasher
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from core import hashers
+
+
+class Command(BaseCommand):
+    """Django command to measure the throughput of the token endpoint"""
+    help = ('Log a throwaway user in repeatedly from concurrent threads and '
+            'report logins/s under the configured password hasher.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=100)
+        parser.add_argument(
+            '--threads', type=int, default=4,
+            help='Concurrent clients logging in')
+        parser.add_argument(
+            '--hash-workers', type=int,
+            help='Override PASSWORD_HASH_WORKERS, 0 hashes in thread')
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        if options['requests'] < 1 or options['threads'] < 1:
+            raise CommandError('--requests and --threads must be positive')
+        overrides = {}
+        if options['hash_workers'] is not None:
+            overrides['PASSWORD_HASH_WORKERS'] = options['hash_workers']
+
+        password = uuid.uuid4().hex
+        user = get_user_model().objects.create_user(
+            f'benchmark-{uuid.uuid4().hex}@example.com', password)
+        try:
+            with override_settings(**overrides):
+                self.stdout.write(
+                    f"Hasher {get_hasher('default').algorithm}, "
+                    f"{options['threads']} threads")
+                self.run(user.email, password, options)
+        finally:
+            user.delete()
+            if hashers._executor is not None:
+                hashers._executor.shutdown()
+                hashers._executor = None
+
+    def run(self, email, password, options):
+        """Log in concurrently and report throughput and latency"""
+        url = reverse('user:token')
+        payload = {'email': email, 'password': password}
+
+        def login(_):
+            client = Client(HTTP_HOST='localhost')
+            started = time.perf_counter()
+            try:
+                res = client.post(url, payload)
+            finally:
+                close_old_connections()
+            return time.perf_counter() - started, res.status_code
+
+        with ThreadPoolExecutor(options['threads']) as pool:
+            # untimed logins so pools and upgraded hashes are in place
+            list(pool.map(login, range(options['threads'])))
+            started = time.perf_counter()
+            results = list(pool.map(login, range(options['requests'])))
+            elapsed = time.perf_counter() - started
+
+        latencies = [latency for latency, _ in results]
+        errors = sum(status != 200 for _, status in results)
+        cuts = statistics.quantiles(latencies, n=100) \
+            if len(latencies) > 1 else latencies * 99
+        self.stdout.write(
+            f'{len(results) / elapsed:.1f} logins/s  '
+            f'p50 {cuts[49] * 1000:.1f}ms  p95 {cuts[94] * 1000:.1f}ms  '
+            f'errors {errors}')
@@ -0,0 +1,303 @@
+import csv
+import io
+import json
+import os
+import time
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.db.backends.base.operations import BaseDatabaseOperations
+
+from core.models import Tag, Ingredient, Recipe
+from recipe.bulk import ensure_names, insert_recipes
+from recipe.cache import bump_user_version
+from recipe.counters import count_new_recipes
+from recipe.search import refresh_search_index
+
+RECIPE_COLUMNS = ('id', 'user_id', 'title', 'time_minutes', 'price', 'link',
+                  'image', 'image_status')
+
+# separates tag/ingredient names inside a CSV cell
+CSV_LIST_SEPARATOR = '|'
+
+# largest time_minutes every database stores, Postgres' integer
+MAX_TIME_MINUTES = \
+    BaseDatabaseOperations.integer_field_ranges['IntegerField'][1]
+
+
+def _checked_length(model, field, value):
+    """Return a text value, ValueError if longer than its column allows"""
+    max_length = model._meta.get_field(field).max_length
+    if len(value) > max_length:
+        raise ValueError(f'{field} longer than {max_length} characters')
+
+    return value
+
+
+def _checked_price(price):
+    """Return a price, ValueError if it has too many digits to store"""
+    field = Recipe._meta.get_field('price')
+    if abs(price) >= 10 ** (field.max_digits - field.decimal_places):
+        raise ValueError(f'price over {field.max_digits} digits')
+
+    return price
+
+
+def parse_record(raw):
+    """Validate a raw input record and return it normalized
+
+    Values the database would reject, like over long names, are errors
+    here, so one bad record can't fail the transaction of its chunk.
+    """
+    kind = raw.get('type') or 'recipe'
+    user = str(raw.get('user') or '').strip()
+    if not user:
+        raise ValueError('missing user')
+
+    if kind in ('tag', 'ingredient'):
+        name = str(raw.get('name') or '').strip()
+        if not name:
+            raise ValueError('missing name')
+        model = Tag if kind == 'tag' else Ingredient
+        return {'type': kind, 'user': user,
+                'name': _checked_length(model, 'name', name)}
+    if kind != 'recipe':
+        raise ValueError(f'unknown type {kind!r}')
+
+    title = str(raw.get('title') or '').strip()
+    if not title:
+        raise ValueError('missing title')
+    try:
+        time_minutes = int(raw.get('time_minutes'))
+        price = Decimal(str(raw.get('price'))).quantize(Decimal('0.01'))
+    except (TypeError, ValueError, InvalidOperation):
+        raise ValueError('invalid time_minutes or price')
+    if not 0 <= time_minutes <= MAX_TIME_MINUTES:
+        raise ValueError('time_minutes out of range')
+
+    def names(value, model):
+        if isinstance(value, str):
+            value = value.split(CSV_LIST_SEPARATOR)
+        return [_checked_length(model, 'name', str(name).strip())
+                for name in value or () if str(name).strip()]
+
+    return {
+        'type': 'recipe',
+        'user': user,
+        'title': _checked_length(Recipe, 'title', title),
+        'time_minutes': time_minutes,
+        'price': _checked_price(price),
+        'link': _checked_length(Recipe, 'link', str(raw.get('link') or '')),
+        'tags': names(raw.get('tags'), Tag),
+        'ingredients': names(raw.get('ingredients'), Ingredient),
+    }
+
+
+def _csv_buffer(rows):
+    """Return rows as a CSV file COPY can read, with None as NULL"""
+    buffer = io.StringIO()
+    # strings are quoted so blanks stay blank, unquoted empties are NULL
+    csv.writer(buffer, quoting=csv.QUOTE_NONNUMERIC).writerows(rows)
+    buffer.seek(0)
+
+    return buffer
+
+
+def copy_recipes(recipes, links, using):
+    """Insert recipes and their through table rows with COPY"""
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT nextval(pg_get_serial_sequence('core_recipe', 'id')) "
+            "FROM generate_series(1, %s)", [len(recipes)])
+        for recipe, (pk,) in zip(recipes, cursor.fetchall()):
+            recipe.pk = pk
+
+        cursor.copy_expert(
+            f"COPY core_recipe ({', '.join(RECIPE_COLUMNS)}) "
+            "FROM STDIN WITH (FORMAT csv)",
+            _csv_buffer(
+                [recipe.pk, recipe.user_id, recipe.title, recipe.time_minutes,
+                 recipe.price, recipe.link, None, recipe.image_status]
+                for recipe in recipes
+            ),
+        )
+        for name in ('tags', 'ingredients'):
+            field = Recipe._meta.get_field(name)
+            column = f'{field.m2m_reverse_field_name()}_id'
+            cursor.copy_expert(
+                f'COPY {field.remote_field.through._meta.db_table} '
+                f'(recipe_id, {column}) FROM STDIN WITH (FORMAT csv)',
+                _csv_buffer(
+                    [recipe.pk, related_id]
+                    for recipe, related in zip(recipes, links)
+                    for related_id in set(related[name])
+                ),
+            )
+
+    count_new_recipes(recipes, links, using=using)
+    refresh_search_index([recipe.pk for recipe in recipes], using=using)
+    for user_id in {recipe.user_id for recipe in recipes}:
+        bump_user_version(user_id)
+
+
+class Command(BaseCommand):
+    """Django command to bulk import recipes, tags and ingredients"""
+    help = ('Import recipes, tags and ingredients from NDJSON or CSV. '
+            'Records name their owner by email and their tags/ingredients '
+            f'by name, CSV cells separate names with "{CSV_LIST_SEPARATOR}".')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='NDJSON or CSV file to import')
+        parser.add_argument(
+            '--format', choices=('ndjson', 'csv'),
+            help='Input format, guessed from the file extension by default')
+        parser.add_argument(
+            '--chunk-size', type=int, default=5000,
+            help='Records imported per transaction')
+        parser.add_argument(
+            '--checkpoint',
+            help='File recording progress, so a rerun resumes after it')
+        parser.add_argument(
+            '--no-copy', action='store_true',
+            help='Use bulk_create even when COPY is available')
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        path = options['path']
+        fmt = options['format'] or (
+            'csv' if path.lower().endswith('.csv') else 'ndjson')
+        chunk_size = options['chunk_size']
+        if chunk_size < 1:
+            raise CommandError('--chunk-size must be positive')
+        checkpoint = options['checkpoint']
+        using = Recipe.objects.db
+        use_copy = connections[using].vendor == 'postgresql' \
+            and not options['no_copy']
+
+        done = self.read_checkpoint(checkpoint)
+        if done:
+            self.stdout.write(f'Resuming after {done} records...')
+
+        started = time.monotonic()
+        imported = skipped = 0
+        with open(path, newline='', encoding='utf-8') as source:
+            records = islice(self.read_records(source, fmt), done, None)
+            while True:
+                chunk = list(islice(records, chunk_size))
+                if not chunk:
+                    break
+                chunk_imported, chunk_skipped = self.import_chunk(
+                    chunk, use_copy, using)
+                imported += chunk_imported
+                skipped += chunk_skipped
+                done += len(chunk)
+                self.write_checkpoint(checkpoint, done)
+
+                elapsed = max(time.monotonic() - started, 1e-6)
+                self.stdout.write(
+                    f'{done} records processed, {imported} imported '
+                    f'({imported / elapsed:.0f} rows/s)')
+
+        elapsed = max(time.monotonic() - started, 1e-6)
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {imported} records, skipped {skipped} '
+            f'in {elapsed:.1f}s ({imported / elapsed:.0f} rows/s)'))
+
+    def read_records(self, source, fmt):
+        """Yield (line number, raw record) pairs, one at a time"""
+        if fmt == 'csv':
+            for number, row in enumerate(csv.DictReader(source), start=2):
+                yield number, row
+            return
+
+        for number, line in enumerate(source, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield number, json.loads(line)
+            except ValueError:
+                yield number, None
+
+    def import_chunk(self, chunk, use_copy, using):
+        """Import a chunk of raw records and return (imported, skipped)"""
+        records = []
+        for number, raw in chunk:
+            try:
+                if not isinstance(raw, dict):
+                    raise ValueError('not a JSON object')
+                records.append(parse_record(raw))
+            except ValueError as exc:
+                self.stderr.write(f'Line {number}: {exc}, skipped')
+
+        users = dict(
+            get_user_model().objects.filter(
+                email__in={record['user'] for record in records}
+            ).values_list('email', 'id')
+        )
+        missing = {r['user'] for r in records} - set(users)
+        for email in sorted(missing):
+            self.stderr.write(f'Unknown user {email}, records skipped')
+        records = [r for r in records if r['user'] in users]
+
+        tag_pairs, ingredient_pairs = set(), set()
+        for record in records:
+            user_id = users[record['user']]
+            if record['type'] == 'tag':
+                tag_pairs.add((user_id, record['name']))
+            elif record['type'] == 'ingredient':
+                ingredient_pairs.add((user_id, record['name']))
+            else:
+                tag_pairs.update((user_id, n) for n in record['tags'])
+                ingredient_pairs.update(
+                    (user_id, n) for n in record['ingredients'])
+
+        with transaction.atomic(using=using):
+            tag_ids = ensure_names(Tag, tag_pairs)
+            ingredient_ids = ensure_names(Ingredient, ingredient_pairs)
+
+            recipes, links = [], []
+            for record in records:
+                if record['type'] != 'recipe':
+                    continue
+                user_id = users[record['user']]
+                recipes.append(Recipe(
+                    user_id=user_id,
+                    title=record['title'],
+                    time_minutes=record['time_minutes'],
+                    price=record['price'],
+                    link=record['link'],
+                ))
+                links.append({
+                    'tags': [tag_ids[(user_id, name)]
+                             for name in record['tags']],
+                    'ingredients': [ingredient_ids[(user_id, name)]
+                                    for name in record['ingredients']],
+                })
+
+            if recipes and use_copy:
+                copy_recipes(recipes, links, using)
+            elif recipes:
+                insert_recipes(recipes, links)
+
+        return len(records), len(chunk) - len(records)
+
+    def read_checkpoint(self, checkpoint):
+        """Return how many records a previous run already processed"""
+        if not checkpoint or not os.path.exists(checkpoint):
+            return 0
+        with open(checkpoint) as f:
+            return json.load(f)['records']
+
+    def write_checkpoint(self, checkpoint, done):
+        """Record progress once a chunk is committed"""
+        if not checkpoint:
+            return
+        tmp = f'{checkpoint}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump({'records': done}, f)
+        os.replace(tmp, checkpoint)
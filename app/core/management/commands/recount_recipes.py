@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from recipe.counters import recount
+
+
+class Command(BaseCommand):
+    """Django command to recompute the denormalized recipe counters"""
+    help = ('Recompute the recipe_count of every user, tag and ingredient '
+            'from the recipe tables, fixing any drift.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=10000,
+            help='Rows checked per UPDATE statement')
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive')
+
+        fixed = recount(batch_size=options['batch_size'])
+        for model, count in fixed.items():
+            self.stdout.write(
+                f'{model._meta.verbose_name_plural}: {count} fixed')
+        self.stdout.write(self.style.SUCCESS('Recipe counters up to date'))
@@ -1,22 +1,53 @@
+import random
 import time
 
-from django.db import connections
+from django.db import DEFAULT_DB_ALIAS
 from django.db.utils import OperationalError
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+
+from core.health import check_database
 
 
 class Command(BaseCommand):
     """Django command to pause execution until database is available"""
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database', default=DEFAULT_DB_ALIAS,
+            help='Database alias to wait for')
+        parser.add_argument(
+            '--timeout', type=float, default=60,
+            help='Seconds to wait before giving up')
+        parser.add_argument(
+            '--initial-delay', type=float, default=0.1,
+            help='Upper bound of the first retry delay in seconds')
+        parser.add_argument(
+            '--max-delay', type=float, default=5,
+            help='Upper bound of any retry delay in seconds')
+
     def handle(self, *args, **options):
         """Handle the command"""
         self.stdout.write('Waiting for database...')
-        db_conn = None
-        while not db_conn:
+        deadline = time.monotonic() + options['timeout']
+        attempt = 0
+        while True:
             try:
-                db_conn = connections['default']
-            except OperationalError:
-                self.stdout.write('Database unavailable, waiting 1 second...')
-                time.sleep(1)
+                check_database(options['database'])
+                break
+            except OperationalError as exc:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise CommandError(
+                        f"Database unavailable after {options['timeout']}s: "
+                        f"{exc}")
+                # exponential backoff with full jitter, so restarting
+                # containers don't retry in lockstep
+                cap = min(options['max_delay'],
+                          options['initial_delay'] * 2 ** attempt)
+                delay = min(random.uniform(0, cap), remaining)
+                attempt += 1
+                self.stdout.write(
+                    f'Database unavailable, waiting {delay:.2f} seconds...')
+                time.sleep(delay)
 
         self.stdout.write(self.style.SUCCESS('Database available!'))
@@ -0,0 +1,83 @@
+import hmac
+import ipaddress
+import os
+
+from django.conf import settings  # noqa
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY,  # noqa
+                               CollectorRegistry, Counter, Histogram,  # noqa
+                               generate_latest, multiprocess)  # noqa
+
+# Prometheus metrics of the API, kept in process or, with the
+# prometheus_multiproc_dir environment variable set before start up, in
+# memory mapped files there that every worker process writes and /metrics
+# sums. Empty that directory whenever the server (re)starts.
+
+LATENCY_BUCKETS = (.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+REQUESTS = Counter(
+    'recipe_api_requests_total', 'Requests served, by view and status',
+    ['view', 'method', 'status'])
+ERRORS = Counter(
+    'recipe_api_request_errors_total', 'Requests failed with a 5xx status',
+    ['view', 'method'])
+LATENCY = Histogram(
+    'recipe_api_request_duration_seconds', 'Time taken to respond',
+    ['view', 'method'], buckets=LATENCY_BUCKETS)
+QUERIES = Histogram(
+    'recipe_api_request_queries', 'Database queries made per request',
+    ['view', 'method'], buckets=QUERY_BUCKETS)
+CACHE_LOOKUPS = Counter(
+    'recipe_api_cache_lookups_total', 'Cache lookups, by cache and result',
+    ['cache', 'result'])
+
+
+def enabled():
+    return getattr(settings, 'METRICS_ENABLED', False)
+
+
+def may_scrape(request):
+    """Return whether a request may read the metrics
+
+    Either its bearer token is METRICS_TOKEN or it comes from an address
+    in METRICS_ALLOWED_IPS, networks like 10.0.0.0/8 included.
+    """
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    header = request.META.get('HTTP_AUTHORIZATION', '')
+    if token and hmac.compare_digest(header.encode(),
+                                     f'Bearer {token}'.encode()):
+        return True
+
+    try:
+        address = ipaddress.ip_address(request.META.get('REMOTE_ADDR', ''))
+    except ValueError:
+        return False
+
+    return any(address in ipaddress.ip_network(allowed, strict=False)
+               for allowed in getattr(settings, 'METRICS_ALLOWED_IPS', ()))
+
+
+def observe_request(view, method, status, seconds, queries):
+    """Record a served request"""
+    REQUESTS.labels(view, method, status).inc()
+    if status >= 500:
+        ERRORS.labels(view, method).inc()
+    LATENCY.labels(view, method).observe(seconds)
+    QUERIES.labels(view, method).observe(queries)
+
+
+def record_cache_lookup(cache, hit):
+    """Count a hit or miss of a cache, e.g. 'list' or 'token'"""
+    if enabled():
+        CACHE_LOOKUPS.labels(cache, 'hit' if hit else 'miss').inc()
+
+
+def collect():
+    """Return every metric in the text format and its content type"""
+    if os.environ.get('prometheus_multiproc_dir'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,257 @@
+import asyncio
+import logging
+import time
+
+from asgiref.sync import async_to_sync, sync_to_async
+
+from django.conf import settings  # noqa
+from django.core.exceptions import MiddlewareNotUsed  # noqa
+from django.http import HttpResponse, JsonResponse  # noqa
+
+from core import metrics, profiling  # noqa
+from core.timing import (current_timing, install_query_timers,  # noqa
+                         start_timing, stop_timing)  # noqa
+
+logger = logging.getLogger(__name__)
+
+
+def view_name(request, view_func):
+    """Return a readable view name, like RecipeViewSet.list"""
+    cls = getattr(view_func, 'cls', None)
+    if cls is None:
+        return getattr(view_func, '__name__', type(view_func).__name__)
+
+    action = (getattr(view_func, 'actions', None) or {}).get(
+        request.method.lower())
+
+    return f'{cls.__name__}.{action}' if action else cls.__name__
+
+
+def resolved_view_name(request):
+    """Return the name of the view a request was routed to, if any"""
+    match = getattr(request, 'resolver_match', None)
+
+    return view_name(request, match.func) if match is not None else None
+
+
+class AsyncCapableMiddleware:
+    """Run a middleware natively in sync and in async handler chains
+
+    Django awaits the middleware when the next handler is a coroutine,
+    so async requests don't wait for the one thread sync code shares.
+    Subclasses route async requests through `__acall__`.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            # as Django's MiddlewareMixin, mark instances as coroutines
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+
+def server_timing(timing, total):
+    """Return the Server-Timing header value of a timed request"""
+    metrics = [
+        f'db;dur={timing.db_time * 1000:.1f};desc="{timing.queries} queries"'
+    ]
+    metrics.extend(
+        f'{name};dur={seconds * 1000:.1f}'
+        for name, seconds in timing.spans.items()
+    )
+    metrics.append(f'total;dur={total * 1000:.1f}')
+
+    return ', '.join(metrics)
+
+
+class RequestTimingMiddleware(AsyncCapableMiddleware):
+    """Time queries, serialization and rendering of every request
+
+    Adds a Server-Timing header and logs slow requests and queries with
+    the name of their view. Unloaded unless REQUEST_TIMING is set.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'REQUEST_TIMING', False):
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+        self.slow_request = getattr(
+            settings, 'REQUEST_TIMING_SLOW_REQUEST_MS', 500) / 1000
+        self.slow_query = getattr(
+            settings, 'REQUEST_TIMING_SLOW_QUERY_MS', 100) / 1000
+        install_query_timers()
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+
+        token = start_timing(self.slow_query)
+        try:
+            response = self.get_response(request)
+            timing = current_timing()
+        finally:
+            stop_timing(token)
+
+        return self.report(request, response, timing)
+
+    async def __acall__(self, request):
+        token = start_timing(self.slow_query)
+        try:
+            response = await self.get_response(request)
+            timing = current_timing()
+        finally:
+            stop_timing(token)
+
+        return self.report(request, response, timing)
+
+    def report(self, request, response, timing):
+        """Add the Server-Timing header, log if slow"""
+        total = timing.elapsed()
+        response['Server-Timing'] = server_timing(timing, total)
+        name = resolved_view_name(request) or '-'
+        if total >= self.slow_request:
+            logger.warning('Slow request %s %s (%s): %s', request.method,
+                           request.path, name, response['Server-Timing'])
+        for elapsed, sql in timing.slow_queries:
+            logger.warning('Slow query in %s (%.1fms): %s',
+                           name, elapsed * 1000, sql)
+
+        return response
+
+    def process_template_response(self, request, response):
+        """Count the time rendering the response, e.g. DRF's, as render"""
+        timing = current_timing()
+        if timing is not None:
+            started = time.perf_counter()
+
+            def rendered(response):
+                timing.spans['render'] += time.perf_counter() - started
+
+            response.add_post_render_callback(rendered)
+
+        return response
+
+
+class MetricsMiddleware(AsyncCapableMiddleware):
+    """Record count, errors, latency and queries of requests per view
+
+    Requests are labelled by view name, like TagViewSet.list. Shares the
+    timing of RequestTimingMiddleware when that is on. Unloaded unless
+    METRICS_ENABLED is set.
+    """
+
+    def __init__(self, get_response):
+        if not metrics.enabled():
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+        install_query_timers()
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+
+        token = start_timing() if current_timing() is None else None
+        timing = current_timing()
+        try:
+            response = self.get_response(request)
+        finally:
+            if token is not None:
+                stop_timing(token)
+
+        return self.observe(request, response, timing)
+
+    async def __acall__(self, request):
+        token = start_timing() if current_timing() is None else None
+        timing = current_timing()
+        try:
+            response = await self.get_response(request)
+        finally:
+            if token is not None:
+                stop_timing(token)
+
+        return self.observe(request, response, timing)
+
+    def observe(self, request, response, timing):
+        """Record the served request"""
+        metrics.observe_request(
+            resolved_view_name(request) or 'none', request.method,
+            response.status_code, timing.elapsed(), timing.queries)
+
+        return response
+
+
+class ProfilingMiddleware(AsyncCapableMiddleware):
+    """Profile requests of staff users who ask for it
+
+    `?_profile=cprofile` or an `X-Profile: cprofile` header runs the
+    request under cProfile and replaces its response by a summary of the
+    slowest functions and the SQL run, or by the raw pstats file with
+    `?_profile_format=pstats`. Unloaded unless REQUEST_PROFILING is set,
+    and requests of other users are served as usual. Under ASGI profiled
+    requests run on the thread sync code shares, and are profiled there.
+    """
+    profilers = ('cprofile',)
+    formats = ('summary', 'pstats')
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'REQUEST_PROFILING', False):
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+        self.top = getattr(settings, 'REQUEST_PROFILING_TOP', 30)
+
+    def _option(self, request, name):
+        return request.GET.get(f'_{name}') \
+            or request.META.get(f'HTTP_X_{name.upper()}')
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not self._option(request, 'profile'):
+            return self.get_response(request)
+
+        return self.profile(request, self.get_response)
+
+    async def __acall__(self, request):
+        if not self._option(request, 'profile'):
+            return await self.get_response(request)
+
+        # checking the user queries, and cProfile follows one thread
+        return await sync_to_async(self.profile, thread_sensitive=True)(
+            request, async_to_sync(self.get_response))
+
+    def profile(self, request, get_response):
+        """Serve a request asking for a profile, profiled if staff"""
+        profiler = self._option(request, 'profile')
+        if not profiling.is_staff_request(request):
+            return get_response(request)
+
+        fmt = self._option(request, 'profile_format') or 'summary'
+        sort = self._option(request, 'profile_sort') or 'cumulative'
+        for name, value, choices in (('profile', profiler, self.profilers),
+                                     ('profile_format', fmt, self.formats),
+                                     ('profile_sort', sort,
+                                      profiling.SORT_KEYS)):
+            if value not in choices:
+                return JsonResponse(
+                    {name: f"Must be one of: {', '.join(choices)}"},
+                    status=400)
+
+        response, profile, query_log = profiling.profile(
+            get_response, request)
+        if fmt == 'pstats':
+            result = HttpResponse(profiling.dump_stats(profile),
+                                  content_type='application/octet-stream')
+            result['Content-Disposition'] = \
+                'attachment; filename="profile.pstats"'
+            result['X-Profile-Queries'] = len(query_log.queries)
+        else:
+            result = JsonResponse({
+                'status': response.status_code,
+                **profiling.summarize(profile, query_log, sort, self.top),
+            })
+        # a profile shows one user's request, never store it
+        result['Cache-Control'] = 'no-store'
+
+        return result
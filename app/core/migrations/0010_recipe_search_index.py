@@ -0,0 +1,68 @@
+from django.db import migrations
+
+
+POSTGRES_FORWARD = [
+    'ALTER TABLE core_recipe ADD COLUMN search_vector tsvector',
+    'CREATE INDEX core_recipe_search_vector_idx '
+    'ON core_recipe USING gin (search_vector)',
+    "UPDATE core_recipe r SET search_vector = "
+    "setweight(to_tsvector('english', r.title), 'A') || "
+    "setweight(to_tsvector('english', coalesce("
+    "(SELECT string_agg(x.name, ' ') FROM core_tag x "
+    "JOIN core_recipe_tags rx ON rx.tag_id = x.id "
+    "WHERE rx.recipe_id = r.id), '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce("
+    "(SELECT string_agg(x.name, ' ') FROM core_ingredient x "
+    "JOIN core_recipe_ingredients rx ON rx.ingredient_id = x.id "
+    "WHERE rx.recipe_id = r.id), '')), 'B')",
+]
+
+POSTGRES_BACKWARD = [
+    'DROP INDEX core_recipe_search_vector_idx',
+    'ALTER TABLE core_recipe DROP COLUMN search_vector',
+]
+
+SQLITE_FORWARD = [
+    'CREATE VIRTUAL TABLE core_recipe_search '
+    'USING fts5(title, tags, ingredients)',
+    "INSERT INTO core_recipe_search (rowid, title, tags, ingredients) "
+    "SELECT r.id, r.title, coalesce("
+    "(SELECT group_concat(x.name, ' ') FROM core_tag x "
+    "JOIN core_recipe_tags rx ON rx.tag_id = x.id "
+    "WHERE rx.recipe_id = r.id), ''), coalesce("
+    "(SELECT group_concat(x.name, ' ') FROM core_ingredient x "
+    "JOIN core_recipe_ingredients rx ON rx.ingredient_id = x.id "
+    "WHERE rx.recipe_id = r.id), '') "
+    "FROM core_recipe r",
+]
+
+SQLITE_BACKWARD = [
+    'DROP TABLE core_recipe_search',
+]
+
+
+def run_for_vendor(postgres, sqlite):
+    """Run the statements matching the database vendor"""
+    def run(apps, schema_editor):
+        statements = {
+            'postgresql': postgres,
+            'sqlite': sqlite,
+        }.get(schema_editor.connection.vendor, [])
+        for statement in statements:
+            schema_editor.execute(statement)
+
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_recipe_image_status'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run_for_vendor(POSTGRES_FORWARD, SQLITE_FORWARD),
+            run_for_vendor(POSTGRES_BACKWARD, SQLITE_BACKWARD),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 3.1.14 on 2026-10-17 20:42
+
+from django.db import migrations, models
+
+BACKFILL = [
+    'UPDATE core_user SET recipe_count = ('
+    'SELECT count(*) FROM core_recipe r WHERE r.user_id = core_user.id)',
+    'UPDATE core_tag SET recipe_count = ('
+    'SELECT count(*) FROM core_recipe_tags rx '
+    'WHERE rx.tag_id = core_tag.id)',
+    'UPDATE core_ingredient SET recipe_count = ('
+    'SELECT count(*) FROM core_recipe_ingredients rx '
+    'WHERE rx.ingredient_id = core_ingredient.id)',
+]
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_recipe_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingredient',
+            name='recipe_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='recipe_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='recipe_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunSQL(BACKFILL, migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,44 @@
+from django.db import migrations
+
+
+def rebuild_statements(tokenize):
+    """Recreate the sqlite search table with a tokenizer and refill it"""
+    return [
+        'DROP TABLE core_recipe_search',
+        'CREATE VIRTUAL TABLE core_recipe_search '
+        f"USING fts5(title, tags, ingredients, tokenize='{tokenize}')",
+        "INSERT INTO core_recipe_search (rowid, title, tags, ingredients) "
+        "SELECT r.id, r.title, coalesce("
+        "(SELECT group_concat(x.name, ' ') FROM core_tag x "
+        "JOIN core_recipe_tags rx ON rx.tag_id = x.id "
+        "WHERE rx.recipe_id = r.id), ''), coalesce("
+        "(SELECT group_concat(x.name, ' ') FROM core_ingredient x "
+        "JOIN core_recipe_ingredients rx ON rx.ingredient_id = x.id "
+        "WHERE rx.recipe_id = r.id), '') "
+        "FROM core_recipe r",
+    ]
+
+
+def run_on_sqlite(statements):
+    """Run the statements on sqlite, postgres already stems its vectors"""
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_recipe_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run_on_sqlite(rebuild_statements('porter unicode61')),
+            run_on_sqlite(rebuild_statements('unicode61')),
+        ),
+    ]
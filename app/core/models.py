@@ -36,46 +36,127 @@ class UserManager(BaseUserManager):
         return user
 
 
-class User(AbstractBaseUser, PermissionsMixin):
+class RecipeCountMixin:
+    """Keep save() from writing back a stale recipe_count
+
+    Only the F() updates of recipe.counters and recount_recipes write the
+    column, an instance in memory may hold an old count, e.g. a user from
+    the token cache.
+    """
+
+    def save(self, *args, **kwargs):
+        """Save the loaded fields but recipe_count of an existing row"""
+        if not self._state.adding and not kwargs.get('force_insert'):
+            update_fields = kwargs.get('update_fields')
+            if update_fields is None:
+                # like Model.save(), deferred fields are only saved when
+                # copying the obj to another database
+                deferred = self.get_deferred_fields() \
+                    if kwargs.get('using') in (None, self._state.db) \
+                    else set()
+                update_fields = [field.name
+                                 for field in self._meta.concrete_fields
+                                 if not field.primary_key
+                                 and field.attname not in deferred]
+            update_fields = [name for name in update_fields
+                             if name != 'recipe_count']
+            if not update_fields:
+                return
+            kwargs['update_fields'] = update_fields
+
+        super().save(*args, **kwargs)
+
+
+class User(RecipeCountMixin, AbstractBaseUser, PermissionsMixin):
     """Custom user models that supports using email instead of username"""
     email = models.EmailField(max_length=255, unique=True)
     name = models.CharField(max_length=255)
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
+    # number of recipes owned, kept by recipe.signals
+    recipe_count = models.IntegerField(default=0, editable=False)
 
     objects = UserManager()
 
     USERNAME_FIELD = 'email'
+    # fields whose change must stop cached tokens authenticating
+    AUTH_FIELDS = ('password', 'is_active')
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Load a user, remembering its auth fields as loaded"""
+        user = super().from_db(db, field_names, values)
+        user.remember_auth_fields()
 
-class Tag(models.Model):
+        return user
+
+    def remember_auth_fields(self):
+        self._loaded_auth = {name: self.__dict__.get(name)
+                             for name in self.AUTH_FIELDS}
+
+    def auth_fields_changed(self, update_fields=None):
+        """Return whether a save wrote a new password or is_active"""
+        if update_fields is not None and \
+                not set(self.AUTH_FIELDS) & set(update_fields):
+            return False
+        loaded = getattr(self, '_loaded_auth', None)
+        if loaded is None:
+            # not loaded from the database, so unknown
+            return True
+
+        return any(self.__dict__.get(name) != value
+                   for name, value in loaded.items())
+
+
+class Tag(RecipeCountMixin, models.Model):
     """Tag to be used for a recipe"""
     name = models.CharField(max_length=255)
     user = models.ForeignKey(settings.AUTH_USER_MODEL,
                              on_delete=models.CASCADE)
+    # number of recipes linked, kept by recipe.signals
+    recipe_count = models.IntegerField(default=0, editable=False)
 
     def __str__(self):
         return self.name
 
     class Meta:
         unique_together = ('name', 'user',)
+        indexes = [
+            models.Index(fields=['user', 'name'],
+                         name='core_tag_user_name_idx'),
+        ]
 
 
-class Ingredient(models.Model):
+class Ingredient(RecipeCountMixin, models.Model):
     """Ingredient to be used for a recipe"""
     name = models.CharField(max_length=255)
     user = models.ForeignKey(settings.AUTH_USER_MODEL,
                              on_delete=models.CASCADE)
+    # number of recipes linked, kept by recipe.signals
+    recipe_count = models.IntegerField(default=0, editable=False)
 
     def __str__(self):
         return self.name
 
     class Meta:
         unique_together = ('name', 'user',)
+        indexes = [
+            models.Index(fields=['user', 'name'],
+                         name='core_ingredient_user_name_idx'),
+        ]
 
 
 class Recipe(models.Model):
     """Recipe obj"""
+    IMAGE_PENDING = 'pending'
+    IMAGE_READY = 'ready'
+    IMAGE_FAILED = 'failed'
+    IMAGE_STATUS_CHOICES = (
+        (IMAGE_PENDING, 'Pending'),
+        (IMAGE_READY, 'Ready'),
+        (IMAGE_FAILED, 'Failed'),
+    )
+
     user = models.ForeignKey(settings.AUTH_USER_MODEL,
                              on_delete=models.CASCADE)
     title = models.CharField(max_length=255)
@@ -85,6 +166,14 @@ class Recipe(models.Model):
     ingredients = models.ManyToManyField('Ingredient')
     tags = models.ManyToManyField('Tag')
     image = models.ImageField(null=True, upload_to=recipe_image_file_path)
+    image_status = models.CharField(max_length=10, blank=True,
+                                    choices=IMAGE_STATUS_CHOICES)
 
     def __str__(self):
         return self.title
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-id'],
+                         name='core_recipe_user_id_desc_idx'),
+        ]
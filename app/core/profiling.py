@@ -0,0 +1,108 @@
+import cProfile
+import marshal
+import pstats
+import time
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.db import connections  # noqa
+from rest_framework.exceptions import AuthenticationFailed  # noqa
+
+from core.authentication import CachedTokenAuthentication  # noqa
+
+SORT_KEYS = ('cumulative', 'tottime', 'calls')
+
+# whether the current request is being profiled
+_profiling = ContextVar('profiling', default=False)
+
+
+class QueryLog:
+    """connection.execute_wrapper() keeping every query with its time"""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append({
+                'sql': sql,
+                'ms': round((time.perf_counter() - started) * 1000, 3),
+            })
+
+
+def is_staff_request(request):
+    """Return whether a session or token authenticates a staff user"""
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return user.is_staff
+
+    try:
+        auth = CachedTokenAuthentication().authenticate(request)
+    except AuthenticationFailed:
+        return False
+
+    return auth is not None and auth[0].is_staff
+
+
+def is_profiling():
+    """Return whether the current request is being profiled
+
+    Code that would move work to other threads should keep it on the
+    request thread then, which is the only one profiled.
+    """
+    return _profiling.get()
+
+
+def profile(get_response, request):
+    """Call get_response under cProfile on the request thread
+
+    Return (response, profiler, query log). Only queries made on the
+    request thread are logged, as only that thread is profiled.
+    """
+    profiler = cProfile.Profile()
+    query_log = QueryLog()
+    token = _profiling.set(True)
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(query_log))
+        profiler.enable()
+        try:
+            response = get_response(request)
+        finally:
+            profiler.disable()
+            _profiling.reset(token)
+    profiler.create_stats()
+
+    return response, profiler, query_log
+
+
+def dump_stats(profiler):
+    """Return the profile as a pstats file, e.g. for snakeviz or flameprof"""
+    return marshal.dumps(profiler.stats)
+
+
+def summarize(profiler, query_log, sort='cumulative', top=30):
+    """Return the top functions of a profile and the queries made"""
+    stats = pstats.Stats(profiler)
+    stats.sort_stats(sort)
+    functions = []
+    for func in stats.fcn_list[:top]:
+        primitive_calls, calls, tottime, cumtime, _ = stats.stats[func]
+        functions.append({
+            'function': pstats.func_std_string(func),
+            'calls': calls,
+            'primitive_calls': primitive_calls,
+            'tottime_ms': round(tottime * 1000, 3),
+            'cumtime_ms': round(cumtime * 1000, 3),
+        })
+
+    return {
+        'total_ms': round(stats.total_tt * 1000, 3),
+        'sort': sort,
+        'functions': functions,
+        'queries': query_log.queries,
+        'db_ms': round(sum(q['ms'] for q in query_log.queries), 3),
+    }
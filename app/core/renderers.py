@@ -0,0 +1,32 @@
+from rest_framework.renderers import JSONRenderer  # noqa
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSON renderer using orjson, byte for byte equal to JSONRenderer
+
+    Falls back to the stdlib encoder when orjson isn't installed or the
+    output has to be indented or ASCII only.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """Render `data` into JSON, returning a bytestring"""
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if (orjson is None or data is None or indent is not None
+                or not self.compact or self.ensure_ascii):
+            return super().render(data, accepted_media_type,
+                                  renderer_context)
+
+        # datetimes go through the DRF encoder for its formatting
+        ret = orjson.dumps(
+            data,
+            default=self.encoder_class().default,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME,
+        )
+        # keep output a strict javascript subset, as JSONRenderer does
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(
+            b'\xe2\x80\xa9', b'\\u2029')
@@ -0,0 +1,28 @@
+from django.db.models.signals import post_save, post_delete  # noqa
+from django.dispatch import receiver  # noqa
+from rest_framework.authtoken.models import Token  # noqa
+
+from core.authentication import token_cache  # noqa
+from core.models import User  # noqa
+
+
+@receiver(post_delete, sender=Token)
+def evict_deleted_token(sender, instance, **kwargs):
+    """Stop authenticating with a deleted token"""
+    token_cache.delete(instance.key)
+
+
+@receiver(post_save, sender=User)
+def evict_saved_user_tokens(sender, instance, created, update_fields=None,
+                            **kwargs):
+    """Drop cached tokens so deactivation/password changes apply at once
+
+    Other saves, like the last_login update of every login, skip the
+    token query.
+    """
+    if created or not instance.auth_fields_changed(update_fields):
+        return
+    keys = Token.objects.filter(user=instance).values_list('key', flat=True)
+    for key in keys:
+        token_cache.delete(key)
+    instance.remember_auth_fields()
@@ -1,3 +1,13 @@
 from .test_models import *  # noqa
 from .test_admin import *  # noqa
-from .test_commands import *  # noqa
\ No newline at end of file
+from .test_commands import *  # noqa
+from .test_indexes import *  # noqa
+from .test_authentication import *  # noqa
+from .test_renderers import *  # noqa
+from .test_hashers import *  # noqa
+from .test_db_backend import *  # noqa
+from .test_health import *  # noqa
+from .test_middleware import *  # noqa
+from .test_profiling import *  # noqa
+from .test_metrics import *  # noqa
+from .test_db_routers import *  # noqa
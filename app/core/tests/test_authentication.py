@@ -0,0 +1,196 @@
+import time
+from unittest.mock import patch
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import RequestFactory, TestCase
+from django.utils import timezone
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.request import Request
+from rest_framework.test import APIClient
+
+from core.authentication import (MAX_LOCAL_TTL, ResolvedTokenAuthentication,
+                                 token_cache)
+
+
+ME_URL = reverse('user:me')
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """Test the cached token authentication"""
+
+    def setUp(self):
+        token_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            'test@email.com',
+            'password'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_token_lookup_cached(self):
+        """Test that the token lookup round trip is only made once"""
+        with self.assertNumQueries(1):
+            res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['email'], self.user.email)
+
+    def test_invalid_token_not_cached(self):
+        """Test that unknown tokens are rejected and not cached"""
+        self.client.credentials(HTTP_AUTHORIZATION='Token invalid')
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(len(token_cache), 0)
+
+    def test_deleted_token_rejected(self):
+        """Test that a deleted token stops authenticating"""
+        self.client.get(ME_URL)
+
+        self.token.delete()
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_rejected(self):
+        """Test that deactivating a user drops their cached token"""
+        self.client.get(ME_URL)
+
+        self.user.is_active = False
+        self.user.save()
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_password_change_evicts_token(self):
+        """Test that changing the password evicts the cached token"""
+        self.client.get(ME_URL)
+        self.assertIsNotNone(token_cache.get(self.token.key))
+
+        self.user.set_password('newpassword')
+        self.user.save()
+
+        self.assertIsNone(token_cache.get(self.token.key))
+
+    def test_cache_bounded(self):
+        """Test that the least recently used entries are evicted"""
+        with self.settings(TOKEN_AUTH_CACHE_SIZE=2):
+            for key in ('a', 'b', 'c'):
+                token_cache.set(key, (self.user, self.token))
+
+            self.assertIsNone(token_cache.get('a'))
+            self.assertIsNotNone(token_cache.get('c'))
+            self.assertEqual(len(token_cache), 2)
+
+    def test_entries_expire(self):
+        """Test that entries are dropped after the TTL"""
+        with self.settings(TOKEN_AUTH_CACHE_TTL=-1):
+            token_cache.set('a', (self.user, self.token))
+
+            self.assertIsNone(token_cache.get('a'))
+
+    def test_local_ttl_capped(self):
+        """Test that a long TTL doesn't keep in process entries longer"""
+        later = time.monotonic() + MAX_LOCAL_TTL + 1
+        with self.settings(TOKEN_AUTH_CACHE_TTL=3600):
+            token_cache.set('a', (self.user, self.token))
+
+            with patch('core.authentication.time.monotonic',
+                       return_value=later):
+                self.assertIsNone(token_cache.get('a'))
+
+    def test_bulk_deactivation_rejected_after_local_ttl(self):
+        """Test that revoking through update() applies within the window"""
+        self.client.get(ME_URL)
+        get_user_model().objects.filter(pk=self.user.pk).update(
+            is_active=False)
+
+        # update() sends no signal, the cached entry still answers
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        later = time.monotonic() + MAX_LOCAL_TTL + 1
+        with patch('core.authentication.time.monotonic',
+                   return_value=later):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_default_ttl_is_local_window(self):
+        """Test that without a setting entries live for the window"""
+        with self.settings():
+            del settings.TOKEN_AUTH_CACHE_TTL
+
+            self.assertEqual(token_cache.ttl, MAX_LOCAL_TTL)
+
+    def test_other_saves_keep_token_cached(self):
+        """Test that saves not touching auth fields skip the eviction"""
+        self.client.get(ME_URL)
+        user = get_user_model().objects.get(pk=self.user.pk)
+
+        # only the save itself, no token lookup
+        with self.assertNumQueries(1):
+            user.last_login = timezone.now()
+            user.save(update_fields=['last_login'])
+        user.name = 'New name'
+        user.save()
+
+        self.assertIsNotNone(token_cache.get(self.token.key))
+
+    def test_update_does_not_write_back_cached_user(self):
+        """Test that a profile update saves the user as stored"""
+        self.client.get(ME_URL)
+        get_user_model().objects.filter(pk=self.user.pk).update(
+            is_active=False)
+
+        # the cached user still authenticates within the window
+        res = self.client.patch(ME_URL, {'name': 'New name'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.name, 'New name')
+        self.assertFalse(self.user.is_active)
+
+
+class ResolvedTokenAuthenticationTests(TestCase):
+    """Test authenticating with a pair resolved before the view"""
+
+    def setUp(self):
+        token_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            'test@email.com',
+            'password'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.factory = RequestFactory()
+
+    def test_resolved_pair_used(self):
+        """Test that a resolved pair authenticates without a lookup"""
+        request = self.factory.get('/')
+        request.resolved_token_auth = (self.user, self.token)
+
+        with self.assertNumQueries(0):
+            result = ResolvedTokenAuthentication().authenticate(
+                Request(request))
+
+        self.assertEqual(result, (self.user, self.token))
+
+    def test_falls_back_to_token_header(self):
+        """Test that requests without a resolved pair use their token"""
+        request = self.factory.get(
+            '/', HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+        user, token = ResolvedTokenAuthentication().authenticate(
+            Request(request))
+
+        self.assertEqual(user, self.user)
+        self.assertEqual(token, self.token)
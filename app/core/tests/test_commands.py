@@ -1,25 +1,236 @@
+import json
+import os
+import tempfile
+from decimal import Decimal
+from io import StringIO
 from unittest.mock import patch
 
-from django.core.management import call_command
+from django.contrib.auth import get_user_model
+from django.core.management import call_command, CommandError
 from django.db.utils import OperationalError
 from django.test import TestCase
 
+from benchmarks.routes import ROUTES
+from core.health import check_database
+from core.models import Tag, Ingredient, Recipe
+
 
 class CommandsTestCase(TestCase):
 
     def test_wait_for_db_ready(self):
         """Test waiting for db when db is available"""
 
-        with patch('django.db.utils.ConnectionHandler.__getitem__') as gi:
-            gi.return_value = True
-            call_command('wait_for_db')
-            self.assertEqual(gi.call_count, 1)
+        with patch('core.management.commands.wait_for_db.check_database') \
+                as cd:
+            call_command('wait_for_db', stdout=StringIO())
+            self.assertEqual(cd.call_count, 1)
 
     @patch('time.sleep', return_value=None)
     def test_wait_for_db(self, ts):
         """Test waiting for db"""
 
-        with patch('django.db.utils.ConnectionHandler.__getitem__') as gi:
-            gi.side_effect = [OperationalError] * 5 + [True]
-            call_command('wait_for_db')
-            self.assertEqual(gi.call_count, 6)
+        with patch('core.management.commands.wait_for_db.check_database') \
+                as cd:
+            cd.side_effect = [OperationalError] * 5 + [None]
+            call_command('wait_for_db', stdout=StringIO())
+            self.assertEqual(cd.call_count, 6)
+            self.assertEqual(ts.call_count, 5)
+
+    @patch('random.uniform', side_effect=lambda low, high: high)
+    @patch('time.sleep', return_value=None)
+    def test_wait_for_db_backs_off(self, ts, ru):
+        """Test that retry delays grow exponentially up to the max"""
+
+        with patch('core.management.commands.wait_for_db.check_database') \
+                as cd:
+            cd.side_effect = [OperationalError] * 5 + [None]
+            call_command('wait_for_db', initial_delay=1, max_delay=4,
+                         stdout=StringIO())
+
+        self.assertEqual([c.args[0] for c in ts.call_args_list],
+                         [1, 2, 4, 4, 4])
+
+    @patch('time.sleep', return_value=None)
+    def test_wait_for_db_times_out(self, ts):
+        """Test giving up once the timeout has passed"""
+
+        with patch('core.management.commands.wait_for_db.check_database') \
+                as cd:
+            cd.side_effect = OperationalError
+            with self.assertRaises(CommandError):
+                call_command('wait_for_db', timeout=0, stdout=StringIO())
+
+    def test_check_database_queries(self):
+        """Test that the readiness check really runs a query"""
+        with self.assertNumQueries(1):
+            check_database()
+
+
+class ImportRecipesTests(TestCase):
+    """Test the import_recipes command"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@email.com', 'password')
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def write(self, name, content):
+        """Write an input file and return its path"""
+        path = os.path.join(self.tmpdir.name, name)
+        with open(path, 'w') as f:
+            f.write(content)
+        return path
+
+    def run_import(self, *args, **options):
+        """Run the command quietly"""
+        call_command('import_recipes', *args, stdout=StringIO(),
+                     stderr=StringIO(), **options)
+
+    def test_import_ndjson(self):
+        """Test importing recipes, tags and ingredients from NDJSON"""
+        Tag.objects.create(user=self.user, name='Vegan')
+        records = [
+            {'type': 'tag', 'user': 'test@email.com', 'name': 'Quick'},
+            {'user': 'test@email.com', 'title': 'Porridge',
+             'time_minutes': 10, 'price': '2.5', 'tags': ['Vegan'],
+             'ingredients': ['Oat', 'Milk']},
+            {'user': 'test@email.com', 'title': 'Salad', 'time_minutes': 5,
+             'price': 3, 'tags': ['Vegan', 'Quick'], 'ingredients': []},
+        ]
+        path = self.write('data.ndjson',
+                          '\n'.join(json.dumps(r) for r in records))
+
+        self.run_import(path, chunk_size=2)
+
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+        porridge = Recipe.objects.get(user=self.user, title='Porridge')
+        self.assertEqual(porridge.price, Decimal('2.50'))
+        self.assertEqual(
+            sorted(porridge.ingredients.values_list('name', flat=True)),
+            ['Milk', 'Oat'])
+        salad = Recipe.objects.get(user=self.user, title='Salad')
+        self.assertEqual(sorted(salad.tags.values_list('name', flat=True)),
+                         ['Quick', 'Vegan'])
+
+    def test_import_csv(self):
+        """Test importing recipes from CSV"""
+        path = self.write(
+            'data.csv',
+            'user,title,time_minutes,price,link,tags,ingredients\n'
+            'test@email.com,Porridge,10,2.50,,Vegan|Quick,Oat\n'
+        )
+
+        self.run_import(path)
+
+        recipe = Recipe.objects.get(user=self.user)
+        self.assertEqual(recipe.title, 'Porridge')
+        self.assertEqual(recipe.tags.count(), 2)
+        self.assertEqual(recipe.ingredients.get().name, 'Oat')
+
+    def test_import_skips_invalid_records(self):
+        """Test that bad records and unknown users are skipped"""
+        path = self.write('data.ndjson', '\n'.join([
+            'not json',
+            json.dumps({'user': 'nobody@email.com', 'title': 'Pie',
+                        'time_minutes': 1, 'price': 1}),
+            json.dumps({'user': 'test@email.com', 'title': 'Pie',
+                        'time_minutes': 'soon', 'price': 1}),
+            json.dumps({'user': 'test@email.com', 'title': 'Cake',
+                        'time_minutes': 1, 'price': 1}),
+        ]))
+
+        self.run_import(path)
+
+        self.assertEqual(
+            list(Recipe.objects.values_list('title', flat=True)), ['Cake'])
+
+    def test_import_skips_values_too_large(self):
+        """Test that records the database can't store are skipped"""
+        valid = {'user': 'test@email.com', 'title': 'Cake',
+                 'time_minutes': 1, 'price': 1}
+        path = self.write('data.ndjson', '\n'.join(json.dumps(r) for r in [
+            {**valid, 'title': 'x' * 256},
+            {**valid, 'link': 'x' * 256},
+            {**valid, 'tags': ['x' * 256]},
+            {'type': 'ingredient', 'user': 'test@email.com',
+             'name': 'x' * 256},
+            {**valid, 'price': '1000'},
+            {**valid, 'time_minutes': -1},
+            {**valid, 'time_minutes': 2 ** 31},
+            valid,
+        ]))
+        stderr = StringIO()
+
+        call_command('import_recipes', path, stdout=StringIO(),
+                     stderr=stderr)
+
+        self.assertEqual(
+            list(Recipe.objects.values_list('title', flat=True)), ['Cake'])
+        self.assertFalse(Ingredient.objects.exists())
+        self.assertIn('Line 1: title longer than 255 characters',
+                      stderr.getvalue())
+        self.assertEqual(stderr.getvalue().count('skipped'), 7)
+
+    def test_import_resumes_from_checkpoint(self):
+        """Test that a rerun skips records a checkpoint marks as done"""
+        records = [
+            {'user': 'test@email.com', 'title': f'Recipe {i}',
+             'time_minutes': i, 'price': 1}
+            for i in range(3)
+        ]
+        path = self.write('data.ndjson',
+                          '\n'.join(json.dumps(r) for r in records))
+        checkpoint = self.write('progress.json', json.dumps({'records': 2}))
+
+        self.run_import(path, checkpoint=checkpoint)
+
+        self.assertEqual(
+            list(Recipe.objects.values_list('title', flat=True)),
+            ['Recipe 2'])
+        with open(checkpoint) as f:
+            self.assertEqual(json.load(f), {'records': 3})
+
+
+class BenchmarkConcurrencyTests(TestCase):
+    """Test the benchmark_concurrency command"""
+
+    def test_unknown_mode_rejected(self):
+        """Test that an unknown server mode is an error"""
+        get_user_model().objects.create_user('test@email.com', 'password')
+
+        with self.assertRaises(CommandError):
+            call_command('benchmark_concurrency', email='test@email.com',
+                         modes='wsgi,gunicorn', stdout=StringIO())
+
+
+class BenchmarkApiTests(TestCase):
+    """Test the benchmark_api command"""
+
+    def test_every_route_benchmarked(self):
+        """Test that every route answers and results are saved as JSON"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            output = os.path.join(tmpdir, 'results.json')
+            call_command('benchmark_api', users=2, recipes=3, requests=2,
+                         concurrency=1, output=output, stdout=StringIO())
+            with open(output) as f:
+                results = json.load(f)
+
+        self.assertEqual(set(results['routes']),
+                         {route.name for route in ROUTES})
+        for name, result in results['routes'].items():
+            self.assertEqual(result['errors'], 0, name)
+            self.assertEqual(result['requests'], 2)
+            self.assertLessEqual(result['latency_ms']['p50'],
+                                 result['latency_ms']['p99'])
+        self.assertEqual(results['meta']['parameters']['users'], 2)
+        self.assertFalse(get_user_model().objects.filter(
+            email__startswith='benchmark-').exists())
+
+    def test_unknown_route_rejected(self):
+        """Test that an unknown route name is an error"""
+        with self.assertRaises(CommandError):
+            call_command('benchmark_api', routes='recipes-list,nope',
+                         stdout=StringIO())
@@ -0,0 +1,118 @@
+import threading
+from unittest import skipUnless
+from unittest.mock import MagicMock
+
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase
+
+from core.db.pool import ConnectionPool, PoolTimeout, discard_pool, get_pool
+
+try:
+    from psycopg2 import extensions
+    from core.db.backends.postgresql.base import reset_connection
+except ImportError:
+    extensions = None
+
+
+def fake_connection(status=None):
+    """Return a stand in for a psycopg2 connection"""
+    connection = MagicMock(closed=0)
+    if extensions is not None:
+        connection.info.transaction_status = \
+            extensions.TRANSACTION_STATUS_IDLE if status is None else status
+
+    return connection
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    """Test checking connections out of and back into the pool"""
+
+    def test_returned_connection_reused(self):
+        """Test that a returned idle connection is handed out again"""
+        pool = ConnectionPool(max_size=2, timeout=1)
+        connection = fake_connection()
+        connect = MagicMock(return_value=connection)
+
+        pool.put(pool.get(connect))
+        reused = pool.get(connect)
+
+        self.assertIs(reused, connection)
+        self.assertEqual(connect.call_count, 1)
+
+    def test_checkout_waits_for_return(self):
+        """Test that a full pool hands out a connection once one is back"""
+        pool = ConnectionPool(max_size=1, timeout=5)
+        connection = pool.get(fake_connection)
+        got = []
+        waiter = threading.Thread(
+            target=lambda: got.append(pool.get(fake_connection)))
+        waiter.start()
+
+        pool.put(connection)
+        waiter.join(5)
+
+        self.assertEqual(got, [connection])
+
+    def test_exhausted_pool_times_out(self):
+        """Test that waiting for a connection past the timeout fails"""
+        pool = ConnectionPool(max_size=1, timeout=0.01)
+        pool.get(fake_connection)
+
+        with self.assertRaises(PoolTimeout):
+            pool.get(fake_connection)
+
+    def test_unusable_connection_discarded(self):
+        """Test that a connection failing reset is closed, not reused"""
+        pool = ConnectionPool(max_size=1, timeout=1,
+                              reset=MagicMock(side_effect=RuntimeError))
+        broken = fake_connection()
+        pool.put(pool.get(lambda: broken))
+
+        fresh = fake_connection()
+        self.assertIs(pool.get(lambda: fresh), fresh)
+        broken.close.assert_called_once()
+
+    def test_dead_connection_replaced(self):
+        """Test that an idle connection failing the check is replaced"""
+        pool = ConnectionPool(max_size=1, timeout=1)
+        dead = fake_connection()
+        pool.put(pool.get(lambda: dead))
+
+        fresh = fake_connection()
+        connection = pool.get(lambda: fresh, check=lambda conn: conn is fresh)
+
+        self.assertIs(connection, fresh)
+        dead.close.assert_called_once()
+
+    def test_get_pool(self):
+        """Test that each alias gets one pool, and none when it's off"""
+        settings_dict = {'POOL': {'MAX_SIZE': 2}, 'CONN_MAX_AGE': 0}
+        self.addCleanup(discard_pool, 'pooled')
+
+        pool = get_pool('pooled', settings_dict)
+
+        self.assertIs(get_pool('pooled', settings_dict), pool)
+        self.assertIsNone(get_pool('plain', {'POOL': {'MAX_SIZE': 0}}))
+
+    def test_persistent_connections_rejected(self):
+        """Test that pooling with a CONN_MAX_AGE is a config error"""
+        with self.assertRaises(ImproperlyConfigured):
+            get_pool('pooled', {'POOL': {'MAX_SIZE': 2}, 'CONN_MAX_AGE': 60})
+
+
+@skipUnless(extensions is not None, 'psycopg2 not installed')
+class ResetConnectionTests(SimpleTestCase):
+    """Test readying returned Postgres connections for reuse"""
+
+    def test_open_transaction_rolled_back(self):
+        """Test that a connection left in a transaction is rolled back"""
+        connection = fake_connection(extensions.TRANSACTION_STATUS_INERROR)
+
+        self.assertTrue(reset_connection(connection))
+        connection.rollback.assert_called_once()
+
+    def test_unknown_state_not_reused(self):
+        """Test that a connection in an unknown state isn't reused"""
+        connection = fake_connection(extensions.TRANSACTION_STATUS_UNKNOWN)
+
+        self.assertFalse(reset_connection(connection))
@@ -0,0 +1,106 @@
+from collections import Counter
+
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from core.checks import check_sticky_cache
+from core.db import routers
+from core.models import Recipe
+
+REPLICAS = {'replica_0': 2, 'replica_1': 1}
+
+
+@override_settings(DATABASE_REPLICAS=REPLICAS)
+class ReplicaRouterTests(TestCase):
+    """Test routing reads to replicas"""
+
+    def setUp(self):
+        self.router = routers.ReplicaRouter()
+
+    def test_weighted_round_robin(self):
+        """Test that replicas take turns in proportion to their weight"""
+        picks = [routers.choose_replica(REPLICAS) for _ in range(30)]
+
+        self.assertEqual(Counter(picks), {'replica_0': 20, 'replica_1': 10})
+        # turns are interleaved, never three in a row on one replica
+        self.assertNotIn(('replica_0',) * 3, zip(picks, picks[1:], picks[2:]))
+
+    def test_zero_weight_skipped(self):
+        """Test that a replica weighted 0 gets no reads"""
+        picks = {routers.choose_replica({'replica_0': 0, 'replica_1': 1})
+                 for _ in range(5)}
+
+        self.assertEqual(picks, {'replica_1'})
+        self.assertIsNone(routers.choose_replica({}))
+
+    def test_reads_use_primary_by_default(self):
+        """Test that reads outside read_from_replicas() are not routed"""
+        self.assertIsNone(self.router.db_for_read(Recipe))
+
+    def test_reads_use_replicas_when_allowed(self):
+        """Test that reads go to replicas inside read_from_replicas()"""
+        token = routers.read_from_replicas()
+        try:
+            db = self.router.db_for_read(Recipe)
+        finally:
+            routers.stop_reading_from_replicas(token)
+
+        self.assertIn(db, REPLICAS)
+        self.assertIsNone(self.router.db_for_read(Recipe))
+
+    def test_writes_and_migrations_use_primary(self):
+        """Test that writes and migrations only touch the primary"""
+        token = routers.read_from_replicas()
+        try:
+            self.assertEqual(self.router.db_for_write(Recipe), 'default')
+        finally:
+            routers.stop_reading_from_replicas(token)
+
+        self.assertTrue(self.router.allow_migrate('default', 'core'))
+        self.assertFalse(self.router.allow_migrate('replica_0', 'core'))
+
+    def test_pin_to_primary(self):
+        """Test that pinning a user expires after the sticky period"""
+        self.assertFalse(routers.is_pinned(1))
+
+        routers.pin_to_primary(1)
+
+        self.assertTrue(routers.is_pinned(1))
+        self.assertFalse(routers.is_pinned(2))
+
+    @override_settings(DATABASE_REPLICAS={})
+    def test_no_pin_without_replicas(self):
+        """Test that nothing is pinned when there are no replicas"""
+        routers.pin_to_primary(1)
+
+        self.assertFalse(routers.is_pinned(1))
+
+
+class StickyCacheCheckTests(SimpleTestCase):
+    """Test the check that pins are shared by every worker"""
+
+    @override_settings(DATABASE_REPLICAS=REPLICAS)
+    def test_shared_cache_passes(self):
+        """Test that the default database cache is accepted"""
+        self.assertEqual(check_sticky_cache(), [])
+
+    @override_settings(DATABASE_REPLICAS=REPLICAS,
+                       DATABASE_STICKY_CACHE_ALIAS='default')
+    def test_local_memory_cache_rejected(self):
+        """Test that a per process cache is an error with replicas"""
+        errors = check_sticky_cache()
+
+        self.assertEqual([error.id for error in errors], ['core.E002'])
+
+    @override_settings(DATABASE_REPLICAS=REPLICAS,
+                       DATABASE_STICKY_CACHE_ALIAS='missing')
+    def test_unknown_cache_rejected(self):
+        """Test that the sticky cache alias must exist"""
+        errors = check_sticky_cache()
+
+        self.assertEqual([error.id for error in errors], ['core.E001'])
+
+    @override_settings(DATABASE_REPLICAS={},
+                       DATABASE_STICKY_CACHE_ALIAS='default')
+    def test_no_replicas(self):
+        """Test that the cache doesn't matter without replicas"""
+        self.assertEqual(check_sticky_cache(), [])
@@ -0,0 +1,77 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core import hashers
+
+TOKEN_URL = reverse('user:token')
+
+
+class PasswordHashingTests(TestCase):
+    """Test the password hasher policy and login rehashing"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@email.com', 'password123')
+
+    def login(self, password='password123'):
+        """Request a token with the user's email and a password"""
+        return self.client.post(
+            TOKEN_URL, {'email': 'test@email.com', 'password': password})
+
+    def stored_hash(self):
+        """Return the password hash saved for the user"""
+        return get_user_model().objects.get(pk=self.user.pk).password
+
+    def test_new_password_uses_argon2(self):
+        """Test that passwords are hashed with the tuned Argon2 hasher"""
+        encoded = self.stored_hash()
+
+        self.assertTrue(encoded.startswith('argon2$'))
+        self.assertIn('m=19456,t=2,p=1', encoded)
+
+    def test_legacy_hash_upgraded_on_login(self):
+        """Test that a PBKDF2 hash is replaced after a successful login"""
+        get_user_model().objects.filter(pk=self.user.pk).update(
+            password=make_password('password123', hasher='pbkdf2_sha256'))
+
+        res = self.login()
+
+        self.assertIn('token', res.data)
+        self.assertTrue(self.stored_hash().startswith('argon2$'))
+
+    def test_hash_upgraded_when_parameters_change(self):
+        """Test that a hash with outdated Argon2 parameters is replaced"""
+        with override_settings(PASSWORD_ARGON2_TIME_COST=3):
+            res = self.login()
+
+        self.assertIn('token', res.data)
+        self.assertIn('t=3', self.stored_hash())
+
+    def test_failed_login_keeps_hash(self):
+        """Test that a wrong password neither logs in nor rehashes"""
+        get_user_model().objects.filter(pk=self.user.pk).update(
+            password=make_password('password123', hasher='pbkdf2_sha256'))
+
+        res = self.login('wrong')
+
+        self.assertNotIn('token', res.data)
+        self.assertTrue(self.stored_hash().startswith('pbkdf2_sha256$'))
+
+    @override_settings(PASSWORD_HASH_WORKERS=1)
+    def test_verify_on_process_pool(self):
+        """Test that passwords can be verified on the process pool"""
+        self.addCleanup(self.shutdown_pool)
+
+        self.assertIn('token', self.login().data)
+        self.assertNotIn('token', self.login('wrong').data)
+        self.assertIsNotNone(hashers._executor)
+
+    def shutdown_pool(self):
+        if hashers._executor is not None:
+            hashers._executor.shutdown()
+            hashers._executor = None
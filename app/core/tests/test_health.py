@@ -0,0 +1,66 @@
+from unittest.mock import patch
+
+from django.db.utils import OperationalError
+from django.test import TestCase
+from django.urls import reverse
+
+from core import health
+
+HEALTHZ_URL = reverse('healthz')
+READYZ_URL = reverse('readyz')
+
+
+class HealthViewsTests(TestCase):
+    """Test the health and readiness probes"""
+
+    def tearDown(self):
+        health._migrated.clear()
+
+    def test_healthz_ok(self):
+        """Test that a reachable database reports healthy"""
+        res = self.client.get(HEALTHZ_URL)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json(), {'status': 'ok',
+                                      'checks': {'database': 'ok'}})
+        self.assertIn('no-cache', res['Cache-Control'])
+
+    @patch('core.views.check_database', side_effect=OperationalError('down'))
+    def test_healthz_database_down(self, cd):
+        """Test that an unreachable database reports unavailable"""
+        with self.assertLogs('core.views', 'WARNING'):
+            res = self.client.get(HEALTHZ_URL)
+
+        self.assertEqual(res.status_code, 503)
+        self.assertEqual(res.json()['checks']['database'],
+                         'error: OperationalError')
+
+    def test_readyz_ok(self):
+        """Test that a migrated database reports ready"""
+        res = self.client.get(READYZ_URL)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json()['checks'],
+                         {'database': 'ok', 'migrations': 'ok'})
+
+    @patch('core.views.unapplied_migrations',
+           return_value=['core.0099_future'])
+    def test_readyz_unapplied_migrations(self, um):
+        """Test that pending migrations report not ready"""
+        res = self.client.get(READYZ_URL)
+
+        self.assertEqual(res.status_code, 503)
+        self.assertEqual(res.json()['checks']['migrations'], '1 unapplied')
+
+    def test_migration_state_cached(self):
+        """Test that a fully migrated database is not checked again"""
+        health.unapplied_migrations()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(health.unapplied_migrations(), [])
+
+    def test_probes_reject_writes(self):
+        """Test that the probes only answer GET and HEAD"""
+        res = self.client.post(HEALTHZ_URL)
+
+        self.assertEqual(res.status_code, 405)
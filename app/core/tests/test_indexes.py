@@ -0,0 +1,115 @@
+import json
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+
+from core.models import Recipe, Tag, Ingredient
+
+
+def plan_nodes(queryset):
+    """Return every node of a query's plan, with sequential scans off
+
+    Tables in tests are tiny, so without that the planner may well scan
+    them. Bitmap scans, which lose the index order, are off too, so an
+    index that filters and orders the query wins over sorting.
+    """
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute('SET LOCAL enable_seqscan = off')
+        cursor.execute('SET LOCAL enable_bitmapscan = off')
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    # psycopg2 decodes json columns itself
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+
+    nodes, pending = [], [plan[0]['Plan']]
+    while pending:
+        node = pending.pop()
+        nodes.append(node)
+        pending.extend(node.get('Plans', ()))
+
+    return nodes
+
+
+def index_columns(model):
+    """Return the columns of each index on a model's table, by name"""
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(
+            cursor, model._meta.db_table)
+
+    return {name: info['columns'] for name, info in constraints.items()
+            if info['index']}
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Postgres planner only')
+class IndexUsageTests(TestCase):
+    """Test that per-user reads are served by indexes"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@email.com',
+            'password'
+        )
+
+    def assertServedBy(self, queryset, columns):
+        """Assert an index on columns both filters and orders the query
+
+        The foreign key and unique indexes cover the filter or the order
+        alone, so they would need a Sort node or a non-index condition.
+        """
+        nodes = plan_nodes(queryset)
+        node_types = [node['Node Type'] for node in nodes]
+        indexes = index_columns(queryset.model)
+        used = [(indexes.get(node['Index Name']), node.get('Index Cond'))
+                for node in nodes if 'Index Name' in node]
+
+        self.assertNotIn('Seq Scan', node_types)
+        self.assertNotIn('Sort', node_types)
+        self.assertTrue(
+            any(index == columns and cond and columns[0] in cond
+                for index, cond in used),
+            used)
+
+    def test_composite_indexes_exist(self):
+        """Test that the per-user composite indexes are created"""
+        self.assertIn(['user_id', 'id'], index_columns(Recipe).values())
+        self.assertIn(['user_id', 'name'], index_columns(Tag).values())
+        self.assertIn(['user_id', 'name'],
+                      index_columns(Ingredient).values())
+        self.assertIn(['tag_id', 'recipe_id'],
+                      index_columns(Recipe.tags.through).values())
+        self.assertIn(['ingredient_id', 'recipe_id'],
+                      index_columns(Recipe.ingredients.through).values())
+
+    def test_recipe_list_uses_index(self):
+        """Test listing a user's recipes newest first uses an index"""
+        self.assertServedBy(
+            Recipe.objects.filter(user=self.user).order_by('-id'),
+            ['user_id', 'id'])
+
+    def test_tag_list_uses_index(self):
+        """Test listing a user's tags by name uses an index"""
+        self.assertServedBy(
+            Tag.objects.filter(user=self.user).order_by('-name'),
+            ['user_id', 'name'])
+
+    def test_ingredient_list_uses_index(self):
+        """Test listing a user's ingredients by name uses an index"""
+        self.assertServedBy(
+            Ingredient.objects.filter(user=self.user).order_by('-name'),
+            ['user_id', 'name'])
+
+    def test_tag_filter_uses_index(self):
+        """Test filtering recipe links by tag uses an index"""
+        self.assertServedBy(Recipe.tags.through.objects.filter(
+            tag_id=1).order_by('recipe_id').values('recipe_id'),
+            ['tag_id', 'recipe_id'])
+
+    def test_ingredient_filter_uses_index(self):
+        """Test filtering recipe links by ingredient uses an index"""
+        self.assertServedBy(Recipe.ingredients.through.objects.filter(
+            ingredient_id=1).order_by('recipe_id').values('recipe_id'),
+            ['ingredient_id', 'recipe_id'])
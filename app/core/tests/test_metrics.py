@@ -0,0 +1,163 @@
+import tempfile
+from unittest.mock import patch
+
+from asgiref.sync import sync_to_async
+
+from django.contrib.auth import get_user_model
+from django.test import AsyncClient, TestCase, override_settings
+from django.urls import reverse
+
+from prometheus_client import REGISTRY
+from prometheus_client.values import MultiProcessValue
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core import metrics
+
+METRICS_URL = reverse('metrics')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+@override_settings(METRICS_ENABLED=True, RECIPE_LIST_CACHE_TIMEOUT=60)
+class MetricsTests(TestCase):
+    """Test the Prometheus metrics of the API"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@londonappdev.com', 'testpass')
+        self.client = APIClient(raise_request_exception=False)
+        self.client.force_authenticate(self.user)
+
+    def test_request_metrics_per_action(self):
+        """Test that requests are counted and timed per viewset action"""
+        labels = {'view': 'TagViewSet.list', 'method': 'GET'}
+        before = {
+            'requests': sample('recipe_api_requests_total',
+                               status='200', **labels),
+            'latency': sample('recipe_api_request_duration_seconds_count',
+                              **labels),
+            'queries': sample('recipe_api_request_queries_sum', **labels),
+        }
+
+        self.client.get(TAGS_URL)
+
+        self.assertEqual(sample('recipe_api_requests_total', status='200',
+                                **labels), before['requests'] + 1)
+        self.assertEqual(sample('recipe_api_request_duration_seconds_count',
+                                **labels), before['latency'] + 1)
+        self.assertGreater(sample('recipe_api_request_queries_sum',
+                                  **labels), before['queries'])
+
+    async def test_request_metrics_async(self):
+        """Test that requests served by the ASGI handler are recorded"""
+        token = await sync_to_async(Token.objects.create)(user=self.user)
+        labels = {'view': 'TagViewSet.list', 'method': 'GET'}
+        before = sample('recipe_api_requests_total', status='200', **labels)
+
+        res = await AsyncClient().get(
+            TAGS_URL, authorization=f'Token {token.key}')
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(sample('recipe_api_requests_total', status='200',
+                                **labels), before + 1)
+
+    @patch('recipe.views.TagViewSet.create', side_effect=RuntimeError)
+    def test_errors_counted(self, create):
+        """Test that server errors are counted per action"""
+        labels = {'view': 'TagViewSet.create', 'method': 'POST'}
+        before = sample('recipe_api_request_errors_total', **labels)
+
+        with self.assertLogs('django.request', 'ERROR'):
+            res = self.client.post(TAGS_URL, {'name': 'Vegan'})
+
+        self.assertEqual(res.status_code, 500)
+        self.assertEqual(sample('recipe_api_request_errors_total', **labels),
+                         before + 1)
+
+    def test_list_cache_hits(self):
+        """Test that list cache misses and hits are counted"""
+        misses = sample('recipe_api_cache_lookups_total',
+                        cache='list', result='miss')
+        hits = sample('recipe_api_cache_lookups_total',
+                      cache='list', result='hit')
+
+        self.client.get(TAGS_URL)
+        self.client.get(TAGS_URL)
+
+        self.assertEqual(sample('recipe_api_cache_lookups_total',
+                                cache='list', result='miss'), misses + 1)
+        self.assertEqual(sample('recipe_api_cache_lookups_total',
+                                cache='list', result='hit'), hits + 1)
+
+    def test_metrics_endpoint(self):
+        """Test that /metrics serves the text exposition format"""
+        self.client.get(TAGS_URL)
+
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(res['Content-Type'].startswith('text/plain'))
+        self.assertIn(b'recipe_api_requests_total{', res.content)
+
+    @override_settings(METRICS_ALLOWED_IPS=['127.0.0.1'])
+    def test_metrics_hidden_from_other_addresses(self):
+        """Test that /metrics is a 404 from addresses not allowed"""
+        res = self.client.get(METRICS_URL, REMOTE_ADDR='203.0.113.7')
+
+        self.assertEqual(res.status_code, 404)
+
+    @override_settings(METRICS_ALLOWED_IPS=['10.0.0.0/8'])
+    def test_metrics_allowed_network(self):
+        """Test that addresses in an allowed network may scrape"""
+        res = self.client.get(METRICS_URL, REMOTE_ADDR='10.1.2.3')
+
+        self.assertEqual(res.status_code, 200)
+
+    @override_settings(METRICS_ALLOWED_IPS=[], METRICS_TOKEN='s3cret')
+    def test_metrics_token(self):
+        """Test that only the right bearer token may scrape"""
+        res = self.client.get(METRICS_URL,
+                              HTTP_AUTHORIZATION='Bearer s3cret')
+        wrong = self.client.get(METRICS_URL,
+                                HTTP_AUTHORIZATION='Bearer guess')
+        missing = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(wrong.status_code, 404)
+        self.assertEqual(missing.status_code, 404)
+
+    @override_settings(METRICS_ENABLED=False)
+    def test_disabled(self):
+        """Test that nothing is recorded or served when disabled"""
+        labels = {'view': 'TagViewSet.list', 'method': 'GET',
+                  'status': '200'}
+        before = sample('recipe_api_requests_total', **labels)
+
+        self.client.get(TAGS_URL)
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, 404)
+        self.assertEqual(sample('recipe_api_requests_total', **labels),
+                         before)
+
+    def test_multiprocess_sums_workers(self):
+        """Test that values written by several workers are summed"""
+        labels = ('TagViewSet.list', 'GET', '200')
+        with tempfile.TemporaryDirectory() as path, \
+                patch.dict('os.environ', {'prometheus_multiproc_dir': path}):
+            for pid in (101, 102):
+                value = MultiProcessValue(lambda pid=pid: pid)(
+                    'counter', 'recipe_api_requests',
+                    'recipe_api_requests_total',
+                    ('view', 'method', 'status'), labels)
+                value.inc(pid - 100)
+
+            body, _ = metrics.collect()
+
+        self.assertIn(
+            b'recipe_api_requests_total{method="GET",status="200",'
+            b'view="TagViewSet.list"} 3.0', body)
@@ -0,0 +1,115 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse
+from django.test import AsyncClient, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.middleware import RequestTimingMiddleware, view_name
+from core.models import Recipe
+from core.views import healthz
+from recipe.views import RecipeViewSet
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TOKEN_URL = reverse('user:token')
+
+
+def timing_metrics(response):
+    """Return {metric name: its Server-Timing fields} of a response"""
+    metrics = {}
+    for metric in response['Server-Timing'].split(', '):
+        name, *fields = metric.split(';')
+        metrics[name] = fields
+
+    return metrics
+
+
+@override_settings(REQUEST_TIMING=True, RECIPE_LIST_CACHE_TIMEOUT=0,
+                   REQUEST_TIMING_SLOW_REQUEST_MS=60000,
+                   REQUEST_TIMING_SLOW_QUERY_MS=60000)
+class RequestTimingMiddlewareTests(TestCase):
+    """Test the per request timing middleware"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@londonappdev.com', 'testpass')
+        Recipe.objects.create(
+            user=self.user, title='Toast', time_minutes=2, price=1)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_server_timing_header(self):
+        """Test that DRF responses report db, serialize and render time"""
+        res = self.client.get(RECIPES_URL)
+
+        metrics = timing_metrics(res)
+        self.assertEqual(
+            set(metrics), {'db', 'serialize', 'render', 'total'})
+        self.assertTrue(metrics['total'][0].startswith('dur='))
+        queries = int(metrics['db'][1].split('"')[1].split()[0])
+        self.assertGreater(queries, 0)
+
+    @override_settings(REQUEST_TIMING=False)
+    def test_disabled_adds_no_header(self):
+        """Test that the middleware stays out of the way when off"""
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertFalse(res.has_header('Server-Timing'))
+
+    @override_settings(REQUEST_TIMING_SLOW_REQUEST_MS=0)
+    def test_slow_request_logged_with_view(self):
+        """Test that slow requests are logged with their view name"""
+        with self.assertLogs('core.middleware', 'WARNING') as logs:
+            self.client.get(RECIPES_URL)
+
+        self.assertIn(
+            f'Slow request GET {RECIPES_URL} (RecipeViewSet.list)',
+            logs.output[0])
+
+    @override_settings(REQUEST_TIMING_SLOW_QUERY_MS=0)
+    def test_slow_query_logged_with_view(self):
+        """Test that slow queries are logged with their view and SQL"""
+        with self.assertLogs('core.middleware', 'WARNING') as logs:
+            self.client.post(TOKEN_URL, {'email': 'test@londonappdev.com',
+                                         'password': 'testpass'})
+
+        self.assertIn('Slow query in CreateTokenView', logs.output[0])
+        self.assertIn('SELECT', logs.output[0])
+
+    def test_view_name(self):
+        """Test naming viewset actions, API views and plain functions"""
+        request = APIClient().get(RECIPES_URL).wsgi_request
+        view = RecipeViewSet.as_view({'get': 'list', 'post': 'create'})
+
+        self.assertEqual(view_name(request, view), 'RecipeViewSet.list')
+        self.assertEqual(view_name(request, healthz), 'healthz')
+
+    def test_runs_in_the_handler_mode(self):
+        """Test that the middleware is a coroutine only in async chains"""
+        async def async_response(request):
+            return HttpResponse()
+
+        self.assertTrue(asyncio.iscoroutinefunction(
+            RequestTimingMiddleware(async_response)))
+        self.assertFalse(asyncio.iscoroutinefunction(
+            RequestTimingMiddleware(lambda request: HttpResponse())))
+
+    async def test_server_timing_header_async(self):
+        """Test that requests served by the ASGI handler are timed"""
+        token = await sync_to_async(Token.objects.create)(user=self.user)
+
+        res = await AsyncClient().get(
+            RECIPES_URL, authorization=f'Token {token.key}')
+
+        self.assertEqual(res.status_code, 200)
+        metrics = timing_metrics(res)
+        self.assertEqual(
+            set(metrics), {'db', 'serialize', 'render', 'total'})
+        queries = int(metrics['db'][1].split('"')[1].split()[0])
+        self.assertGreater(queries, 0)
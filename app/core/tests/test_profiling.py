@@ -0,0 +1,112 @@
+import os
+import pstats
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.test import AsyncClient, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.models import Recipe
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+@override_settings(REQUEST_PROFILING=True)
+class ProfilingMiddlewareTests(TestCase):
+    """Test profiling requests on demand"""
+
+    def setUp(self):
+        self.staff = get_user_model().objects.create_user(
+            'staff@londonappdev.com', 'testpass', is_staff=True)
+        Recipe.objects.create(
+            user=self.staff, title='Toast', time_minutes=2, price=1)
+        self.client = APIClient()
+        self.token = Token.objects.create(user=self.staff)
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_staff_summary(self):
+        """Test that staff get the top functions and the SQL run"""
+        res = self.client.get(RECIPES_URL, {'_profile': 'cprofile'})
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res['Cache-Control'], 'no-store')
+        summary = res.json()
+        self.assertEqual(summary['status'], 200)
+        self.assertEqual(summary['sort'], 'cumulative')
+        self.assertTrue(summary['functions'])
+        self.assertLessEqual(len(summary['functions']), 30)
+        self.assertTrue(any('core_recipe' in query['sql']
+                            for query in summary['queries']))
+
+    def test_header_and_pstats_format(self):
+        """Test asking by header for a pstats file"""
+        res = self.client.get(RECIPES_URL, HTTP_X_PROFILE='cprofile',
+                              HTTP_X_PROFILE_FORMAT='pstats')
+
+        self.assertEqual(res.status_code, 200)
+        self.assertIn('profile.pstats', res['Content-Disposition'])
+        self.assertGreater(int(res['X-Profile-Queries']), 0)
+        with tempfile.NamedTemporaryFile(delete=False) as f:
+            f.write(res.content)
+        self.addCleanup(os.remove, f.name)
+        self.assertTrue(pstats.Stats(f.name).stats)
+
+    def test_invalid_option(self):
+        """Test that unknown profilers or sort keys are rejected"""
+        res = self.client.get(RECIPES_URL, {'_profile': 'cprofile',
+                                            '_profile_sort': 'name'})
+
+        self.assertEqual(res.status_code, 400)
+        self.assertIn('profile_sort', res.json())
+
+    def test_non_staff_not_profiled(self):
+        """Test that other users get their regular response"""
+        user = get_user_model().objects.create_user(
+            'user@londonappdev.com', 'testpass')
+        client = APIClient()
+        client.force_authenticate(user)
+
+        res = client.get(RECIPES_URL, {'_profile': 'cprofile'})
+
+        self.assertEqual(res.status_code, 200)
+        self.assertIn('results', res.json())
+
+    def test_anonymous_not_profiled(self):
+        """Test that anonymous requests are not profiled"""
+        res = APIClient().get(RECIPES_URL, {'_profile': 'cprofile'})
+
+        self.assertEqual(res.status_code, 401)
+
+    async def test_staff_summary_async(self):
+        """Test profiling a request served by the ASGI handler"""
+        res = await AsyncClient().get(
+            RECIPES_URL, x_profile='cprofile',
+            authorization=f'Token {self.token.key}')
+
+        self.assertEqual(res.status_code, 200)
+        summary = res.json()
+        self.assertEqual(summary['status'], 200)
+        self.assertTrue(any('core_recipe' in query['sql']
+                            for query in summary['queries']))
+
+    @override_settings(ROOT_URLCONF='recipe.tests.test_async_views')
+    async def test_native_async_view_profiled(self):
+        """Test that native async views run on the profiled thread"""
+        res = await AsyncClient().get(
+            RECIPES_URL, x_profile='cprofile',
+            authorization=f'Token {self.token.key}')
+
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(any('core_recipe' in query['sql']
+                            for query in res.json()['queries']))
+
+    @override_settings(REQUEST_PROFILING=False)
+    def test_disabled(self):
+        """Test that nobody can profile when the setting is off"""
+        res = self.client.get(RECIPES_URL, {'_profile': 'cprofile'})
+
+        self.assertIn('results', res.json())
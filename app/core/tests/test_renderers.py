@@ -0,0 +1,39 @@
+import datetime
+from decimal import Decimal
+
+from django.test import TestCase
+from rest_framework.renderers import JSONRenderer
+
+from core.renderers import FastJSONRenderer
+
+
+class FastJSONRendererTests(TestCase):
+    """Test the orjson based renderer"""
+
+    def test_output_matches_json_renderer(self):
+        """Test the output equals JSONRenderer byte for byte"""
+        data = {
+            'id': 1,
+            'title': 'Crème brûlée \u2028\u2029',
+            'price': Decimal('5.00'),
+            'created': datetime.datetime(
+                2020, 7, 27, 10, 26, 1, 123456, tzinfo=datetime.timezone.utc),
+            'tags': [1, 2],
+            'link': None,
+            'nested': {1: True, 'empty': []},
+        }
+
+        self.assertEqual(FastJSONRenderer().render(data),
+                         JSONRenderer().render(data))
+
+    def test_indented_output_matches(self):
+        """Test indented output falls back to JSONRenderer"""
+        data = {'id': 1, 'tags': [1, 2]}
+        media_type = 'application/json; indent=4'
+
+        self.assertEqual(FastJSONRenderer().render(data, media_type),
+                         JSONRenderer().render(data, media_type))
+
+    def test_none_renders_empty(self):
+        """Test that no data renders as an empty body"""
+        self.assertEqual(FastJSONRenderer().render(None), b'')
@@ -0,0 +1,106 @@
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import connections  # noqa
+from django.db.backends.signals import connection_created  # noqa
+from rest_framework import serializers  # noqa
+
+# timing of the request being handled, None when timing is off
+_current = ContextVar('request_timing', default=None)
+
+
+class RequestTiming:
+    """Queries, database time and named spans of one request
+
+    Spans and query times are in seconds. Queries slower than
+    `slow_query` are kept as (seconds, sql) for logging.
+    """
+
+    def __init__(self, slow_query=None):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.spans = defaultdict(float)
+        self.slow_query = slow_query
+        self.slow_queries = []
+
+    def record_query(self, sql, elapsed):
+        self.queries += 1
+        self.db_time += elapsed
+        if self.slow_query is not None and elapsed >= self.slow_query:
+            self.slow_queries.append((elapsed, sql))
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+
+def current_timing():
+    """Return the timing of the current request, if it is timed"""
+    return _current.get()
+
+
+def start_timing(slow_query=None):
+    """Time the current request, return the token to stop it with"""
+    return _current.set(RequestTiming(slow_query))
+
+
+def stop_timing(token):
+    _current.reset(token)
+
+
+@contextmanager
+def span(name):
+    """Add the time spent in the block to a span of the current request"""
+    timing = _current.get()
+    if timing is None:
+        yield
+        return
+
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timing.spans[name] += time.perf_counter() - started
+
+
+def query_timer(execute, sql, params, many, context):
+    """connection.execute_wrapper() timing queries of timed requests"""
+    timing = _current.get()
+    if timing is None:
+        return execute(sql, params, many, context)
+
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timing.record_query(sql, time.perf_counter() - started)
+
+
+def install_query_timer(connection, **kwargs):
+    """Add the query timer to a connection once"""
+    if query_timer not in connection.execute_wrappers:
+        connection.execute_wrappers.append(query_timer)
+
+
+def install_query_timers():
+    """Time the queries of timed requests on every connection"""
+    # connections opened later get the timer when they connect
+    connection_created.connect(
+        install_query_timer, dispatch_uid='core.timing')
+    for connection in connections.all():
+        install_query_timer(connection)
+
+
+class TimedSerializerMixin:
+    """Count the time building `.data` as the request's serialize span"""
+
+    @property
+    def data(self):
+        with span('serialize'):
+            return super().data
+
+
+class TimedListSerializer(TimedSerializerMixin, serializers.ListSerializer):
+    """List serializer counting its output in the serialize span"""
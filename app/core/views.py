@@ -0,0 +1,77 @@
+import logging
+
+from django.db import DatabaseError  # noqa
+from django.http import Http404, HttpResponse, JsonResponse  # noqa
+from django.views.decorators.cache import never_cache  # noqa
+from django.views.decorators.http import require_safe  # noqa
+
+from core import metrics as api_metrics  # noqa
+from core.health import check_database, unapplied_migrations  # noqa
+
+logger = logging.getLogger(__name__)
+
+
+def _check_response(checks):
+    """Return 200 if every check passed, else 503, with each outcome"""
+    failed = any(result != 'ok' for result in checks.values())
+
+    return JsonResponse(
+        {'status': 'unavailable' if failed else 'ok', 'checks': checks},
+        status=503 if failed else 200,
+    )
+
+
+def _failure(check, exc):
+    # probes are public, so details only go to the log
+    logger.warning('%s check failed: %s', check, exc)
+
+    return f'error: {type(exc).__name__}'
+
+
+def _database_check():
+    try:
+        check_database()
+    except DatabaseError as exc:
+        return _failure('database', exc)
+
+    return 'ok'
+
+
+@never_cache
+@require_safe
+def healthz(request):
+    """Report whether the database answers queries"""
+    return _check_response({'database': _database_check()})
+
+
+@never_cache
+@require_safe
+def readyz(request):
+    """Report whether the instance can serve, database migrated"""
+    checks = {'database': _database_check()}
+    if checks['database'] == 'ok':
+        try:
+            unapplied = unapplied_migrations()
+        except DatabaseError as exc:
+            checks['migrations'] = _failure('migrations', exc)
+        else:
+            checks['migrations'] = 'ok' if not unapplied \
+                else f'{len(unapplied)} unapplied'
+
+    return _check_response(checks)
+
+
+@never_cache
+@require_safe
+def metrics(request):
+    """Serve the Prometheus metrics, summed over workers if shared
+
+    Only to scrapers with the metrics token or an allowed address, others
+    get a 404 as if metrics were off.
+    """
+    if not api_metrics.enabled() or not api_metrics.may_scrape(request):
+        raise Http404
+
+    body, content_type = api_metrics.collect()
+
+    return HttpResponse(body, content_type=content_type)
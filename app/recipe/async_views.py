@@ -0,0 +1,88 @@
+import copy
+
+from asgiref.sync import sync_to_async
+
+from django.conf import settings  # noqa
+from django.db import close_old_connections  # noqa
+from rest_framework.authentication import get_authorization_header  # noqa
+
+from core.authentication import (CachedTokenAuthentication,  # noqa
+                                 ResolvedTokenAuthentication,  # noqa
+                                 token_cache)  # noqa
+from core.metrics import record_cache_lookup  # noqa
+from core.profiling import is_profiling  # noqa
+
+
+def token_key(request):
+    """Return the key of a token Authorization header or None"""
+    auth = get_authorization_header(request).split()
+    keyword = CachedTokenAuthentication.keyword.lower().encode()
+    if len(auth) != 2 or auth[0].lower() != keyword:
+        return None
+    try:
+        return auth[1].decode()
+    except UnicodeError:
+        return None
+
+
+def authenticate_cached(request):
+    """Authenticate a request from the in process token cache
+
+    Only a cache hit is resolved here, on the event loop. Anything else is
+    left to the view's own authentication, which runs off the loop.
+    """
+    key = token_key(request)
+    cached = token_cache.get(key, local_only=True) if key else None
+    if cached is None:
+        return False
+    # misses are counted by the view's own authentication
+    record_cache_lookup('token', True)
+
+    user, token = cached
+    # read by ResolvedTokenAuthentication, the view's authenticator
+    request.resolved_token_auth = (copy.copy(user), token)
+
+    return True
+
+
+def _call_view(view, request, args, kwargs, own_thread):
+    if own_thread:
+        close_old_connections()
+    try:
+        response = view(request, *args, **kwargs)
+        # render here too rather than on the thread sync code shares
+        if hasattr(response, 'render') and callable(response.render):
+            response.render()
+        return response
+    finally:
+        if own_thread:
+            close_old_connections()
+
+
+def async_viewset_view(viewset, actions, **initkwargs):
+    """Return a native async view serving some actions of a viewset
+
+    Requests are authenticated on the event loop where possible, then the
+    action, database work included, runs in an executor thread so that
+    concurrent requests don't queue on the one thread Django runs sync
+    views in under ASGI.
+    """
+    view = viewset.as_view(
+        actions, authentication_classes=(ResolvedTokenAuthentication,),
+        **initkwargs)
+
+    async def async_view(request, *args, **kwargs):
+        authenticate_cached(request)
+        # a profile only follows the request thread
+        thread_sensitive = getattr(
+            settings, 'RECIPE_ASYNC_THREAD_SENSITIVE', False) \
+            or is_profiling()
+        call = sync_to_async(_call_view, thread_sensitive=thread_sensitive)
+
+        return await call(view, request, args, kwargs, not thread_sensitive)
+
+    async_view.csrf_exempt = True
+    async_view.cls = viewset
+    async_view.actions = actions
+
+    return async_view
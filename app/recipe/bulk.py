@@ -0,0 +1,70 @@
+from django.db import connections, transaction  # noqa
+
+from core.models import Recipe  # noqa
+
+from recipe.cache import bump_user_version  # noqa
+from recipe.counters import count_new_recipes  # noqa
+from recipe.search import refresh_search_index  # noqa
+
+RELATED_FIELDS = ('ingredients', 'tags')
+
+
+def ensure_names(model, pairs, batch_size=1000):
+    """Insert missing tags/ingredients and return their ids
+
+    Takes (user id, name) pairs and returns {(user id, name): id}. Inserts
+    skip rows that already exist, so concurrent callers never conflict.
+    """
+    pairs = set(pairs)
+    if not pairs:
+        return {}
+
+    model.objects.bulk_create(
+        [model(user_id=user_id, name=name) for user_id, name in pairs],
+        ignore_conflicts=True,
+        batch_size=batch_size,
+    )
+    rows = model.objects.filter(
+        user_id__in={user_id for user_id, _ in pairs},
+        name__in={name for _, name in pairs},
+    ).values_list('user_id', 'name', 'id')
+
+    return {(user_id, name): pk for user_id, name, pk in rows
+            if (user_id, name) in pairs}
+
+
+def insert_recipes(recipes, links, batch_size=500):
+    """Insert unsaved recipes and their through table rows in batches
+
+    `links` runs parallel to `recipes`, each a dict of related field name to
+    the ids to link. Bulk inserts skip signals, so the search index, the
+    recipe counters and the owners' list caches are updated here.
+    """
+    using = Recipe.objects.db
+    with transaction.atomic(using=using):
+        bulk = connections[using].features.can_return_rows_from_bulk_insert
+        if bulk:
+            Recipe.objects.bulk_create(recipes, batch_size=batch_size)
+        else:
+            # backends without RETURNING can't hand back new pks
+            for recipe in recipes:
+                recipe.save()
+
+        for name in RELATED_FIELDS:
+            field = Recipe._meta.get_field(name)
+            through = field.remote_field.through
+            column = f'{field.m2m_reverse_field_name()}_id'
+            through.objects.bulk_create([
+                through(recipe_id=recipe.pk, **{column: related_id})
+                for recipe, related in zip(recipes, links)
+                for related_id in set(related.get(name, ()))
+            ], batch_size=batch_size)
+
+        # saved recipes were counted for their owners by post_save
+        count_new_recipes(recipes, links, count_owners=bulk, using=using)
+        refresh_search_index([recipe.pk for recipe in recipes], using=using)
+
+    for user_id in {recipe.user_id for recipe in recipes}:
+        bump_user_version(user_id)
+
+    return recipes
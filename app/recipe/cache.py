@@ -0,0 +1,66 @@
+import hashlib
+import time
+
+from django.conf import settings  # noqa
+from django.core.cache import caches  # noqa
+from rest_framework import status  # noqa
+from rest_framework.response import Response  # noqa
+
+from core.metrics import record_cache_lookup  # noqa
+
+
+def get_list_cache():
+    """Return the cache backend used for list responses"""
+    return caches[getattr(settings, 'RECIPE_LIST_CACHE_ALIAS', 'shared')]
+
+
+def _version_key(user_id):
+    return f'recipe:list-version:{user_id}'
+
+
+def get_user_version(user_id):
+    """Return the current list cache version of a user"""
+    # seeded from the clock so an evicted counter never reuses old keys
+    return get_list_cache().get_or_set(
+        _version_key(user_id), time.time_ns, None)
+
+
+def bump_user_version(user_id):
+    """Invalidate every cached list response of a user"""
+    cache = get_list_cache()
+    try:
+        cache.incr(_version_key(user_id))
+    except ValueError:
+        cache.set(_version_key(user_id), time.time_ns(), None)
+
+
+def list_cache_key(request, basename):
+    """Build the cache key of a list request for the current user"""
+    user_id = request.user.pk
+    uri = hashlib.md5(request.build_absolute_uri().encode()).hexdigest()
+    version = get_user_version(user_id)
+
+    return f'recipe:list:{basename}:{user_id}:{version}:{uri}'
+
+
+class CachedListMixin:
+    """Cache serialized list responses per user and query string"""
+
+    def list(self, request, *args, **kwargs):
+        """Return the cached list response if there is one"""
+        timeout = getattr(settings, 'RECIPE_LIST_CACHE_TIMEOUT', 60)
+        if not timeout:
+            return super().list(request, *args, **kwargs)
+
+        cache = get_list_cache()
+        key = list_cache_key(request, self.basename)
+        data = cache.get(key)
+        record_cache_lookup('list', data is not None)
+        if data is not None:
+            return Response(data)
+
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(key, response.data, timeout)
+
+        return response
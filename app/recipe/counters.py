@@ -0,0 +1,114 @@
+from collections import Counter, defaultdict
+
+from django.contrib.auth import get_user_model  # noqa
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery  # noqa
+from django.db.models.functions import Coalesce  # noqa
+
+from core.models import Tag, Ingredient, Recipe  # noqa
+
+# Recipe m2m fields whose links the related model counts
+COUNTED_FIELDS = {
+    'tags': Tag,
+    'ingredients': Ingredient,
+}
+
+
+def counted_field(through):
+    """Return the name of the counted m2m field using a through model"""
+    for name in COUNTED_FIELDS:
+        if Recipe._meta.get_field(name).remote_field.through is through:
+            return name
+
+    return None
+
+
+def link_column(name):
+    """Return the through table column pointing at the counted model"""
+    field = Recipe._meta.get_field(name)
+
+    return f'{field.m2m_reverse_field_name()}_id'
+
+
+def adjust_counts(model, deltas, using=None):
+    """Add {pk: delta} to recipe_count with atomic F() updates
+
+    Objs sharing a delta are updated in one statement, in pk order so
+    concurrent adjustments lock rows in the same order.
+    """
+    pks_by_delta = defaultdict(list)
+    for pk, delta in deltas.items():
+        if delta:
+            pks_by_delta[delta].append(pk)
+
+    manager = model._default_manager.db_manager(using)
+    for delta, pks in pks_by_delta.items():
+        manager.filter(pk__in=sorted(pks)).update(
+            recipe_count=F('recipe_count') + delta)
+
+
+def linked_counts(name, recipe_ids, using=None):
+    """Return {related pk: number of links} of some recipes"""
+    through = Recipe._meta.get_field(name).remote_field.through
+    column = link_column(name)
+
+    return Counter(dict(
+        through._default_manager.db_manager(using).filter(
+            recipe_id__in=recipe_ids
+        ).values(column).annotate(links=Count('*')).values_list(
+            column, 'links')
+    ))
+
+
+def count_new_recipes(recipes, links, count_owners=True, using=None):
+    """Count recipes and links inserted without sending signals"""
+    if count_owners:
+        adjust_counts(get_user_model(),
+                      Counter(recipe.user_id for recipe in recipes), using)
+    for name, model in COUNTED_FIELDS.items():
+        adjust_counts(model, Counter(
+            related_id
+            for related in links
+            for related_id in set(related.get(name, ()))
+        ), using)
+
+
+def _recount_subqueries():
+    """Yield (model, subquery of each obj's actual recipe count)"""
+    recipes = Recipe.objects.filter(user=OuterRef('pk')).order_by()
+    yield get_user_model(), recipes.values('user').annotate(
+        total=Count('*')).values('total')
+
+    for name, model in COUNTED_FIELDS.items():
+        through = Recipe._meta.get_field(name).remote_field.through
+        column = link_column(name)
+        links = through.objects.filter(
+            **{column: OuterRef('pk')}).order_by()
+        yield model, links.values(column).annotate(
+            total=Count('*')).values('total')
+
+
+def recount(batch_size=10000, using=None):
+    """Recompute every recipe counter, return {model: rows fixed}
+
+    Objs are walked in pk ranges so each UPDATE stays short, and only rows
+    whose counter drifted are written.
+    """
+    fixed = {}
+    for model, subquery in _recount_subqueries():
+        actual = Coalesce(Subquery(subquery, output_field=IntegerField()), 0)
+        manager = model._default_manager.db_manager(using)
+        pks = manager.order_by('pk').values_list('pk', flat=True)
+        fixed[model] = 0
+        start = None
+        while True:
+            batch = pks.filter(pk__gt=start) if start is not None else pks
+            last = list(batch[:batch_size])
+            if not last:
+                break
+            drifted = manager.filter(
+                pk__gte=last[0], pk__lte=last[-1]
+            ).annotate(actual=actual).exclude(recipe_count=F('actual'))
+            fixed[model] += drifted.update(recipe_count=actual)
+            start = last[-1]
+
+    return fixed
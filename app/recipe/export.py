@@ -0,0 +1,107 @@
+import tempfile
+import zlib
+from itertools import islice
+
+from core.models import Tag, Ingredient, Recipe  # noqa
+from core.renderers import FastJSONRenderer  # noqa
+
+from recipe.fastpath import related_ids  # noqa
+
+RECIPE_COLUMNS = ('id', 'title', 'time_minutes', 'price', 'link')
+PRICE_PLACES = Recipe._meta.get_field('price').decimal_places
+
+# flush output to the client in pieces of about this many bytes
+BUFFER_SIZE = 64 * 1024
+# exports spooled to a file stay in memory up to this size
+SPOOL_MEMORY = 1024 * 1024
+
+
+def _chunks(rows, size):
+    """Split an iterator in lists of at most size items"""
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def iter_records(user, chunk_size):
+    """Yield every tag, ingredient and recipe of a user as dicts"""
+    for kind, model in (('tag', Tag), ('ingredient', Ingredient)):
+        rows = model.objects.filter(user=user).order_by('id').values(
+            'id', 'name').iterator(chunk_size=chunk_size)
+        for row in rows:
+            yield {'type': kind, **row}
+
+    rows = Recipe.objects.filter(user=user).order_by('id').values(
+        *RECIPE_COLUMNS).iterator(chunk_size=chunk_size)
+    for chunk in _chunks(rows, chunk_size):
+        ids = [row['id'] for row in chunk]
+        tags = related_ids(Recipe, 'tags', ids)
+        ingredients = related_ids(Recipe, 'ingredients', ids)
+        for row in chunk:
+            yield {
+                'type': 'recipe',
+                **row,
+                'price': f"{row['price']:.{PRICE_PLACES}f}",
+                'tags': tags.get(row['id'], []),
+                'ingredients': ingredients.get(row['id'], []),
+            }
+
+
+def iter_encoded(records, output):
+    """Encode records as NDJSON lines or as one JSON array"""
+    render = FastJSONRenderer().render
+    if output == 'ndjson':
+        for record in records:
+            yield render(record) + b'\n'
+        return
+
+    separator = b'['
+    for record in records:
+        yield separator + render(record)
+        separator = b','
+    yield b'[]' if separator == b'[' else b']'
+
+
+def iter_buffered(pieces, compress=False):
+    """Group small pieces into larger writes, gzipping them if asked"""
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16) \
+        if compress else None
+    buffer = bytearray()
+    for piece in pieces:
+        buffer += piece
+        if len(buffer) >= BUFFER_SIZE:
+            yield compressor.compress(bytes(buffer)) if compressor \
+                else bytes(buffer)
+            buffer.clear()
+
+    if compressor:
+        yield compressor.compress(bytes(buffer)) + compressor.flush()
+    elif buffer:
+        yield bytes(buffer)
+
+
+def stream_export(user, output='ndjson', compress=False, chunk_size=2000):
+    """Return an iterator over the encoded export of a user's data"""
+    records = iter_records(user, chunk_size)
+
+    return iter_buffered(iter_encoded(records, output), compress)
+
+
+def spool_export(pieces, max_memory=SPOOL_MEMORY):
+    """Write an export to a temporary file, on disk once it is large
+
+    Return the file, rewound, and its size.
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=max_memory)
+    try:
+        for piece in pieces:
+            spool.write(piece)
+    except BaseException:
+        spool.close()
+        raise
+    size = spool.tell()
+    spool.seek(0)
+
+    return spool, size
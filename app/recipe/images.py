@@ -0,0 +1,178 @@
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from PIL import Image
+
+from django.conf import settings  # noqa
+from django.core.files.base import ContentFile  # noqa
+from django.core.files.storage import default_storage  # noqa
+from django.db import close_old_connections, transaction  # noqa
+
+from core.models import Recipe  # noqa
+
+from recipe.cache import bump_user_version  # noqa
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_variants():
+    """Return the variant name to max (width, height) mapping"""
+    return settings.RECIPE_IMAGE_VARIANTS
+
+
+def variant_path(image_name, variant):
+    """Return the storage path of a variant of an image"""
+    directory, filename = os.path.split(image_name)
+    stem = os.path.splitext(filename)[0]
+
+    return os.path.join(directory, 'variants', f'{stem}_{variant}.jpg')
+
+
+def variant_urls(image_name, request=None):
+    """Return the URL of every variant of an image"""
+    urls = {}
+    for variant in get_variants():
+        url = default_storage.url(variant_path(image_name, variant))
+        urls[variant] = request.build_absolute_uri(url) if request else url
+
+    return urls
+
+
+def _save_jpeg(img):
+    output = BytesIO()
+    img.save(output, format='JPEG', quality=85, optimize=True)
+
+    return output.getvalue()
+
+
+def render_variants(source, variants):
+    """Return {variant: JPEG bytes} of an image scaled down to fit each size
+
+    The source is decoded once and each variant is scaled from the
+    smallest larger one already rendered rather than from the original.
+    """
+    # largest first, so every variant can start from the one before it
+    ordered = sorted(variants.items(), key=lambda item: item[1],
+                     reverse=True)
+    rendered = {}
+    with Image.open(source) as img:
+        # let the JPEG decoder downscale by a power of two while reading,
+        # as far as the bounds every variant fits in allow
+        img.draft('RGB', (max(size[0] for size in variants.values()),
+                          max(size[1] for size in variants.values())))
+        img = img.convert('RGB')
+        parent, parent_size = img, None
+        for variant, size in ordered:
+            if parent_size is None or size[0] > parent_size[0] \
+                    or size[1] > parent_size[1]:
+                parent = img
+            scaled = parent.copy()
+            # reduce() to near the target before resampling the rest
+            scaled.thumbnail(size, Image.LANCZOS, reducing_gap=2.0)
+            rendered[variant] = _save_jpeg(scaled)
+            parent, parent_size = scaled, size
+
+    return rendered
+
+
+def set_image_status(recipe_id, user_id, image_name, image_status):
+    """Set the status of a recipe image unless it was replaced"""
+    # update() skips post_save, so invalidate cached lists by hand
+    Recipe.objects.filter(pk=recipe_id, image=image_name).update(
+        image_status=image_status)
+    bump_user_version(user_id)
+
+
+def generate_variants(recipe_id, image_name):
+    """Write every variant of a recipe image and mark it ready"""
+    recipe = Recipe.objects.filter(pk=recipe_id, image=image_name).only(
+        'id', 'user').first()
+    if recipe is None:
+        # the image was replaced or the recipe deleted meanwhile
+        return
+
+    try:
+        with default_storage.open(image_name) as source:
+            rendered = render_variants(source, get_variants())
+        for variant, content in rendered.items():
+            path = variant_path(image_name, variant)
+            if default_storage.exists(path):
+                default_storage.delete(path)
+            default_storage.save(path, ContentFile(content))
+        image_status = Recipe.IMAGE_READY
+    except Exception:
+        logger.exception('Failed to render variants of %s', image_name)
+        image_status = Recipe.IMAGE_FAILED
+
+    set_image_status(recipe_id, recipe.user_id, image_name, image_status)
+
+
+def _run(recipe_id, image_name):
+    try:
+        generate_variants(recipe_id, image_name)
+    finally:
+        close_old_connections()
+
+
+class BoundedExecutor(ThreadPoolExecutor):
+    """Thread pool refusing work once max_queued tasks are unfinished"""
+
+    def __init__(self, max_queued, **kwargs):
+        super().__init__(**kwargs)
+        self._slots = threading.BoundedSemaphore(max_queued)
+
+    def try_submit(self, fn, *args):
+        """Submit a call, return its future or None when the queue is full"""
+        if not self._slots.acquire(blocking=False):
+            return None
+        try:
+            future = self.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda future: self._slots.release())
+
+        return future
+
+
+def get_executor():
+    """Return the bounded pool variants are rendered on"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = BoundedExecutor(
+                max_queued=settings.RECIPE_IMAGE_QUEUE_SIZE,
+                max_workers=settings.RECIPE_IMAGE_WORKERS,
+                thread_name_prefix='recipe-images',
+            )
+
+    return _executor
+
+
+def shutdown_executor(wait=True):
+    """Stop the pool, waiting for queued variants unless told otherwise"""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=wait)
+
+
+def submit_variants(recipe_id, user_id, image_name):
+    """Queue rendering the variants, or fail the image if the queue is full"""
+    if get_executor().try_submit(_run, recipe_id, image_name) is None:
+        logger.warning('Image queue full, not rendering variants of %s',
+                       image_name)
+        set_image_status(recipe_id, user_id, image_name, Recipe.IMAGE_FAILED)
+
+
+def schedule_variants(recipe):
+    """Render the variants of a recipe image once the upload is committed"""
+    args = recipe.pk, recipe.user_id, recipe.image.name
+    transaction.on_commit(lambda: submit_variants(*args))
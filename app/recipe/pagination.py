@@ -0,0 +1,31 @@
+from rest_framework.pagination import CursorPagination  # noqa
+
+
+class RecipeCursorPagination(CursorPagination):
+    """Keyset pagination for recipes, newest first"""
+    ordering = '-id'
+    page_size = 25
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    def get_ordering(self, request, queryset, view):
+        """Order search results by rank, newest first on ties"""
+        if 'search_rank' in queryset.query.annotations:
+            return ('-search_rank', '-id')
+
+        return super().get_ordering(request, queryset, view)
+
+
+class AttrCursorPagination(CursorPagination):
+    """Keyset pagination for user owned tags/ingredients by name"""
+    ordering = '-name'
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 250
+
+    def get_ordering(self, request, queryset, view):
+        """Order by recipe count when most used objs are asked first"""
+        if view.get_ordering() == 'popular':
+            return ('-recipe_count', '-name')
+
+        return super().get_ordering(request, queryset, view)
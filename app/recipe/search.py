@@ -0,0 +1,125 @@
+import re
+
+from django.db import connections  # noqa
+from django.db.models import BooleanField, IntegerField  # noqa
+from django.db.models.expressions import RawSQL  # noqa
+
+FTS_TABLE = 'core_recipe_search'
+
+# rank is scaled to an integer so cursor pagination positions are exact
+RANK_SCALE = 1000000
+
+_RELATED_NAMES_SQL = (
+    "(SELECT {agg} FROM core_{model} x "
+    "JOIN core_recipe_{model}s rx ON rx.{model}_id = x.id "
+    "WHERE rx.recipe_id = r.id)"
+)
+
+_POSTGRES_REFRESH_SQL = (
+    "UPDATE core_recipe r SET search_vector = "
+    "setweight(to_tsvector('english', r.title), 'A') || "
+    "setweight(to_tsvector('english', coalesce({tags}, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce({ingredients}, '')), 'B') "
+    "WHERE r.id IN ({ids})"
+)
+
+_SQLITE_REFRESH_SQL = (
+    "INSERT INTO " + FTS_TABLE + " (rowid, title, tags, ingredients) "
+    "SELECT r.id, r.title, coalesce({tags}, ''), coalesce({ingredients}, '') "
+    "FROM core_recipe r WHERE r.id IN ({ids})"
+)
+
+
+def is_supported(connection):
+    """Return whether a database has a search index"""
+    return connection.vendor in ('postgresql', 'sqlite')
+
+
+def _related_names(vendor, model):
+    agg = "string_agg(x.name, ' ')" if vendor == 'postgresql' \
+        else "group_concat(x.name, ' ')"
+
+    return _RELATED_NAMES_SQL.format(agg=agg, model=model)
+
+
+def refresh_search_index(recipe_ids, using='default'):
+    """Rebuild the search index entries of the given recipes"""
+    connection = connections[using]
+    recipe_ids = [int(recipe_id) for recipe_id in recipe_ids]
+    if not recipe_ids or not is_supported(connection):
+        return
+
+    vendor = connection.vendor
+    ids = ', '.join(['%s'] * len(recipe_ids))
+    sql = _POSTGRES_REFRESH_SQL if vendor == 'postgresql' \
+        else _SQLITE_REFRESH_SQL
+    sql = sql.format(
+        tags=_related_names(vendor, 'tag'),
+        ingredients=_related_names(vendor, 'ingredient'),
+        ids=ids,
+    )
+    with connection.cursor() as cursor:
+        if vendor == 'sqlite':
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid IN ({ids})', recipe_ids)
+        cursor.execute(sql, recipe_ids)
+
+
+def remove_from_search_index(recipe_ids, using='default'):
+    """Drop index entries of deleted recipes"""
+    connection = connections[using]
+    recipe_ids = [int(recipe_id) for recipe_id in recipe_ids]
+    # the postgres vector lives on the recipe row itself
+    if not recipe_ids or connection.vendor != 'sqlite':
+        return
+
+    ids = ', '.join(['%s'] * len(recipe_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {FTS_TABLE} WHERE rowid IN ({ids})', recipe_ids)
+
+
+def _search_words(terms):
+    """Split user input into words, dropping any query syntax"""
+    return re.findall(r'\w+', terms)
+
+
+def search_recipes(queryset, terms):
+    """Filter recipes matching search terms and annotate their rank
+
+    Every word must match the start of a stemmed word of the title, tags
+    or ingredients, on postgres and sqlite alike.
+    """
+    vendor = connections[queryset.db].vendor
+    if vendor not in ('postgresql', 'sqlite'):
+        return queryset.filter(title__icontains=terms).annotate(
+            search_rank=RawSQL('0', [], output_field=IntegerField()))
+
+    words = _search_words(terms)
+    if not words:
+        return queryset.none()
+
+    if vendor == 'postgresql':
+        query = "to_tsquery('english', %s)"
+        terms = ' & '.join(f'{word}:*' for word in words)
+        match = RawSQL(f'core_recipe.search_vector @@ {query}', [terms],
+                       output_field=BooleanField())
+        rank = RawSQL(
+            f'(ts_rank(core_recipe.search_vector, {query}) '
+            f'* {RANK_SCALE})::integer', [terms],
+            output_field=IntegerField())
+
+        return queryset.filter(match).annotate(search_rank=rank)
+
+    # joined once, so bm25() ranks each match without another lookup
+    terms = ' '.join(f'"{word}"*' for word in words)
+    rank = RawSQL(
+        f'CAST(-bm25({FTS_TABLE}) * {RANK_SCALE} AS INTEGER)', [],
+        output_field=IntegerField())
+
+    return queryset.extra(
+        tables=[FTS_TABLE],
+        where=[f'{FTS_TABLE}.rowid = core_recipe.id',
+               f'{FTS_TABLE} MATCH %s'],
+        params=[terms],
+    ).annotate(search_rank=rank)
@@ -1,38 +1,178 @@
+from django.conf import settings  # noqa
 from rest_framework import serializers  # noqa
 
 from core.models import Tag, Ingredient, Recipe  # noqa
+from core.timing import TimedListSerializer, TimedSerializerMixin  # noqa
 
+from recipe.bulk import insert_recipes  # noqa
+from recipe.images import variant_urls  # noqa
 
-class TagSerializer(serializers.HyperlinkedModelSerializer):
+
+class SparseFieldsMixin:
+    """Trim output to the requested fields and nest expanded relations
+
+    The view passes the requested `fields` and `expand` names through the
+    serializer context. `optional_fields` are only output when requested.
+    """
+    expandable_fields = {}
+    optional_fields = ()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for name in self.context.get('expand') or ():
+            if name in self.expandable_fields:
+                self.fields[name] = self.expandable_fields[name](
+                    many=True, read_only=True)
+
+        requested = self.context.get('fields')
+        if requested:
+            dropped = set(self.fields) - set(requested)
+        else:
+            dropped = set(self.optional_fields)
+        for name in dropped:
+            self.fields.pop(name, None)
+
+
+class TagSerializer(TimedSerializerMixin, SparseFieldsMixin,
+                    serializers.HyperlinkedModelSerializer):
     """Serializers for tag objects"""
+    recipe_count = serializers.IntegerField(read_only=True)
+    optional_fields = ('recipe_count',)
 
     class Meta:
         model = Tag
-        fields = ('id', 'name',)
+        fields = ('id', 'name', 'recipe_count')
         read_only_fields = ('id',)
+        list_serializer_class = TimedListSerializer
 
 
-class IngredientSerializer(serializers.HyperlinkedModelSerializer):
+class IngredientSerializer(TimedSerializerMixin, SparseFieldsMixin,
+                           serializers.HyperlinkedModelSerializer):
     """Serializers for ingredient objects"""
+    recipe_count = serializers.IntegerField(read_only=True)
+    optional_fields = ('recipe_count',)
 
     class Meta:
         model = Ingredient
-        fields = ('id', 'name',)
+        fields = ('id', 'name', 'recipe_count')
         read_only_fields = ('id',)
+        list_serializer_class = TimedListSerializer
+
+
+class AttrNamesSerializer(serializers.Serializer):
+    """Serializer for a batch of tag/ingredient names"""
+    names = serializers.ListField(
+        child=serializers.CharField(max_length=255),
+        allow_empty=False,
+        max_length=1000,
+    )
+
+
+class ImageVariantsField(serializers.Field):
+    """URLs of the resized variants of a recipe image once rendered"""
+
+    def __init__(self, **kwargs):
+        kwargs['source'] = '*'
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, recipe):
+        if not recipe.image or recipe.image_status != Recipe.IMAGE_READY:
+            return None
+
+        return variant_urls(recipe.image.name, self.context.get('request'))
 
 
-class RecipeSerializer(serializers.HyperlinkedModelSerializer):
+class PreloadedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """Primary key field resolving objs preloaded by a bulk serializer"""
+
+    def to_internal_value(self, data):
+        preloaded = self.context.get('preloaded', {}).get(
+            self.get_queryset().model)
+        if preloaded is None:
+            return super().to_internal_value(data)
+        try:
+            return preloaded[int(data)]
+        except KeyError:
+            self.fail('does_not_exist', pk_value=data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+
+class RecipeListSerializer(TimedListSerializer):
+    """Validate and create many recipes in a single transaction"""
+    related_fields = ('ingredients', 'tags')
+
+    def to_internal_value(self, data):
+        """Load all referenced tags/ingredients with one query each"""
+        if isinstance(data, list):
+            max_size = getattr(settings, 'RECIPE_BULK_MAX_SIZE', 1000)
+            if len(data) > max_size:
+                raise serializers.ValidationError({
+                    'non_field_errors': [
+                        f'Ensure there are no more than {max_size} recipes.'
+                    ]
+                })
+            self._context['preloaded'] = self._preload_related(data)
+
+        return super().to_internal_value(data)
+
+    def _preload_related(self, data):
+        preloaded = {}
+        for name in self.related_fields:
+            relation = self.child.fields[name].child_relation
+            pks = set()
+            for item in data:
+                values = item.get(name) if isinstance(item, dict) else None
+                for value in values if isinstance(values, list) else ():
+                    try:
+                        pks.add(int(value))
+                    except (TypeError, ValueError):
+                        pass
+            queryset = relation.get_queryset()
+            preloaded[queryset.model] = queryset.in_bulk(pks)
+
+        return preloaded
+
+    def create(self, validated_data):
+        """Insert recipes and their through table rows in batches"""
+        links = [
+            {name: [obj.pk for obj in attrs.pop(name, [])]
+             for name in self.related_fields}
+            for attrs in validated_data
+        ]
+        recipes = insert_recipes(
+            [Recipe(**attrs) for attrs in validated_data],
+            links,
+            batch_size=getattr(settings, 'RECIPE_BULK_BATCH_SIZE', 500),
+        )
+
+        return list(
+            Recipe.objects.filter(
+                pk__in=[recipe.pk for recipe in recipes]
+            ).prefetch_related('ingredients', 'tags').order_by('id')
+        )
+
+
+class RecipeSerializer(TimedSerializerMixin, SparseFieldsMixin,
+                       serializers.HyperlinkedModelSerializer):
     """Serializers for Recipe objects"""
-    ingredients = serializers.PrimaryKeyRelatedField(
+    expandable_fields = {
+        'ingredients': IngredientSerializer,
+        'tags': TagSerializer,
+    }
+    ingredients = PreloadedPrimaryKeyRelatedField(
         many=True, queryset=Ingredient.objects.all(),)
-    tags = serializers.PrimaryKeyRelatedField(
+    tags = PreloadedPrimaryKeyRelatedField(
         many=True, queryset=Tag.objects.all(),)
+    image_variants = ImageVariantsField()
 
     class Meta:
         model = Recipe
         fields = ('id', 'title', 'ingredients', 'tags', 'price',
-                  'time_minutes', 'link')
-        read_only_fields = ('id',)
+                  'time_minutes', 'link', 'image_status', 'image_variants')
+        read_only_fields = ('id', 'image_status')
+        list_serializer_class = RecipeListSerializer
 
 
 class RecipeDetailSerializer(RecipeSerializer):
@@ -42,10 +182,12 @@ class RecipeDetailSerializer(RecipeSerializer):
     tags = TagSerializer(many=True, read_only=True)
 
 
-class RecipeImageSerializer(serializers.HyperlinkedModelSerializer):
+class RecipeImageSerializer(TimedSerializerMixin,
+                            serializers.HyperlinkedModelSerializer):
     """Serializer for uploading images to recipe"""
+    image_variants = ImageVariantsField()
 
     class Meta:
         model = Recipe
-        fields = ('id', 'image')
-        read_only_fields = ('id',)
+        fields = ('id', 'image', 'image_status', 'image_variants')
+        read_only_fields = ('id', 'image_status')
@@ -0,0 +1,154 @@
+from django.contrib.auth import get_user_model  # noqa
+from django.db.models.signals import (post_save, pre_delete,  # noqa
+                                      post_delete, m2m_changed)  # noqa
+from django.dispatch import receiver  # noqa
+
+from core.models import Tag, Ingredient, Recipe  # noqa
+
+from recipe.cache import bump_user_version  # noqa
+from recipe.counters import (COUNTED_FIELDS, adjust_counts,  # noqa
+                             counted_field, link_column, linked_counts)  # noqa
+from recipe.search import refresh_search_index, remove_from_search_index  # noqa
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_owner_lists(sender, instance, **kwargs):
+    """Drop cached list responses of the owner of a changed obj"""
+    bump_user_version(instance.user_id)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def invalidate_owner_lists_on_link(sender, instance, action, **kwargs):
+    """Drop cached list responses when recipe links change"""
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump_user_version(instance.user_id)
+
+
+@receiver(post_save, sender=get_user_model())
+def invalidate_new_user_lists(sender, instance, created, **kwargs):
+    """Start new users on a fresh version in case their id was reused"""
+    if created:
+        bump_user_version(instance.pk)
+
+
+@receiver(post_save, sender=Recipe)
+def index_saved_recipe(sender, instance, update_fields, using, **kwargs):
+    """Keep the search index entry of a recipe up to date"""
+    if update_fields is None or 'title' in update_fields:
+        refresh_search_index([instance.pk], using=using)
+
+
+@receiver(post_delete, sender=Recipe)
+def unindex_deleted_recipe(sender, instance, using, **kwargs):
+    """Drop the search index entry of a deleted recipe"""
+    remove_from_search_index([instance.pk], using=using)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def index_relinked_recipes(sender, instance, action, reverse, pk_set, using,
+                           **kwargs):
+    """Reindex recipes whose tags/ingredients changed"""
+    if reverse and action == 'pre_clear':
+        instance._search_recipe_ids = list(
+            instance.recipe_set.values_list('pk', flat=True))
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if not reverse:
+        recipe_ids = [instance.pk]
+    elif action == 'post_clear':
+        recipe_ids = getattr(instance, '_search_recipe_ids', [])
+    else:
+        recipe_ids = pk_set
+    refresh_search_index(recipe_ids, using=using)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def index_renamed_attr_recipes(sender, instance, created, using, **kwargs):
+    """Reindex recipes linked to a renamed tag/ingredient"""
+    if not created:
+        refresh_search_index(
+            instance.recipe_set.values_list('pk', flat=True), using=using)
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def collect_deleted_attr_recipes(sender, instance, **kwargs):
+    """Remember recipes linked to a tag/ingredient before it is deleted"""
+    instance._search_recipe_ids = list(
+        instance.recipe_set.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def index_deleted_attr_recipes(sender, instance, using, **kwargs):
+    """Reindex recipes that lost a deleted tag/ingredient"""
+    refresh_search_index(
+        getattr(instance, '_search_recipe_ids', []), using=using)
+
+
+@receiver(post_save, sender=Recipe)
+def count_created_recipe(sender, instance, created, using, **kwargs):
+    """Count a new recipe for its owner"""
+    if created:
+        adjust_counts(get_user_model(), {instance.user_id: 1}, using)
+
+
+@receiver(pre_delete, sender=Recipe)
+def collect_deleted_recipe_links(sender, instance, using, **kwargs):
+    """Remember what a recipe links to before its links are deleted"""
+    instance._counted_links = {
+        name: linked_counts(name, [instance.pk], using)
+        for name in COUNTED_FIELDS
+    }
+
+
+@receiver(post_delete, sender=Recipe)
+def uncount_deleted_recipe(sender, instance, using, **kwargs):
+    """Uncount a deleted recipe from its owner, tags and ingredients"""
+    adjust_counts(get_user_model(), {instance.user_id: -1}, using)
+    links = getattr(instance, '_counted_links', {})
+    for name, model in COUNTED_FIELDS.items():
+        adjust_counts(model, {pk: -n for pk, n in links.get(name, {}).items()},
+                      using)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def count_relinked_recipes(sender, instance, action, reverse, pk_set, using,
+                           **kwargs):
+    """Keep tag/ingredient recipe counts in step with recipe links"""
+    name = counted_field(sender)
+    model = COUNTED_FIELDS[name]
+    column = link_column(name)
+
+    if action in ('pre_remove', 'pre_clear'):
+        # only rows actually deleted are uncounted, pk_set may list others
+        links = sender._default_manager.db_manager(using)
+        if reverse:
+            links = links.filter(**{column: instance.pk})
+            if pk_set is not None:
+                links = links.filter(recipe_id__in=pk_set)
+            deltas = {instance.pk: -links.count()}
+        else:
+            links = links.filter(recipe_id=instance.pk)
+            if pk_set is not None:
+                links = links.filter(**{f'{column}__in': pk_set})
+            deltas = {pk: -1 for pk in links.values_list(column, flat=True)}
+        instance._counted_unlinks = deltas
+    elif action in ('post_remove', 'post_clear'):
+        adjust_counts(model, getattr(instance, '_counted_unlinks', {}), using)
+    elif action == 'post_add' and pk_set:
+        # pk_set only holds links that were actually inserted
+        if reverse:
+            adjust_counts(model, {instance.pk: len(pk_set)}, using)
+        else:
+            adjust_counts(model, {pk: 1 for pk in pk_set}, using)
@@ -1,3 +1,10 @@
 from .test_tags_api import *  # noqa
 from .test_ingredients_api import *  # noqa
-from .test_recipes_api import *  # noqa
\ No newline at end of file
+from .test_recipes_api import *  # noqa
+from .test_list_cache import *  # noqa
+from .test_search_api import *  # noqa
+from .test_fastpath import *  # noqa
+from .test_export_api import *  # noqa
+from .test_async_views import *  # noqa
+from .test_counters import *  # noqa
+from .test_replicas import *  # noqa
@@ -0,0 +1,165 @@
+import asyncio
+import json
+import threading
+from unittest.mock import patch
+
+from asgiref.sync import sync_to_async
+
+from django.conf import settings  # noqa
+from django.contrib.auth import get_user_model  # noqa
+from django.db import close_old_connections, connections  # noqa
+from django.test import (AsyncClient, TestCase, TransactionTestCase,  # noqa
+                         override_settings)  # noqa
+from django.urls import include, path, reverse  # noqa
+
+from rest_framework.authtoken.models import Token  # noqa
+
+from core.authentication import token_cache  # noqa
+from core.models import Tag, Recipe  # noqa
+
+from recipe import async_views, urls as recipe_urls  # noqa
+
+urlpatterns = [
+    path('api/recipe/', include((
+        recipe_urls.async_urlpatterns + recipe_urls.router.urls, 'recipe'))),
+]
+
+
+@override_settings(ROOT_URLCONF=__name__,
+                   RECIPE_ASYNC_THREAD_SENSITIVE=True)
+class AsyncViewTests(TestCase):
+    """Test the native async recipe API views"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@email.com',
+            'password'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = AsyncClient()
+        self.auth = {'authorization': f'Token {self.token.key}'}
+        token_cache.clear()
+
+    def tearDown(self):
+        token_cache.clear()
+
+    def test_views_are_coroutines(self):
+        """Test that Django dispatches the routes as async views"""
+        for pattern in recipe_urls.async_urlpatterns:
+            self.assertTrue(asyncio.iscoroutinefunction(pattern.callback))
+
+    async def test_list_recipes(self):
+        """Test listing recipes through the async view"""
+        recipe = await sync_to_async(Recipe.objects.create)(
+            user=self.user, title='Soup', time_minutes=5, price=2)
+
+        res = await self.client.get(reverse('recipe:recipe-list'), **self.auth)
+
+        self.assertEqual(res.status_code, 200)
+        results = json.loads(res.content)['results']
+        self.assertEqual([r['id'] for r in results], [recipe.id])
+
+    async def test_retrieve_recipe(self):
+        """Test retrieving a recipe through the async view"""
+        recipe = await sync_to_async(Recipe.objects.create)(
+            user=self.user, title='Soup', time_minutes=5, price=2)
+
+        res = await self.client.get(
+            reverse('recipe:recipe-detail', args=[recipe.id]), **self.auth)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(json.loads(res.content)['title'], 'Soup')
+
+    async def test_create_tag(self):
+        """Test creating a tag through the async view"""
+        res = await self.client.post(
+            reverse('recipe:tag-list'), {'name': 'Vegan'},
+            content_type='application/json', **self.auth)
+
+        self.assertEqual(res.status_code, 201)
+        exists = await sync_to_async(
+            Tag.objects.filter(user=self.user, name='Vegan').exists)()
+        self.assertTrue(exists)
+
+    async def test_unauthenticated_rejected(self):
+        """Test that requests without a token are rejected"""
+        res = await AsyncClient().get(reverse('recipe:ingredient-list'))
+
+        self.assertEqual(res.status_code, 401)
+
+    async def test_cached_token_skips_lookup(self):
+        """Test that a cached token authenticates without a query"""
+        url = reverse('recipe:tag-list')
+        await self.client.get(url, **self.auth)
+        await sync_to_async(Token.objects.filter(pk=self.token.pk).delete)()
+        # deleting evicts the cache, put the pair back to prove it is used
+        token_cache.set(self.token.key, (self.user, self.token))
+
+        res = await self.client.get(url, **self.auth)
+
+        self.assertEqual(res.status_code, 200)
+
+
+# rows must be committed for the executor thread's own connection to see
+@override_settings(ROOT_URLCONF=__name__)
+class AsyncViewExecutorTests(TransactionTestCase):
+    """Test the async views with the default, thread insensitive setup"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@email.com',
+            'password'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = AsyncClient()
+        self.auth = {'authorization': f'Token {self.token.key}'}
+        token_cache.clear()
+        self.close_threads = []
+
+        def record_close():
+            self.close_threads.append(threading.get_ident())
+            close_old_connections()
+
+        patcher = patch.object(async_views, 'close_old_connections',
+                               side_effect=record_close)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # executor threads keep their connections otherwise, which would
+        # outlive the test database
+        max_age = patch.dict(connections.databases['default'],
+                             CONN_MAX_AGE=0)
+        max_age.start()
+        self.addCleanup(max_age.stop)
+
+    def tearDown(self):
+        token_cache.clear()
+
+    def test_default_is_thread_insensitive(self):
+        """Test that the shipped setting runs views off the sync thread"""
+        self.assertFalse(settings.RECIPE_ASYNC_THREAD_SENSITIVE)
+
+    async def test_list_recipes(self):
+        """Test listing recipes from an executor thread"""
+        recipe = await sync_to_async(Recipe.objects.create)(
+            user=self.user, title='Soup', time_minutes=5, price=2)
+
+        res = await self.client.get(reverse('recipe:recipe-list'), **self.auth)
+
+        self.assertEqual(res.status_code, 200)
+        results = json.loads(res.content)['results']
+        self.assertEqual([r['id'] for r in results], [recipe.id])
+
+    async def test_connections_closed_in_worker_thread(self):
+        """Test that the executor thread closes its connection around views"""
+        res = await self.client.post(
+            reverse('recipe:tag-list'), {'name': 'Vegan'},
+            content_type='application/json', **self.auth)
+
+        self.assertEqual(res.status_code, 201)
+        # once before and once after the view, both on its own thread
+        self.assertEqual(len(self.close_threads), 2)
+        self.assertEqual(len(set(self.close_threads)), 1)
+        self.assertNotEqual(self.close_threads[0], threading.get_ident())
+        exists = await sync_to_async(
+            Tag.objects.filter(user=self.user, name='Vegan').exists)()
+        self.assertTrue(exists)
@@ -0,0 +1,150 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model  # noqa
+from django.core.management import call_command  # noqa
+from django.db import connection  # noqa
+from django.test import TestCase  # noqa
+from django.test.utils import CaptureQueriesContext  # noqa
+from django.urls import reverse  # noqa
+
+from rest_framework.test import APIClient  # noqa
+
+from core.models import Tag, Ingredient, Recipe  # noqa
+
+
+def sample_recipe(user, **params):
+    """create and return a sample recipe"""
+    defaults = {
+        'title': 'Recipe Title',
+        'time_minutes': 10,
+        'price': 5
+    }
+    defaults.update(params)
+
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class RecipeCounterTests(TestCase):
+    """Test the denormalized recipe counters"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@email.com',
+            'password'
+        )
+        self.tag1 = Tag.objects.create(user=self.user, name='Vegan')
+        self.tag2 = Tag.objects.create(user=self.user, name='Dessert')
+
+    def counts(self, *objs):
+        """Return the stored recipe_count of some objs"""
+        return [type(obj).objects.get(pk=obj.pk).recipe_count
+                for obj in objs]
+
+    def test_recipes_counted_for_owner(self):
+        """Test that creating and deleting recipes updates the owner"""
+        recipe = sample_recipe(self.user)
+        sample_recipe(self.user)
+        self.assertEqual(self.counts(self.user), [2])
+
+        recipe.delete()
+
+        self.assertEqual(self.counts(self.user), [1])
+
+    def test_save_keeps_counts(self):
+        """Test that saving a stale instance doesn't overwrite its count"""
+        recipe = sample_recipe(self.user)
+        recipe.tags.add(self.tag1)
+        # self.tag1 was loaded before the link, holding a count of 0
+        self.tag1.name = 'Vegetarian'
+        self.tag1.save()
+        self.user.save(update_fields=['name', 'recipe_count'])
+
+        self.assertEqual(self.counts(self.tag1, self.user), [1, 1])
+        self.assertEqual(Tag.objects.get(pk=self.tag1.pk).name, 'Vegetarian')
+
+    def test_save_skips_deferred_fields(self):
+        """Test that saving a partly loaded obj only writes loaded fields"""
+        sample_recipe(self.user)
+        user = get_user_model().objects.only('name').get(pk=self.user.pk)
+        user.name = 'Renamed'
+
+        with CaptureQueriesContext(connection) as context:
+            user.save()
+
+        self.assertEqual(len(context.captured_queries), 1)
+        self.assertNotIn('email', context.captured_queries[0]['sql'])
+        self.assertEqual(self.counts(self.user), [1])
+        self.assertEqual(get_user_model().objects.get(pk=self.user.pk).name,
+                         'Renamed')
+
+    def test_links_counted(self):
+        """Test that adding, removing and clearing links updates counts"""
+        recipe = sample_recipe(self.user)
+        recipe.tags.add(self.tag1, self.tag2)
+        # already linked, so not counted twice
+        recipe.tags.add(self.tag1)
+        self.assertEqual(self.counts(self.tag1, self.tag2), [1, 1])
+
+        recipe.tags.remove(self.tag1)
+        self.assertEqual(self.counts(self.tag1, self.tag2), [0, 1])
+        # not linked anymore, so not uncounted twice
+        recipe.tags.remove(self.tag1)
+        self.assertEqual(self.counts(self.tag1, self.tag2), [0, 1])
+
+        recipe.tags.clear()
+        self.assertEqual(self.counts(self.tag1, self.tag2), [0, 0])
+
+    def test_reverse_links_counted(self):
+        """Test that links made from the tag side update counts"""
+        recipe1 = sample_recipe(self.user)
+        recipe2 = sample_recipe(self.user)
+
+        self.tag1.recipe_set.add(recipe1, recipe2)
+        self.assertEqual(self.counts(self.tag1), [2])
+
+        self.tag1.recipe_set.remove(recipe1)
+        self.assertEqual(self.counts(self.tag1), [1])
+
+        self.tag1.recipe_set.clear()
+        self.assertEqual(self.counts(self.tag1), [0])
+
+    def test_deleted_recipe_uncounted(self):
+        """Test that deleting a recipe uncounts its tags and ingredients"""
+        ingredient = Ingredient.objects.create(user=self.user, name='Salt')
+        recipe = sample_recipe(self.user)
+        recipe.tags.add(self.tag1)
+        recipe.ingredients.add(ingredient)
+
+        recipe.delete()
+
+        self.assertEqual(self.counts(self.tag1, ingredient), [0, 0])
+
+    def test_bulk_created_recipes_counted(self):
+        """Test that recipes created through the bulk endpoint are counted"""
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        client.post(reverse('recipe:recipe-bulk'), [
+            {'title': 'Salad', 'time_minutes': 5, 'price': '2.00',
+             'tags': [self.tag1.id, self.tag2.id], 'ingredients': []},
+            {'title': 'Soup', 'time_minutes': 5, 'price': '2.00',
+             'tags': [self.tag1.id], 'ingredients': []},
+        ], format='json')
+
+        self.assertEqual(self.counts(self.user, self.tag1, self.tag2),
+                         [2, 2, 1])
+
+    def test_recount_fixes_drift(self):
+        """Test that the recount command repairs wrong counters"""
+        recipe = sample_recipe(self.user)
+        recipe.tags.add(self.tag1)
+        Tag.objects.filter(pk=self.tag1.pk).update(recipe_count=7)
+        Tag.objects.filter(pk=self.tag2.pk).update(recipe_count=-1)
+        get_user_model().objects.update(recipe_count=0)
+        out = StringIO()
+
+        call_command('recount_recipes', batch_size=1, stdout=out)
+
+        self.assertEqual(self.counts(self.user, self.tag1, self.tag2),
+                         [1, 1, 0])
+        self.assertIn('tags: 2 fixed', out.getvalue())
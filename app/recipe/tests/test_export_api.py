@@ -0,0 +1,184 @@
+import gzip
+import json
+
+from asgiref.sync import async_to_sync
+
+from django.contrib.auth import get_user_model  # noqa
+from django.core.asgi import get_asgi_application  # noqa
+from django.urls import reverse  # noqa
+from django.test import TestCase, TransactionTestCase  # noqa
+
+from rest_framework import status  # noqa
+from rest_framework.authtoken.models import Token  # noqa
+from rest_framework.test import APIClient  # noqa
+
+from core.models import Tag, Ingredient, Recipe  # noqa
+
+
+EXPORT_URL = reverse('recipe:recipe-export')
+
+
+class PublicExportApiTests(TestCase):
+    """Test the export API without authentication"""
+
+    def test_login_required(self):
+        """Test that login is required to export"""
+        res = APIClient().get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateExportApiTests(TestCase):
+    """Test streaming the account export"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@email.com',
+            'password'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        self.tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.ingredient = Ingredient.objects.create(user=self.user,
+                                                    name='Oat')
+        self.recipes = []
+        for i in range(5):
+            recipe = Recipe.objects.create(user=self.user, title=f'R{i}',
+                                           time_minutes=i, price=5)
+            recipe.tags.add(self.tag)
+            self.recipes.append(recipe)
+        self.recipes[0].ingredients.add(self.ingredient)
+
+        user2 = get_user_model().objects.create_user(
+            'other@email.com',
+            'testpass'
+        )
+        Recipe.objects.create(user=user2, title='Other', time_minutes=1,
+                              price=1)
+
+    def read(self, res):
+        """Return the streamed body of a response"""
+        return b''.join(res.streaming_content)
+
+    def test_export_ndjson(self):
+        """Test exporting the user's data as NDJSON"""
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.streaming)
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+        records = [json.loads(line)
+                   for line in self.read(res).splitlines()]
+        self.assertEqual(records[0],
+                         {'type': 'tag', 'id': self.tag.id, 'name': 'Vegan'})
+        self.assertEqual(records[1], {'type': 'ingredient',
+                                      'id': self.ingredient.id,
+                                      'name': 'Oat'})
+        self.assertEqual(records[2], {
+            'type': 'recipe',
+            'id': self.recipes[0].id,
+            'title': 'R0',
+            'time_minutes': 0,
+            'price': '5.00',
+            'link': '',
+            'tags': [self.tag.id],
+            'ingredients': [self.ingredient.id],
+        })
+        self.assertEqual([r['title'] for r in records[2:]],
+                         ['R0', 'R1', 'R2', 'R3', 'R4'])
+
+    def test_export_json_gzip(self):
+        """Test exporting a gzipped JSON array"""
+        res = self.client.get(EXPORT_URL,
+                              {'output': 'json', 'compress': 'gzip'})
+
+        self.assertEqual(res['Content-Type'], 'application/gzip')
+        self.assertFalse(res.has_header('Content-Encoding'))
+        self.assertIn('recipes.json.gz', res['Content-Disposition'])
+        records = json.loads(gzip.decompress(self.read(res)))
+        self.assertEqual(len(records), 7)
+
+    def test_export_queries_per_chunk(self):
+        """Test that m2m ids are fetched once per chunk of recipes"""
+        with self.settings(RECIPE_EXPORT_CHUNK_SIZE=2):
+            res = self.client.get(EXPORT_URL)
+            # tags, ingredients, recipes, then 2 queries per 3 chunks
+            with self.assertNumQueries(9):
+                self.read(res)
+
+    def test_export_empty_json(self):
+        """Test exporting an account without data"""
+        user = get_user_model().objects.create_user('new@email.com', 'pass')
+        self.client.force_authenticate(user)
+
+        res = self.client.get(EXPORT_URL, {'output': 'json'})
+
+        self.assertEqual(json.loads(self.read(res)), [])
+
+    def test_export_invalid_output(self):
+        """Test that unknown output formats are rejected"""
+        res = self.client.get(EXPORT_URL, {'output': 'xml'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+def asgi_get(path, query_string=b'', headers=()):
+    """Serve a GET through the ASGI handler, return status, headers, body"""
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': query_string,
+        'root_path': '',
+        'headers': [(b'host', b'testserver'), *headers],
+        'client': ('127.0.0.1', 0),
+        'server': ('testserver', 80),
+    }
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    async_to_sync(get_asgi_application())(scope, receive, send)
+
+    start = messages[0]
+    body = b''.join(message.get('body', b'') for message in messages[1:])
+
+    return start['status'], dict(start['headers']), body
+
+
+class AsgiExportApiTests(TransactionTestCase):
+    """Test the export served through the ASGI handler"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@email.com',
+            'password'
+        )
+        self.auth = [(b'authorization',
+                      f'Token {Token.objects.create(user=self.user)}'
+                      .encode())]
+        for i in range(3):
+            Recipe.objects.create(user=self.user, title=f'R{i}',
+                                  time_minutes=i, price=5)
+
+    def test_export_whole_body(self):
+        """Test that the full export arrives, not a truncated stream"""
+        with self.settings(RECIPE_EXPORT_CHUNK_SIZE=2):
+            status_code, headers, body = asgi_get(
+                EXPORT_URL, b'output=json&compress=gzip', self.auth)
+
+        self.assertEqual(status_code, 200)
+        self.assertEqual(headers[b'Content-Type'], b'application/gzip')
+        self.assertEqual(int(headers[b'Content-Length']), len(body))
+        self.assertIn(b'recipes.json.gz', headers[b'Content-Disposition'])
+        records = json.loads(gzip.decompress(body))
+        self.assertEqual([r['title'] for r in records], ['R0', 'R1', 'R2'])
@@ -0,0 +1,73 @@
+from django.contrib.auth import get_user_model  # noqa
+from django.urls import reverse  # noqa
+from django.test import TestCase, override_settings  # noqa
+
+from rest_framework.test import APIClient  # noqa
+
+from core.models import Recipe, Tag, Ingredient  # noqa
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+@override_settings(RECIPE_LIST_CACHE_TIMEOUT=0)
+class ValuesListTests(TestCase):
+    """Test that values() based lists match the serializer output"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@email.com',
+            'password'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        tags = [Tag.objects.create(user=self.user, name=name)
+                for name in ('Vegan', 'Dessert', 'Café ✓')]
+        ingredients = [Ingredient.objects.create(user=self.user, name=name)
+                       for name in ('Oat', 'Milk')]
+        for i in range(4):
+            recipe = Recipe.objects.create(
+                user=self.user, title=f'Recipe {i}', time_minutes=i,
+                price='4.5', link='' if i % 2 else 'https://example.com')
+            recipe.tags.add(*tags[i % 3:])
+            recipe.ingredients.add(*ingredients[:i % 3])
+        Recipe.objects.filter(pk=recipe.pk).update(
+            image='uploads/recipe/photo.jpg',
+            image_status=Recipe.IMAGE_READY)
+
+    def assertSameContent(self, url, params=None):
+        """Assert both list paths render the exact same bytes"""
+        with self.settings(RECIPE_FAST_LIST=True):
+            fast = self.client.get(url, params)
+        with self.settings(RECIPE_FAST_LIST=False):
+            slow = self.client.get(url, params)
+
+        self.assertEqual(fast.status_code, slow.status_code)
+        self.assertEqual(fast.content, slow.content)
+
+    def test_recipe_list_matches(self):
+        """Test the full recipe list is byte compatible"""
+        self.assertSameContent(RECIPES_URL)
+
+    def test_recipe_list_pages_match(self):
+        """Test paginated recipe lists are byte compatible"""
+        self.assertSameContent(RECIPES_URL, {'page_size': 2})
+
+    def test_recipe_list_fields_match(self):
+        """Test sparse recipe lists are byte compatible"""
+        self.assertSameContent(RECIPES_URL, {'fields': 'id,tags,price'})
+
+    def test_recipe_search_matches(self):
+        """Test ranked search results are byte compatible"""
+        self.assertSameContent(RECIPES_URL, {'search': 'recipe'})
+
+    def test_tag_list_matches(self):
+        """Test the tag list is byte compatible"""
+        self.assertSameContent(TAGS_URL)
+
+    def test_recipe_list_query_count(self):
+        """Test the fast path aggregates m2m ids per page"""
+        with self.assertNumQueries(3):
+            self.client.get(RECIPES_URL)
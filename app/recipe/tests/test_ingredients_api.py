@@ -11,6 +11,7 @@ from recipe.serializers import IngredientSerializer  # noqa
 
 
 INGREDIENTS_URL = reverse('recipe:ingredient-list')
+ENSURE_INGREDIENTS_URL = reverse('recipe:ingredient-ensure')
 
 
 class PublicIngredientssApiTests(TestCase):
@@ -47,7 +48,7 @@ class PrivateIngredientsApiTests(TestCase):
         ingredients = Ingredient.objects.all().order_by('-name')
         serializer = IngredientSerializer(ingredients, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_ingredients_limited_to_user(self):
         """Test that ingredients returned are for authenticated user"""
@@ -62,8 +63,8 @@ class PrivateIngredientsApiTests(TestCase):
         res = self.client.get(INGREDIENTS_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]['name'], ingredient.name)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'][0]['name'], ingredient.name)
 
     def test_create_ingredient_successful(self):
         """Test creating a new ingredient"""
@@ -100,8 +101,8 @@ class PrivateIngredientsApiTests(TestCase):
         serializer1 = IngredientSerializer(ingredient1)
         serializer2 = IngredientSerializer(ingredient2)
 
-        self.assertIn(serializer1.data, res.data)
-        self.assertNotIn(serializer2.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertNotIn(serializer2.data, res.data['results'])
 
     def test_retrieve_ingredients_assigned_unique(self):
         """Test filtering ingredients by assigned returns unique items"""
@@ -124,5 +125,37 @@ class PrivateIngredientsApiTests(TestCase):
         )
         recipe2.ingredients.add(ingredient)
         res = self.client.get(INGREDIENTS_URL, {'assigned_only': 1})
-        self.assertEqual(len(res.data), 1)
-        self.assertTrue(len(res.data), 1)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertTrue(len(res.data['results']), 1)
+
+    def test_ensure_ingredients(self):
+        """Test ensuring a batch of ingredient names exists"""
+        existing = Ingredient.objects.create(user=self.user, name='Salt')
+
+        res = self.client.post(
+            ENSURE_INGREDIENTS_URL,
+            {'names': ['Salt', 'Pepper']},
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['Salt'], existing.id)
+        self.assertEqual(
+            res.data['Pepper'],
+            Ingredient.objects.get(user=self.user, name='Pepper').id
+        )
+
+    def test_ingredients_assigned_with_recipe_count(self):
+        """Test counting recipes of assigned ingredients only"""
+        ingredient = Ingredient.objects.create(user=self.user, name='Salt')
+        Ingredient.objects.create(user=self.user, name='Pepper')
+        for title in ('Soup', 'Stew'):
+            recipe = Recipe.objects.create(
+                user=self.user, title=title, time_minutes=5, price=2)
+            recipe.ingredients.add(ingredient)
+
+        res = self.client.get(INGREDIENTS_URL, {
+            'assigned_only': 1, 'fields': 'name,recipe_count'})
+
+        self.assertEqual(res.data['results'],
+                         [{'name': 'Salt', 'recipe_count': 2}])
@@ -0,0 +1,128 @@
+from django.conf import settings  # noqa
+from django.contrib.auth import get_user_model  # noqa
+from django.db import connection  # noqa
+from django.urls import reverse  # noqa
+from django.test import TestCase  # noqa
+from django.test.utils import CaptureQueriesContext  # noqa
+
+from rest_framework import status  # noqa
+from rest_framework.test import APIClient  # noqa
+
+from core.checks import PROCESS_LOCAL_CACHES  # noqa
+from core.models import Tag, Recipe  # noqa
+from recipe.cache import get_list_cache  # noqa
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+def sample_recipe(user, **params):
+    """create and return a sample recipe"""
+    defaults = {
+        'title': 'Recipe Title',
+        'time_minutes': 10,
+        'price': 5
+    }
+    defaults.update(params)
+
+    return Recipe.objects.create(user=user, **defaults)
+
+
+def model_queries(context):
+    """Return the captured queries that didn't go to the cache table"""
+    table = get_list_cache()._table
+
+    return [query['sql'] for query in context.captured_queries
+            if table not in query['sql']]
+
+
+class ListCacheTests(TestCase):
+    """Test caching of list responses"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@email.com',
+            'password'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_default_cache_shared_by_workers(self):
+        """Test that list responses default to a cache every worker sees"""
+        alias = settings.RECIPE_LIST_CACHE_ALIAS
+
+        self.assertNotIn(settings.CACHES[alias]['BACKEND'],
+                         PROCESS_LOCAL_CACHES)
+
+    def test_repeated_list_served_from_cache(self):
+        """Test that an unchanged list is not queried twice"""
+        sample_recipe(user=self.user)
+        res1 = self.client.get(RECIPES_URL)
+
+        with CaptureQueriesContext(connection) as context:
+            res2 = self.client.get(RECIPES_URL)
+
+        self.assertEqual(model_queries(context), [])
+        self.assertEqual(res2.status_code, status.HTTP_200_OK)
+        self.assertEqual(res1.data, res2.data)
+
+    def test_query_string_cached_separately(self):
+        """Test that different filters get different cache entries"""
+        recipe = sample_recipe(user=self.user)
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.client.get(RECIPES_URL)
+
+        res = self.client.get(RECIPES_URL, {'tags': str(tag.id)})
+
+        self.assertEqual(res.data['results'], [])
+        res = self.client.get(RECIPES_URL)
+        self.assertEqual(res.data['results'][0]['id'], recipe.id)
+
+    def test_create_invalidates_list(self):
+        """Test that creating a recipe shows up in the next list"""
+        self.client.get(RECIPES_URL)
+        sample_recipe(user=self.user)
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_m2m_change_invalidates_list(self):
+        """Test that linking a tag refreshes the cached recipe list"""
+        recipe = sample_recipe(user=self.user)
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.client.get(RECIPES_URL)
+
+        recipe.tags.add(tag)
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.data['results'][0]['tags'], [tag.id])
+
+    def test_delete_invalidates_list(self):
+        """Test that deleting a tag drops it from the cached tag list"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.client.get(TAGS_URL)
+
+        tag.delete()
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.data['results'], [])
+
+    def test_write_keeps_other_users_cache(self):
+        """Test that a write by one user keeps other users cached"""
+        user2 = get_user_model().objects.create_user(
+            'other@email.com',
+            'testpass'
+        )
+        client2 = APIClient()
+        client2.force_authenticate(user2)
+        sample_recipe(user=user2)
+        client2.get(RECIPES_URL)
+
+        sample_recipe(user=self.user)
+
+        with CaptureQueriesContext(connection) as context:
+            res = client2.get(RECIPES_URL)
+        self.assertEqual(model_queries(context), [])
+        self.assertEqual(len(res.data['results']), 1)
@@ -1,11 +1,17 @@
 import tempfile
+import threading
 import os
+from unittest import skipUnless
+from unittest.mock import patch
 
 from PIL import Image
 
 from django.contrib.auth import get_user_model  # noqa
 from django.urls import reverse  # noqa
-from django.test import TestCase  # noqa
+from django.test import TestCase, override_settings  # noqa
+from django.test.utils import CaptureQueriesContext  # noqa
+from django.db import connection  # noqa
+from django.core.files.storage import default_storage  # noqa
 
 from rest_framework import status  # noqa
 from rest_framework.test import APIClient  # noqa
@@ -13,9 +19,13 @@ from rest_framework.test import APIClient  # noqa
 from core.models import Recipe, Tag, Ingredient  # noqa
 
 from recipe.serializers import RecipeSerializer, RecipeDetailSerializer  # noqa
+from recipe.pagination import RecipeCursorPagination  # noqa
+from recipe.images import BoundedExecutor, generate_variants, \
+    get_variants, submit_variants, variant_path  # noqa
 
 
 RECIPES_URL = reverse('recipe:recipe-list')
+BULK_URL = reverse('recipe:recipe-bulk')
 
 
 def image_upload_url(recipe_id):
@@ -84,7 +94,7 @@ class PrivateRecipesApiTests(TestCase):
         recipes = Recipe.objects.all().order_by('-id')
         serializer = RecipeSerializer(recipes, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_recipes_limited_to_user(self):
         """Test that recipes returned are for authenticated user"""
@@ -101,8 +111,8 @@ class PrivateRecipesApiTests(TestCase):
         serializer = RecipeSerializer(recipes, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_view_recipe_detail(self):
         """test viewing a recipe detail"""
@@ -116,6 +126,37 @@ class PrivateRecipesApiTests(TestCase):
         serializer = RecipeDetailSerializer(recipe)
         self.assertEqual(res.data, serializer.data)
 
+    @override_settings(RECIPE_LIST_CACHE_TIMEOUT=0)
+    def test_list_recipes_query_count(self):
+        """Test listing recipes does not query once per recipe"""
+        for i in range(5):
+            recipe = sample_recipe(user=self.user, title=f'Recipe {i}')
+            recipe.tags.add(sample_tag(user=self.user, name=f'Tag {i}'))
+            recipe.ingredients.add(
+                sample_ingredient(user=self.user, name=f'Ingredient {i}'))
+
+        # recipes + prefetched ingredients + prefetched tags
+        with self.assertNumQueries(3):
+            res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 5)
+
+    def test_view_recipe_detail_query_count(self):
+        """Test viewing a recipe detail prefetches nested objects"""
+        recipe = sample_recipe(user=self.user)
+        recipe.tags.add(sample_tag(user=self.user),
+                        sample_tag(user=self.user, name='Dessert'))
+        recipe.ingredients.add(sample_ingredient(user=self.user),
+                               sample_ingredient(user=self.user, name='Oat'))
+
+        with self.assertNumQueries(3):
+            res = self.client.get(detail_url(recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['tags']), 2)
+        self.assertEqual(len(res.data['ingredients']), 2)
+
     def test_create_basic_recipe(self):
         """test creating recipe"""
         payload = {
@@ -244,6 +285,8 @@ class RecipeImageUploadTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertIn('image', res.data)
         self.assertTrue(os.path.exists(self.recipe.image.path))
+        self.assertEqual(res.data['image_status'], Recipe.IMAGE_PENDING)
+        self.assertIsNone(res.data['image_variants'])
 
     def test_upload_image_bad_request(self):
         """Test uploading an invalid image"""
@@ -270,9 +313,9 @@ class RecipeImageUploadTests(TestCase):
         serializer1 = RecipeSerializer(recipe1)
         serializer2 = RecipeSerializer(recipe2)
         serializer3 = RecipeSerializer(recipe3)
-        self.assertIn(serializer1.data, res.data)
-        self.assertIn(serializer2.data, res.data)
-        self.assertNotIn(serializer3.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertIn(serializer2.data, res.data['results'])
+        self.assertNotIn(serializer3.data, res.data['results'])
 
     def test_filter_recipes_by_ingredients(self):
         """Test returning recipes with specific ingredients"""
@@ -290,6 +333,354 @@ class RecipeImageUploadTests(TestCase):
         serializer1 = RecipeSerializer(recipe1)
         serializer2 = RecipeSerializer(recipe2)
         serializer3 = RecipeSerializer(recipe3)
-        self.assertIn(serializer1.data, res.data)
-        self.assertIn(serializer2.data, res.data)
-        self.assertNotIn(serializer3.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertIn(serializer2.data, res.data['results'])
+        self.assertNotIn(serializer3.data, res.data['results'])
+
+    def test_filter_recipes_by_tags_unique(self):
+        """Test a recipe matching several tags is returned once"""
+        recipe = sample_recipe(user=self.user)
+        tag1 = sample_tag(user=self.user, name='vegetarian')
+        tag2 = sample_tag(user=self.user, name='vegan')
+        recipe.tags.add(tag1, tag2)
+
+        res = self.client.get(RECIPES_URL, {'tags': f'{tag1.id},{tag2.id}'})
+
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_filter_recipes_matching_all_tags(self):
+        """Test returning only recipes that have all given tags"""
+        recipe1 = sample_recipe(user=self.user, title='vegan curry')
+        recipe2 = sample_recipe(user=self.user, title='veggi curry')
+        tag1 = sample_tag(user=self.user, name='vegetarian')
+        tag2 = sample_tag(user=self.user, name='vegan')
+        recipe1.tags.add(tag1, tag2)
+        recipe2.tags.add(tag1)
+
+        res = self.client.get(
+            RECIPES_URL,
+            {'tags': f'{tag1.id},{tag2.id}', 'match': 'all'}
+        )
+
+        self.assertEqual([r['id'] for r in res.data['results']],
+                         [recipe1.id])
+
+    def test_filter_recipes_matching_all_ingredients(self):
+        """Test combining all-match filters on ingredients"""
+        recipe1 = sample_recipe(user=self.user, title='porridge')
+        recipe2 = sample_recipe(user=self.user, title='chia pudding')
+        ingredient1 = sample_ingredient(user=self.user, name='oats')
+        ingredient2 = sample_ingredient(user=self.user, name='milk')
+        recipe1.ingredients.add(ingredient1, ingredient2)
+        recipe2.ingredients.add(ingredient2)
+
+        res = self.client.get(
+            RECIPES_URL,
+            {'ingredients': f'{ingredient1.id},{ingredient2.id}',
+             'match': 'all'}
+        )
+
+        self.assertEqual(res.data['results'],
+                         [RecipeSerializer(recipe1).data])
+
+    def test_filter_recipes_invalid_match(self):
+        """Test an unknown match mode is rejected"""
+        res = self.client.get(RECIPES_URL, {'match': 'some'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class RecipeImageVariantTests(TestCase):
+    """Test rendering resized variants of recipe images"""
+
+    def setUp(self):
+        self.media_root = tempfile.TemporaryDirectory()
+        self.settings_override = self.settings(
+            MEDIA_ROOT=self.media_root.name)
+        self.settings_override.enable()
+        self.user = get_user_model().objects.create_user('user', 'testpass')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.recipe = sample_recipe(user=self.user)
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.media_root.cleanup()
+
+    def upload_image(self, size):
+        """Attach a JPEG of the given size to the sample recipe"""
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as ntf:
+            Image.new('RGB', size).save(ntf, format='JPEG')
+            ntf.seek(0)
+            self.client.post(image_upload_url(self.recipe.id),
+                             {'image': ntf}, format='multipart')
+        self.recipe.refresh_from_db()
+
+    def test_generate_variants(self):
+        """Test that every variant is rendered within its bounds"""
+        self.upload_image((2000, 1000))
+
+        generate_variants(self.recipe.id, self.recipe.image.name)
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_status, Recipe.IMAGE_READY)
+        for variant, bounds in get_variants().items():
+            path = variant_path(self.recipe.image.name, variant)
+            with default_storage.open(path) as f, Image.open(f) as img:
+                self.assertLessEqual(img.width, bounds[0])
+                self.assertLessEqual(img.height, bounds[1])
+                self.assertEqual(img.width, 2 * img.height)
+
+    @override_settings(RECIPE_IMAGE_VARIANTS={
+        'small': (50, 50), 'wide': (400, 100), 'large': (300, 300)})
+    def test_generate_variants_decodes_once(self):
+        """Test that the configured variants are all cut from one decode"""
+        self.upload_image((1200, 600))
+
+        with patch('recipe.images.Image.open', wraps=Image.open) as opened:
+            generate_variants(self.recipe.id, self.recipe.image.name)
+
+        opened.assert_called_once()
+        sizes = {}
+        for variant in ('small', 'wide', 'large'):
+            path = variant_path(self.recipe.image.name, variant)
+            with default_storage.open(path) as f, Image.open(f) as img:
+                sizes[variant] = img.size
+        self.assertEqual(sizes, {
+            'small': (50, 25), 'wide': (200, 100), 'large': (300, 150)})
+
+    def test_full_queue_fails_image(self):
+        """Test that uploads beyond the render queue are marked failed"""
+        self.upload_image((10, 10))
+        executor = BoundedExecutor(max_queued=1, max_workers=1)
+        release = threading.Event()
+        self.assertIsNotNone(executor.try_submit(release.wait))
+
+        with patch('recipe.images.get_executor', return_value=executor), \
+                self.assertLogs('recipe.images', level='WARNING'):
+            submit_variants(self.recipe.id, self.user.id,
+                            self.recipe.image.name)
+        release.set()
+        executor.shutdown()
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_status, Recipe.IMAGE_FAILED)
+
+    def test_variant_urls_exposed_when_ready(self):
+        """Test that recipe details list variant URLs once rendered"""
+        self.upload_image((300, 300))
+        generate_variants(self.recipe.id, self.recipe.image.name)
+
+        res = self.client.get(detail_url(self.recipe.id))
+
+        self.assertEqual(res.data['image_status'], Recipe.IMAGE_READY)
+        self.assertEqual(set(res.data['image_variants']), set(get_variants()))
+        self.assertTrue(res.data['image_variants']['thumbnail'].endswith(
+            variant_path(self.recipe.image.name, 'thumbnail')))
+
+    def test_generate_variants_corrupt_image(self):
+        """Test that an unreadable image is marked as failed"""
+        self.upload_image((10, 10))
+        with default_storage.open(self.recipe.image.name, 'wb') as f:
+            f.write(b'notimage')
+
+        with self.assertLogs('recipe.images', level='ERROR'):
+            generate_variants(self.recipe.id, self.recipe.image.name)
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_status, Recipe.IMAGE_FAILED)
+
+
+class RecipePaginationTests(TestCase):
+    """Test cursor pagination of the recipes list"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@email.com',
+            'password'
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_recipes_paginated_by_cursor(self):
+        """Test walking the recipes list page by page"""
+        for i in range(5):
+            sample_recipe(user=self.user, title=f'Recipe {i}')
+
+        res = self.client.get(RECIPES_URL, {'page_size': 2})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 2)
+        self.assertIsNone(res.data['previous'])
+
+        seen = [recipe['id'] for recipe in res.data['results']]
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            seen += [recipe['id'] for recipe in res.data['results']]
+
+        expected = Recipe.objects.order_by('-id').values_list('id', flat=True)
+        self.assertEqual(seen, list(expected))
+
+    def test_recipes_page_size_capped(self):
+        """Test that requested page size cannot exceed the maximum"""
+        max_page_size = RecipeCursorPagination.max_page_size
+        Recipe.objects.bulk_create([
+            Recipe(user=self.user, title=f'Recipe {i}',
+                   time_minutes=10, price=5)
+            for i in range(max_page_size + 1)
+        ])
+
+        res = self.client.get(RECIPES_URL, {'page_size': max_page_size * 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), max_page_size)
+        self.assertIsNotNone(res.data['next'])
+
+
+class RecipeSparseFieldsetTests(TestCase):
+    """Test selecting response fields of recipes"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@email.com',
+            'password'
+        )
+        self.client.force_authenticate(self.user)
+        self.recipe = sample_recipe(user=self.user, title='Porridge')
+        self.tag = sample_tag(user=self.user)
+        self.recipe.tags.add(self.tag)
+        self.recipe.ingredients.add(sample_ingredient(user=self.user))
+
+    @override_settings(RECIPE_LIST_CACHE_TIMEOUT=0)
+    def test_list_selected_fields(self):
+        """Test that only selected fields are returned and queried"""
+        with self.assertNumQueries(1):
+            res = self.client.get(RECIPES_URL, {'fields': 'id,title'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'],
+                         [{'id': self.recipe.id, 'title': 'Porridge'}])
+
+    @override_settings(RECIPE_LIST_CACHE_TIMEOUT=0)
+    def test_list_expand_tags(self):
+        """Test nesting tags in the list and skipping ingredients"""
+        with self.assertNumQueries(2):
+            res = self.client.get(
+                RECIPES_URL, {'fields': 'id,tags', 'expand': 'tags'})
+
+        self.assertEqual(res.data['results'], [{
+            'id': self.recipe.id,
+            'tags': [{'id': self.tag.id, 'name': self.tag.name}],
+        }])
+
+    def test_detail_selected_fields(self):
+        """Test selecting fields of a recipe detail"""
+        res = self.client.get(detail_url(self.recipe.id),
+                              {'fields': 'title,tags'})
+
+        self.assertEqual(res.data, {
+            'title': 'Porridge',
+            'tags': [{'id': self.tag.id, 'name': self.tag.name}],
+        })
+
+    def test_unknown_fields_rejected(self):
+        """Test that unknown field and expand names are rejected"""
+        res = self.client.get(RECIPES_URL, {'fields': 'id,user'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.get(RECIPES_URL, {'expand': 'title'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_fields_ignored_on_write(self):
+        """Test that fields do not restrict what can be updated"""
+        url = f"{detail_url(self.recipe.id)}?fields=id"
+        res = self.client.patch(url, {'title': 'Oatmeal'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['title'], 'Oatmeal')
+
+
+class RecipeBulkCreateTests(TestCase):
+    """Test creating recipes in bulk"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@email.com',
+            'password'
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_bulk_create_recipes(self):
+        """Test creating several recipes with tags and ingredients"""
+        tag = sample_tag(user=self.user)
+        ingredient1 = sample_ingredient(user=self.user)
+        ingredient2 = sample_ingredient(user=self.user, name='Oat')
+        payload = [
+            {'title': 'Porridge', 'time_minutes': 10, 'price': '2.00',
+             'tags': [tag.id], 'ingredients': [ingredient1.id,
+                                               ingredient2.id]},
+            {'title': 'Chia pudding', 'time_minutes': 5, 'price': '3.50',
+             'tags': [], 'ingredients': [ingredient1.id]},
+        ]
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([r['title'] for r in res.data],
+                         ['Porridge', 'Chia pudding'])
+        recipes = Recipe.objects.filter(user=self.user).order_by('id')
+        self.assertEqual(recipes.count(), 2)
+        self.assertEqual(list(recipes[0].tags.all()), [tag])
+        self.assertEqual(set(recipes[0].ingredients.all()),
+                         {ingredient1, ingredient2})
+        self.assertEqual(list(recipes[1].ingredients.all()), [ingredient1])
+
+    @skipUnless(connection.features.can_return_rows_from_bulk_insert,
+                'Backend cannot bulk insert with RETURNING')
+    def test_bulk_create_query_count(self):
+        """Test that query count does not grow with the recipe count"""
+        tag = sample_tag(user=self.user)
+        ingredient = sample_ingredient(user=self.user)
+
+        def queries(count):
+            payload = [
+                {'title': f'Recipe {i}', 'time_minutes': 10,
+                 'price': '2.00', 'tags': [tag.id],
+                 'ingredients': [ingredient.id]}
+                for i in range(count)
+            ]
+            with CaptureQueriesContext(connection) as ctx:
+                res = self.client.post(BULK_URL, payload, format='json')
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+            return len(ctx.captured_queries)
+
+        self.assertEqual(queries(20), queries(2))
+
+    def test_bulk_create_invalid_rolls_back(self):
+        """Test that one invalid recipe rejects the whole batch"""
+        payload = [
+            {'title': 'Porridge', 'time_minutes': 10, 'price': '2.00',
+             'tags': [], 'ingredients': []},
+            {'title': 'Broken', 'time_minutes': 10, 'price': '2.00',
+             'tags': [9999], 'ingredients': []},
+        ]
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_bulk_create_size_capped(self):
+        """Test that oversized batches are rejected"""
+        payload = [
+            {'title': 'Porridge', 'time_minutes': 10, 'price': '2.00',
+             'tags': [], 'ingredients': []}
+        ] * 3
+
+        with self.settings(RECIPE_BULK_MAX_SIZE=2):
+            res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Recipe.objects.exists())
@@ -0,0 +1,82 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.db import routers
+from core.models import Recipe
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+def detail_url(recipe_id):
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+# the test database stands in for the replica
+@override_settings(DATABASE_REPLICAS={'default': 1},
+                   RECIPE_LIST_CACHE_TIMEOUT=0)
+class ReplicaReadTests(TestCase):
+    """Test which requests read from replicas"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@email.com', 'password')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        patcher = patch('core.db.routers.choose_replica',
+                        wraps=routers.choose_replica)
+        self.choose_replica = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_list_and_retrieve_read_replicas(self):
+        """Test that safe list and retrieve requests use replicas"""
+        recipe = Recipe.objects.create(
+            user=self.user, title='Toast', time_minutes=2, price=1)
+
+        self.client.get(RECIPES_URL)
+        self.assertTrue(self.choose_replica.called)
+        self.choose_replica.reset_mock()
+
+        res = self.client.get(detail_url(recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(self.choose_replica.called)
+        self.assertFalse(routers._use_replicas.get())
+
+    def test_write_pins_user_to_primary(self):
+        """Test that a user reads the primary right after a write"""
+        res = self.client.post(TAGS_URL, {'name': 'Vegan'})
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertFalse(self.choose_replica.called)
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.data['results'][0]['name'], 'Vegan')
+        self.assertFalse(self.choose_replica.called)
+
+    def test_failed_write_does_not_pin(self):
+        """Test that a rejected write keeps the user on replicas"""
+        res = self.client.post(TAGS_URL, {'name': ''})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.client.get(TAGS_URL)
+
+        self.assertTrue(self.choose_replica.called)
+
+    @override_settings(DATABASE_REPLICAS={})
+    def test_no_replicas(self):
+        """Test that nothing is routed without replicas"""
+        self.client.get(RECIPES_URL)
+
+        self.assertFalse(self.choose_replica.called)
@@ -0,0 +1,141 @@
+from django.contrib.auth import get_user_model  # noqa
+from django.urls import reverse  # noqa
+from django.test import TestCase  # noqa
+
+from rest_framework import status  # noqa
+from rest_framework.test import APIClient  # noqa
+
+from core.models import Recipe, Tag, Ingredient  # noqa
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def sample_recipe(user, **params):
+    """create and return a sample recipe"""
+    defaults = {
+        'title': 'Recipe Title',
+        'time_minutes': 10,
+        'price': 5
+    }
+    defaults.update(params)
+
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class RecipeSearchTests(TestCase):
+    """Test full text search of recipes"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@email.com',
+            'password'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def search(self, terms):
+        """Return the titles of recipes matching search terms"""
+        res = self.client.get(RECIPES_URL, {'search': terms})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        return [recipe['title'] for recipe in res.data['results']]
+
+    def test_search_by_title(self):
+        """Test searching recipes by words of their title"""
+        sample_recipe(user=self.user, title='Thai green curry')
+        sample_recipe(user=self.user, title='Pancakes')
+
+        self.assertEqual(self.search('curry'), ['Thai green curry'])
+
+    def test_search_by_tag_and_ingredient(self):
+        """Test searching recipes by tag and ingredient names"""
+        recipe1 = sample_recipe(user=self.user, title='Porridge')
+        recipe2 = sample_recipe(user=self.user, title='Salad')
+        recipe1.tags.add(Tag.objects.create(user=self.user, name='Breakfast'))
+        recipe2.ingredients.add(
+            Ingredient.objects.create(user=self.user, name='Cucumber'))
+
+        self.assertEqual(self.search('breakfast'), ['Porridge'])
+        self.assertEqual(self.search('cucumber'), ['Salad'])
+
+    def test_search_index_follows_changes(self):
+        """Test that renames, unlinks and deletes update the index"""
+        recipe = sample_recipe(user=self.user, title='Porridge')
+        tag = Tag.objects.create(user=self.user, name='Breakfast')
+        recipe.tags.add(tag)
+
+        tag.name = 'Brunch'
+        tag.save()
+        self.assertEqual(self.search('breakfast'), [])
+        self.assertEqual(self.search('brunch'), ['Porridge'])
+
+        recipe.tags.remove(tag)
+        self.assertEqual(self.search('brunch'), [])
+
+        recipe.title = 'Oatmeal'
+        recipe.save()
+        self.assertEqual(self.search('porridge'), [])
+
+        recipe.delete()
+        self.assertEqual(self.search('oatmeal'), [])
+
+    def test_search_matches_word_prefixes(self):
+        """Test that partly typed words match on every database"""
+        sample_recipe(user=self.user, title='Thai green curry')
+
+        self.assertEqual(self.search('cur'), ['Thai green curry'])
+        self.assertEqual(self.search('thai gre'), ['Thai green curry'])
+
+    def test_search_matches_word_stems(self):
+        """Test that other forms of a word match on every database"""
+        sample_recipe(user=self.user, title='Roasted potatoes')
+
+        self.assertEqual(self.search('roasting potato'),
+                         ['Roasted potatoes'])
+
+    def test_search_matches_all_words(self):
+        """Test that every searched word must match"""
+        sample_recipe(user=self.user, title='Thai green curry')
+        sample_recipe(user=self.user, title='Red curry')
+
+        self.assertEqual(self.search('green curry'), ['Thai green curry'])
+
+    def test_search_ranks_results(self):
+        """Test that better matches are returned first"""
+        sample_recipe(user=self.user, title='Curry with a side of rice')
+        best = sample_recipe(user=self.user, title='Curry curry')
+        best.tags.add(Tag.objects.create(user=self.user, name='Curry'))
+
+        self.assertEqual(self.search('curry'),
+                         ['Curry curry', 'Curry with a side of rice'])
+
+    def test_search_limited_to_user(self):
+        """Test that other users' recipes are not searched"""
+        user2 = get_user_model().objects.create_user(
+            'other@email.com',
+            'testpass'
+        )
+        sample_recipe(user=user2, title='Curry')
+
+        self.assertEqual(self.search('curry'), [])
+
+    def test_search_paginated(self):
+        """Test walking ranked search results by cursor"""
+        for i in range(5):
+            sample_recipe(user=self.user, title=f'Curry {i}')
+
+        res = self.client.get(RECIPES_URL, {'search': 'curry',
+                                            'page_size': 2})
+        titles = [recipe['title'] for recipe in res.data['results']]
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            titles += [recipe['title'] for recipe in res.data['results']]
+
+        self.assertEqual(sorted(titles), [f'Curry {i}' for i in range(5)])
+
+    def test_search_ignores_query_syntax(self):
+        """Test that search operators in user input are not parsed"""
+        sample_recipe(user=self.user, title='Curry')
+
+        self.assertEqual(self.search('(curry"*'), ['Curry'])
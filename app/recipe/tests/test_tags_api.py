@@ -1,6 +1,6 @@
 from django.contrib.auth import get_user_model  # noqa
 from django.urls import reverse  # noqa
-from django.test import TestCase  # noqa
+from django.test import TestCase, override_settings  # noqa
 
 from rest_framework import status  # noqa
 from rest_framework.test import APIClient  # noqa
@@ -11,6 +11,7 @@ from recipe.serializers import TagSerializer  # noqa
 
 
 TAGS_URL = reverse('recipe:tag-list')
+ENSURE_TAGS_URL = reverse('recipe:tag-ensure')
 
 
 class PublicTagsApiTests(TestCase):
@@ -47,7 +48,7 @@ class PrivateTagsApiTests(TestCase):
         tags = Tag.objects.all().order_by('-name')
         serializer = TagSerializer(tags, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_tags_limited_to_user(self):
         """Test that tags returned are for authenticated user"""
@@ -61,8 +62,8 @@ class PrivateTagsApiTests(TestCase):
         res = self.client.get(TAGS_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]['name'], tag.name)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'][0]['name'], tag.name)
 
     def test_create_tag_successful(self):
         """Test creating a new tag"""
@@ -98,8 +99,8 @@ class PrivateTagsApiTests(TestCase):
         serializer1 = TagSerializer(tag1)
         serializer2 = TagSerializer(tag2)
 
-        self.assertIn(serializer1.data, res.data)
-        self.assertNotIn(serializer2.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertNotIn(serializer2.data, res.data['results'])
 
     def test_retrieve_tags_assigned_unique(self):
         """Test filtering tags by assigned returns unique items"""
@@ -122,5 +123,114 @@ class PrivateTagsApiTests(TestCase):
         )
         recipe2.tags.add(tag)
         res = self.client.get(TAGS_URL, {'assigned_only': 1})
-        self.assertEqual(len(res.data), 1)
-        self.assertTrue(len(res.data), 1)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertTrue(len(res.data['results']), 1)
+
+    def test_tags_paginated_by_name(self):
+        """Test tags are paginated by descending name"""
+        for name in ('Breakfast', 'Dessert', 'Vegan'):
+            Tag.objects.create(user=self.user, name=name)
+
+        res = self.client.get(TAGS_URL, {'page_size': 2})
+        names = [tag['name'] for tag in res.data['results']]
+        res = self.client.get(res.data['next'])
+        names += [tag['name'] for tag in res.data['results']]
+
+        self.assertEqual(names, ['Vegan', 'Dessert', 'Breakfast'])
+        self.assertIsNone(res.data['next'])
+
+    def test_create_tag_idempotent(self):
+        """Test creating an existing tag returns it instead of failing"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+
+        res = self.client.post(TAGS_URL, {'name': 'Vegan'})
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['id'], tag.id)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 1)
+
+    def test_ensure_tags(self):
+        """Test ensuring a batch of tag names exists"""
+        existing = Tag.objects.create(user=self.user, name='Vegan')
+        user2 = get_user_model().objects.create_user(
+            'other@email.com',
+            'testpass'
+        )
+        Tag.objects.create(user=user2, name='Dessert')
+
+        res = self.client.post(
+            ENSURE_TAGS_URL,
+            {'names': ['Vegan', 'Dessert', 'Dessert', 'Quick']},
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        tags = Tag.objects.filter(user=self.user)
+        self.assertEqual(res.data, dict(tags.values_list('name', 'id')))
+        self.assertEqual(set(res.data), {'Vegan', 'Dessert', 'Quick'})
+        self.assertEqual(res.data['Vegan'], existing.id)
+
+    def test_ensure_tags_invalid(self):
+        """Test ensuring an empty batch of names fails"""
+        res = self.client.post(ENSURE_TAGS_URL, {'names': []}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(RECIPE_LIST_CACHE_TIMEOUT=0)
+    def test_retrieve_tags_selected_fields(self):
+        """Test listing only the ids of tags"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+
+        with self.assertNumQueries(1):
+            res = self.client.get(TAGS_URL, {'fields': 'id'})
+
+        self.assertEqual(res.data['results'], [{'id': tag.id}])
+
+    def test_tags_recipe_count(self):
+        """Test requesting how many recipes use each tag"""
+        tag1 = Tag.objects.create(user=self.user, name='Vegan')
+        tag2 = Tag.objects.create(user=self.user, name='Dessert')
+        for title in ('Salad', 'Soup'):
+            recipe = Recipe.objects.create(
+                user=self.user, title=title, time_minutes=5, price=2)
+            recipe.tags.add(tag1)
+
+        res = self.client.get(TAGS_URL, {'fields': 'id,recipe_count'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'], [
+            {'id': tag1.id, 'recipe_count': 2},
+            {'id': tag2.id, 'recipe_count': 0},
+        ])
+
+    def test_tags_recipe_count_not_default(self):
+        """Test that the recipe count is only output when requested"""
+        Tag.objects.create(user=self.user, name='Vegan')
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertNotIn('recipe_count', res.data['results'][0])
+
+    def test_tags_ordered_by_popularity(self):
+        """Test paging through tags from the most used down"""
+        tags = [Tag.objects.create(user=self.user, name=name)
+                for name in ('Breakfast', 'Dessert', 'Vegan')]
+        for count, tag in zip((2, 0, 1), tags):
+            for _ in range(count):
+                recipe = Recipe.objects.create(
+                    user=self.user, title='Recipe', time_minutes=5, price=2)
+                recipe.tags.add(tag)
+
+        res = self.client.get(TAGS_URL, {'ordering': 'popular',
+                                         'page_size': 2})
+        names = [tag['name'] for tag in res.data['results']]
+        res = self.client.get(res.data['next'])
+        names += [tag['name'] for tag in res.data['results']]
+
+        self.assertEqual(names, ['Breakfast', 'Vegan', 'Dessert'])
+
+    def test_tags_invalid_ordering(self):
+        """Test that an unknown ordering is rejected"""
+        res = self.client.get(TAGS_URL, {'ordering': 'newest'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
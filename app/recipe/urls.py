@@ -1,7 +1,9 @@
+from django.conf import settings  # noqa
 from django.urls import path, include  # noqa
 from rest_framework.routers import DefaultRouter  # noqa
 
 from recipe import views  # noqa
+from recipe.async_views import async_viewset_view  # noqa
 
 router = DefaultRouter()
 router.register('tags', views.TagViewSet)
@@ -10,6 +12,31 @@ router.register('recipes', views.RecipeViewSet)
 
 app_name = 'recipe'
 
+LIST_ACTIONS = {'get': 'list', 'post': 'create'}
+DETAIL_ACTIONS = {
+    'get': 'retrieve',
+    'put': 'update',
+    'patch': 'partial_update',
+    'delete': 'destroy',
+}
+
+# native async views in front of the router's list, create and retrieve
+async_urlpatterns = [
+    path('tags/', async_viewset_view(views.TagViewSet, LIST_ACTIONS),
+         name='tag-list'),
+    path('ingredients/',
+         async_viewset_view(views.IngredientViewSet, LIST_ACTIONS),
+         name='ingredient-list'),
+    path('recipes/', async_viewset_view(views.RecipeViewSet, LIST_ACTIONS),
+         name='recipe-list'),
+    path('recipes/<int:pk>/',
+         async_viewset_view(views.RecipeViewSet, DETAIL_ACTIONS),
+         name='recipe-detail'),
+]
+
 urlpatterns = [
     path('', include(router.urls))
 ]
+
+if settings.RECIPE_ASYNC_VIEWS:
+    urlpatterns = async_urlpatterns + urlpatterns
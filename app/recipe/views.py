@@ -1,72 +1,297 @@
+from django.conf import settings  # noqa
+from django.db.models import Count, Exists, OuterRef, Prefetch  # noqa
+from django.core.handlers.asgi import ASGIRequest  # noqa
+from django.http import FileResponse, StreamingHttpResponse  # noqa
 from rest_framework.decorators import action  # noqa
 from rest_framework.response import Response  # noqa
 from rest_framework import viewsets, mixins, status  # noqa
-from rest_framework.authentication import TokenAuthentication  # noqa
-from rest_framework.permissions import IsAuthenticated  # noqa
+from rest_framework.permissions import IsAuthenticated, SAFE_METHODS  # noqa
+from rest_framework.exceptions import ValidationError  # noqa
 
+from core.authentication import CachedTokenAuthentication  # noqa
+from core.db.routers import (get_replicas, is_pinned, pin_to_primary,  # noqa
+                             read_from_replicas,  # noqa
+                             stop_reading_from_replicas)  # noqa
 from core.models import Tag, Ingredient, Recipe  # noqa
 
 from recipe import serializers  # noqa
+from recipe.bulk import ensure_names  # noqa
+from recipe.cache import CachedListMixin, bump_user_version  # noqa
+from recipe.export import spool_export, stream_export  # noqa
+from recipe.fastpath import ValuesListMixin  # noqa
+from recipe.images import schedule_variants, variant_urls  # noqa
+from recipe.search import search_recipes  # noqa
+from recipe.pagination import (RecipeCursorPagination,  # noqa
+                               AttrCursorPagination)  # noqa
 
 
-class BaseAttrViewSet(viewsets.GenericViewSet, mixins.ListModelMixin,
+class SparseFieldsContextMixin:
+    """Let readers pick response fields with ?fields= and ?expand="""
+    expandable_fields = ()
+
+    def _query_param_names(self, name):
+        value = self.request.query_params.get(name, '')
+        return {part.strip() for part in value.split(',') if part.strip()}
+
+    def get_sparse_fieldset(self):
+        """Return the requested field names (None for all) and expands"""
+        if self.request.method not in SAFE_METHODS:
+            return None, set()
+
+        fields = self._query_param_names('fields')
+        unknown = fields - set(self.get_serializer_class().Meta.fields)
+        if unknown:
+            raise ValidationError(
+                {'fields': f"Unknown fields: {', '.join(sorted(unknown))}"})
+        expand = self._query_param_names('expand')
+        unknown = expand - set(self.expandable_fields)
+        if unknown:
+            raise ValidationError(
+                {'expand': f"Unknown fields: {', '.join(sorted(unknown))}"})
+
+        return fields or None, expand
+
+    def get_serializer_context(self):
+        """Pass the requested fieldset to the serializer"""
+        context = super().get_serializer_context()
+        context['fields'], context['expand'] = self.get_sparse_fieldset()
+
+        return context
+
+
+class ReplicaReadMixin:
+    """Serve safe `replica_actions` from read replicas
+
+    A successful write keeps its user on the primary for a few seconds,
+    so they read their own writes despite replication lag.
+    """
+    replica_actions = ('list', 'retrieve')
+
+    def initial(self, request, *args, **kwargs):
+        """Read from replicas once the user is known not to be pinned"""
+        super().initial(request, *args, **kwargs)
+        if (get_replicas() and request.method in SAFE_METHODS
+                and self.action in self.replica_actions
+                and not is_pinned(request.user.pk)):
+            self._replica_token = read_from_replicas()
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        """Stop reading from replicas, or pin the user after a write"""
+        token = getattr(self, '_replica_token', None)
+        if token is not None:
+            stop_reading_from_replicas(token)
+            self._replica_token = None
+        elif request.method not in SAFE_METHODS \
+                and response.status_code < 400:
+            pin_to_primary(request.user.pk)
+
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class BaseAttrViewSet(ReplicaReadMixin, SparseFieldsContextMixin,
+                      CachedListMixin, ValuesListMixin,
+                      viewsets.GenericViewSet, mixins.ListModelMixin,
                       mixins.CreateModelMixin):
     """Base class for user owned recipe/tag attributes"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
+    pagination_class = AttrCursorPagination
+    field_columns = {
+        'id': (),
+        'name': ('name',),
+        'recipe_count': ('recipe_count',),
+    }
+    # the Recipe m2m field linking recipes to these objs
+    recipe_field = None
+    orderings = ('name', 'popular')
+
+    def _recipe_links(self):
+        """Return the m2m rows linking recipes to the outer obj"""
+        field = Recipe._meta.get_field(self.recipe_field)
+        column = f'{field.m2m_reverse_field_name()}_id'
+
+        return field.remote_field.through.objects.filter(
+            **{column: OuterRef('pk')})
+
+    def get_ordering(self):
+        """Return the requested list ordering, by name or popularity"""
+        ordering = self.request.query_params.get('ordering', 'name')
+        if ordering not in self.orderings:
+            raise ValidationError(
+                {'ordering': f"Must be one of {', '.join(self.orderings)}"})
+
+        return ordering
 
     def get_queryset(self):
         """return objs for the current authenticated user only"""
         assigned_only = bool(
             int(self.request.query_params.get('assigned_only', 0))
         )
-        queryset = self.queryset
+        queryset = self.queryset.filter(user=self.request.user)
         if assigned_only:
-            queryset = queryset.filter(recipe__isnull=False)
+            # a semi join, so objs used by many recipes come back once
+            queryset = queryset.filter(Exists(self._recipe_links()))
+        if self.action == 'list':
+            fields, _ = self.get_sparse_fieldset()
+            fields = set(fields or ())
+            # the pagination cursor reads name, and recipe_count by
+            # popularity, so they stay loaded
+            if self.get_ordering() == 'popular':
+                fields.add('recipe_count')
+            queryset = queryset.only('id', 'name', *fields)
 
-        return queryset.filter(
-            user=self.request.user).order_by('-name').distinct()
+        return queryset.order_by('-name')
+
+    def get_serializer_class(self):
+        """return appropriate serializer class"""
+        if self.action == 'ensure':
+            return serializers.AttrNamesSerializer
+
+        return self.serializer_class
 
     def perform_create(self, serializer):
-        """Create a new obj"""
-        serializer.save(user=self.request.user)
+        """Create a new obj, or reuse the one with the same name"""
+        serializer.instance, _ = self.queryset.model.objects.get_or_create(
+            user=self.request.user, **serializer.validated_data)
+
+    @action(methods=['POST'], detail=False)
+    def ensure(self, request):
+        """Make sure objs exist for all names and return their ids"""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        names = serializer.validated_data['names']
+
+        ids = ensure_names(
+            self.queryset.model, [(request.user.pk, name) for name in names])
+        # bulk inserts don't send post_save
+        bump_user_version(request.user.pk)
+
+        return Response(
+            {name: pk for (_, name), pk in ids.items()},
+            status=status.HTTP_200_OK
+        )
 
 
 class TagViewSet(BaseAttrViewSet):
     """Manage tags in the db"""
     queryset = Tag.objects.all()
     serializer_class = serializers.TagSerializer
+    recipe_field = 'tags'
 
 
 class IngredientViewSet(BaseAttrViewSet):
     """Manage ingredients in the db"""
     queryset = Ingredient.objects.all()
     serializer_class = serializers.IngredientSerializer
+    recipe_field = 'ingredients'
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(ReplicaReadMixin, SparseFieldsContextMixin,
+                    CachedListMixin, ValuesListMixin, viewsets.ModelViewSet):
     """Manage recipes in the db"""
     serializer_class = serializers.RecipeSerializer
     queryset = Recipe.objects.all()
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
+    pagination_class = RecipeCursorPagination
+    expandable_fields = ('ingredients', 'tags')
+    # model columns each serialized field reads
+    field_columns = {
+        'id': (),
+        'title': ('title',),
+        'price': ('price',),
+        'time_minutes': ('time_minutes',),
+        'link': ('link',),
+        'image_status': ('image_status',),
+        'image_variants': ('image', 'image_status'),
+    }
+    related_models = {
+        'ingredients': Ingredient,
+        'tags': Tag,
+    }
+    computed_fields = {
+        'image_variants': 'get_image_variants',
+    }
 
     def _params_to_ints(self, qs):
         """Converts a list of str IDs to a list of integers"""
         return [int(str_id) for str_id in qs.split(',')]
 
+    def _filter_related(self, queryset, through, column, ids, match):
+        """Filter recipes linked to any/all of the given ids
+
+        Filters go through the m2m table in a subquery rather than a join,
+        so a recipe matching several ids is never returned twice.
+        """
+        links = through.objects.filter(**{f'{column}__in': ids})
+        if match == 'all':
+            matched = links.values('recipe_id').annotate(
+                matched=Count(column)
+            ).filter(matched=len(set(ids))).values('recipe_id')
+            return queryset.filter(id__in=matched)
+
+        return queryset.filter(
+            Exists(links.filter(recipe_id=OuterRef('pk')))
+        )
+
     def get_queryset(self):
         """return recipe for the current authenticated user only"""
         tags = self.request.query_params.get('tags')
         ingredients = self.request.query_params.get('ingredients')
+        match = self.request.query_params.get('match', 'any')
+        if match not in ('any', 'all'):
+            raise ValidationError({'match': "Must be 'any' or 'all'"})
         queryset = self.queryset
         if tags:
             tag_ids = self._params_to_ints(tags)
-            queryset = queryset.filter(tags__id__in=tag_ids)
+            queryset = self._filter_related(
+                queryset, Recipe.tags.through, 'tag_id', tag_ids, match)
         if ingredients:
             ingredient_ids = self._params_to_ints(ingredients)
-            queryset = queryset.filter(ingredients__id__in=ingredient_ids)
-        return queryset.filter(user=self.request.user).order_by('-id')
+            queryset = self._filter_related(
+                queryset, Recipe.ingredients.through, 'ingredient_id',
+                ingredient_ids, match)
+        queryset = queryset.filter(user=self.request.user).order_by('-id')
+        search = self.request.query_params.get('search')
+        if search and self.action == 'list':
+            queryset = search_recipes(queryset, search).order_by(
+                '-search_rank', '-id')
+
+        return self._prefetch_for_action(queryset)
+
+    def _prefetch_for_action(self, queryset):
+        """Load only the columns and relations the action serializes"""
+        if self.action in ('list', 'retrieve'):
+            fields, expand = self.get_sparse_fieldset()
+            if self.action == 'retrieve':
+                # the detail serializer always nests relations
+                expand = set(self.expandable_fields)
+            fields = fields or self.get_serializer_class().Meta.fields
+
+            columns = {'id'}
+            for name in fields:
+                columns.update(self.field_columns.get(name, ()))
+            queryset = queryset.only(*columns)
+            for name, model in self.related_models.items():
+                if name in fields:
+                    related = ('id', 'name') if name in expand else ('id',)
+                    queryset = queryset.prefetch_related(Prefetch(
+                        name,
+                        queryset=model.objects.only(*related).order_by('id')
+                    ))
+
+            return queryset
+        elif self.action == 'upload_image':
+            return queryset.only('id', 'user', 'image', 'image_status')
+
+        return queryset
+
+    def get_image_variants(self, row):
+        """Return variant URLs of a values() row like ImageVariantsField"""
+        if not row['image'] or row['image_status'] != Recipe.IMAGE_READY:
+            return None
+
+        return variant_urls(row['image'], self.request)
 
     def get_serializer_class(self):
         """return appropriate serializer class"""
@@ -81,6 +306,53 @@ class RecipeViewSet(viewsets.ModelViewSet):
         """Create a new recipe"""
         serializer.save(user=self.request.user)
 
+    @action(methods=['POST'], detail=False, url_path='bulk')
+    def bulk(self, request):
+        """Create a list of recipes in one request"""
+        serializer = self.get_serializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save(user=self.request.user)
+
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @action(methods=['GET'], detail=False)
+    def export(self, request):
+        """Stream all tags, ingredients and recipes of the user"""
+        output = request.query_params.get('output', 'ndjson')
+        if output not in ('ndjson', 'json'):
+            raise ValidationError({'output': "Must be 'ndjson' or 'json'"})
+        compress = request.query_params.get('compress') == 'gzip'
+
+        if compress:
+            # a .gz file to keep, not a transfer encoding clients undo
+            content_type = 'application/gzip'
+        elif output == 'ndjson':
+            content_type = 'application/x-ndjson'
+        else:
+            content_type = 'application/json'
+
+        pieces = stream_export(
+            request.user,
+            output=output,
+            compress=compress,
+            chunk_size=getattr(settings, 'RECIPE_EXPORT_CHUNK_SIZE', 2000),
+        )
+        filename = f'recipes.{output}' + ('.gz' if compress else '')
+        if isinstance(request._request, ASGIRequest):
+            # the ASGI handler iterates streamed bodies on the event loop,
+            # where the export can't query, so write it out on this thread
+            spool, size = spool_export(pieces)
+            response = FileResponse(spool, content_type=content_type,
+                                    as_attachment=True, filename=filename)
+            response['Content-Length'] = size
+        else:
+            response = StreamingHttpResponse(pieces,
+                                             content_type=content_type)
+            response['Content-Disposition'] = \
+                f'attachment; filename="{filename}"'
+
+        return response
+
     # takes as method-arguments: post, get, patch ,put
     @action(methods=['POST'], detail=True, url_path='upload-image')
     def upload_image(self, request, pk=None):
@@ -92,7 +364,8 @@ class RecipeViewSet(viewsets.ModelViewSet):
         )
 
         if serializer.is_valid():
-            serializer.save()
+            recipe = serializer.save(image_status=Recipe.IMAGE_PENDING)
+            schedule_variants(recipe)
             return Response(
                 serializer.data,
                 status=status.HTTP_200_OK
@@ -5,6 +5,8 @@ from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
 
+from core.models import Recipe
+
 
 # Constant variable uppercase convention
 CREATE_USER_URL = reverse('user:create')
@@ -138,6 +140,7 @@ class PrivateUserApiTests(TestCase):
         self.assertEqual(res.data, {
             'name': self.user.name,
             'email': self.user.email,
+            'recipe_count': 0,
         })
 
     def test_post_me_not_allowed(self):
@@ -156,3 +159,17 @@ class PrivateUserApiTests(TestCase):
         self.assertEqual(self.user.name, payload['name'])
         self.assertTrue(self.user.check_password(payload['password']))
         self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_update_profile_keeps_recipe_count(self):
+        """Test that a profile update doesn't reset the recipe count"""
+        Recipe.objects.create(
+            user=self.user, title='Toast', time_minutes=2, price=1)
+        # the authenticated user still holds the count from before
+        self.assertEqual(self.user.recipe_count, 0)
+
+        res = self.client.patch(ME_URL, {'name': 'new name'})
+
+        self.assertEqual(res.data['recipe_count'], 1)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.name, 'new name')
+        self.assertEqual(self.user.recipe_count, 1)
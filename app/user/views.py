@@ -1,6 +1,8 @@
-from rest_framework import generics, authentication, permissions
+from django.contrib.auth import get_user_model
+from rest_framework import generics, permissions
 from rest_framework.authtoken import views
 from rest_framework.settings import api_settings
+from core.authentication import CachedTokenAuthentication
 from user.serializers import (UserSerializer, AuthTokenSerializer)
 
 
@@ -18,8 +20,16 @@ class CreateTokenView(views.ObtainAuthToken):
 class ManageUserView(generics.RetrieveUpdateAPIView):
     """Manage the authenticated user"""
     serializer_class = UserSerializer
-    authentication_classes = (authentication.TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (permissions.IsAuthenticated,)
 
     def get_object(self):
-        return self.request.user
+        """Return the user, read afresh for updates
+
+        The token cache hands out a copy that may be seconds old, saving
+        it could write back an old password hash or is_active.
+        """
+        if self.request.method in permissions.SAFE_METHODS:
+            return self.request.user
+
+        return get_user_model().objects.get(pk=self.request.user.pk)